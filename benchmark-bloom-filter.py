@@ -0,0 +1,86 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+MM Financial Reconciliation fingerprint Bloom filter benchmark
+
+Measures, per million fingerprints, the memory held by the dedup side input of known fingerprints:
+
+- BloomFilter sized at each false positive rate, with its observed false positive rate and keys per second
+- The exact fingerprint set read as an AsDict side input, for comparison
+"""
+
+import argparse
+import time
+import tracemalloc
+from modules.BloomFilter import BloomFilter
+from modules.Fingerprints import Fingerprints
+
+FP_RATES = [0.01, 0.001, 0.0001]
+
+
+def fingerprint_keys(start: int, stop: int) -> list[str]:
+    """Returns dedup keys for SHA-256 fingerprints spread over a month of record dates"""
+    return [
+        Fingerprints.partition_key(f'2024-01-{i % 28 + 1:02d}', Fingerprints.sha256(str(i))[0], None)
+        for i in range(start, stop)
+    ]
+
+
+def exact_set_bytes(fingerprints: int) -> int:
+    """Returns the memory held by a dict of fingerprint keys, as built for the AsDict side input"""
+    tracemalloc.start()
+    known = dict.fromkeys(fingerprint_keys(0, fingerprints))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del known
+    return size
+
+
+def run(argv=None):
+    """Builds a Bloom filter of fingerprints at each false positive rate and prints a results table"""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--fingerprints',
+        required=False,
+        default=1000000,
+        type=int,
+        dest='fingerprints',
+        help='Number of known fingerprints added to each filter'
+    ),
+    parser.add_argument(
+        '--probes',
+        required=False,
+        default=200000,
+        type=int,
+        dest='probes',
+        help='Number of unknown fingerprints tested to observe the false positive rate'
+    )
+    known_args = parser.parse_args(argv)
+
+    known = fingerprint_keys(0, known_args.fingerprints)
+    unknown = fingerprint_keys(known_args.fingerprints, known_args.fingerprints + known_args.probes)
+    per_million = 1000000 / known_args.fingerprints
+
+    print(f'{"Filter":<16}{"MB per million":>16}{"bits per key":>14}{"observed FP rate":>18}{"adds/s":>12}{"tests/s":>12}')
+    for fp_rate in FP_RATES:
+        bloom = BloomFilter.for_capacity(known_args.fingerprints, fp_rate)
+        start = time.perf_counter()
+        bloom.add_all(known)
+        adds = known_args.fingerprints / (time.perf_counter() - start)
+        start = time.perf_counter()
+        false_positives = sum(key in bloom for key in unknown)
+        tests = known_args.probes / (time.perf_counter() - start)
+        print(f'{"bloom " + str(fp_rate):<16}{bloom.size_in_bytes * per_million / 2**20:>16,.2f}'
+              f'{bloom.num_bits / known_args.fingerprints:>14,.2f}{false_positives / known_args.probes:>18.5f}'
+              f'{adds:>12,.0f}{tests:>12,.0f}')
+    exact = exact_set_bytes(known_args.fingerprints)
+    print(f'{"exact set":<16}{exact * per_million / 2**20:>16,.2f}{exact * 8 / known_args.fingerprints:>14,.2f}'
+          f'{0:>18.5f}{"-":>12}{"-":>12}')
+
+
+if __name__ == '__main__':
+    run()
+
+# fmt: on
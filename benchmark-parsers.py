@@ -0,0 +1,127 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+MM Financial Reconciliation parser micro-benchmark
+
+Measures rows per second for the per-row parsing steps of each source data type:
+
+- FinRecParsers.add_computed_fields, applied to every ingested row
+- FinRecData.from_dataset, applied to every enriched PKRD and NFSI row
+"""
+
+import argparse
+import timeit
+from modules.FinRecData import FinRecData
+from modules.FinRecParsers import FinRecParsers
+from modules.Names import Names
+
+# Representative enriched rows per source data type
+SAMPLE_ROWS = {
+    Names.TYPE_PKRD: {
+        "Move Date": "01/01/2023",
+        "Item No.": "60330045",
+        "Move Order": "MM012345/005",
+        "Lot Number": "T123456789",
+        "Store": "709",
+        "SMS_ORDER_NUMBER": "8811223",
+        "Qty": "-123",
+        "Value": "-560.88",
+        Names.DEPOT_ID: "709",
+        Names.DEPOT_NAME: "Depot A",
+        Names.DEPOT_CATEGORY: "NFSI Fresh",
+        Names.UNIT_PRICE: 1.23,
+        Names.CASE_PRICE: 4.56,
+    },
+    Names.TYPE_FRESH: {
+        "ACTUAL_TRAN_DATE": "12/02/2024",
+        "LPC": "330045",
+        "SORDNO_ITM1": "MM012345",
+        "DEPOT": "100987",
+        "ORDER_NO": "8811223",
+        "PACKS_RECEIVED": "123",
+        "TOTAL_COST": "560.88",
+        Names.DEPOT_ID: "987",
+        Names.DEPOT_NAME: "Depot B",
+        Names.DEPOT_CATEGORY: "NFSI Fresh",
+    },
+    Names.TYPE_FROZEN: {
+        "ACTUAL_TRAN_DATE": "14/01/2023",
+        "LPC": "441156",
+        "SORDNO_ITM1": "MM045678",
+        "DEPOT": "100987",
+        "ORDER_NO": "88223344",
+        "PACKS_RECEIVED": "567",
+        "TOTAL_COST": "3963.33",
+        Names.DEPOT_ID: "987",
+        Names.DEPOT_NAME: "Depot B",
+        Names.DEPOT_CATEGORY: "NFSI Frozen",
+    },
+    Names.TYPE_NON_NFSI: {
+        "Invoice Date": "05/06/2024",
+        "Customer No": "XYZ",
+        "Item No": "0112345",
+        "Sales Order No": "MM023456",
+        "PO # (1)": "88223344",
+        "QTY In Cases": "567",
+        "Total Price": "3963.33",
+        Names.DEPOT_ID: "XYZ",
+        Names.DEPOT_NAME: "Depot C",
+        Names.DEPOT_CATEGORY: "Non-NFSI",
+    },
+    Names.TYPE_SALES: {
+        "CUSTREQDTE_SOR": "01/01/2023",
+        "PARTNO": "60334567",
+        "SORDNO_ITM1": "MM067890",
+        "Textbox268": "321",
+        "SMS_ORDER_NUMBER": "89901234",
+        "SO_DESPATCHED_QUANTITY": "12",
+    },
+}
+
+# Sales rows are only joined to, never converted to FinRecData models
+MODEL_TYPES = [Names.TYPE_PKRD, Names.TYPE_FRESH, Names.TYPE_FROZEN, Names.TYPE_NON_NFSI]
+
+
+def rows_per_second(func, rows: int, repeat: int) -> float:
+    """Returns the best observed throughput of func over a number of timed runs"""
+    best = min(timeit.repeat(func, number=rows, repeat=repeat))
+    return rows / best
+
+
+def run(argv=None):
+    """Runs the benchmark for each source data type and prints a results table"""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--rows',
+        required=False,
+        default=50000,
+        type=int,
+        dest='rows',
+        help='Number of rows parsed per timed run'
+    ),
+    parser.add_argument(
+        '--repeat',
+        required=False,
+        default=5,
+        type=int,
+        dest='repeat',
+        help='Number of timed runs, the best of which is reported'
+    )
+    known_args = parser.parse_args(argv)
+
+    print(f'{"Source type":<14}{"computed fields rows/s":>26}{"FinRecData rows/s":>22}')
+    for type, row in SAMPLE_ROWS.items():
+        computed = rows_per_second(lambda: FinRecParsers.add_computed_fields(type, row), known_args.rows, known_args.repeat)
+        if type in MODEL_TYPES:
+            model = f'{rows_per_second(lambda: FinRecData.from_dataset(type, row), known_args.rows, known_args.repeat):>22,.0f}'
+        else:
+            model = f'{"-":>22}'
+        print(f'{type:<14}{computed:>26,.0f}{model}')
+
+
+if __name__ == '__main__':
+    run()
+
+# fmt: on
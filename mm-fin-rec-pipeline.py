@@ -17,12 +17,20 @@ This pipeline example implements the following steps:
 import argparse
 import logging
 import apache_beam as beam
-from apache_beam.io.textio import ReadFromText
+from apache_beam.io.filesystems import FileSystems
+from apache_beam.io.textio import ReadAllFromText, ReadFromText
 from apache_beam.options.pipeline_options import PipelineOptions
 from modules.BigQueryUtils import BigQueryUtils
-from modules.CsvFileUtils import CsvFileUtils
+from modules.BloomFilter import BloomFilter
+from modules.Compression import Compression
 from modules.Filters import Filters
+from modules.Fingerprints import Fingerprints
 from modules.FinRecData import FinRecData
+from modules.FinRecParsers import FinRecParsers
+from modules.FileUtils import FileUtils
+from modules.InputPrefetch import InputPrefetch
+from modules.LookupCache import LookupCache
+from modules.Manifest import Manifest
 from modules.Mappers import Mappers
 from modules.Names import Names
 from modules.Parsers import Parsers
@@ -30,15 +38,23 @@ from modules.Pricing import Pricing
 from modules.SummaryTotal import SummaryTotal
 from modules.Variance import Variance
 from modules.Transforms import (
-    AggregateVariance, 
     CalculateVarianceTotals, 
     CollectionAsDecodeDict, 
+    ColumnarDatasetIngestAndEnrich,
     CsvToDict, 
     DatasetIngestAndEnrich, 
+    DedupFingerprints,
+    EnrichWithLookup,
+    HashLeftJoin,
     LeftJoin, 
     LoadIntoBigQuery,
+    MultiGrainVariance,
     NFSIDataEnrichAndTransform,
+    ReadCsvColumns,
     SideInputAsDecodeDict,
+    ToFinRecData,
+    ToMoneyValues,
+    TranscodeCsv,
     write_data_as_csv
 )
 
@@ -58,43 +74,43 @@ def run(argv=None):
         '--pkrd',
         required=True,
         dest='pkrd',
-        help='Path to PKRD input dataset e.g. local file or GCS path'
+        help='Path to PKRD input dataset e.g. local file or GCS path, glob pattern or directory'
     ),
     parser.add_argument(
         '--sales',
         required=True,
         dest='sales_order',
-        help='Path to Sales Order input dataset e.g. local file or GCS path'
+        help='Path to Sales Order input dataset e.g. local file or GCS path, glob pattern or directory'
     ),
     parser.add_argument(
         '--pricing',
         required=True,
         dest='pricing',
-        help='Path to Transfer Pricing input dataset e.g. local file or GCS path'
+        help='Path to Transfer Pricing input dataset e.g. local file or GCS path, glob pattern or directory'
     ),   
     parser.add_argument(
         '--depot',
         required=True,
         dest='depot',
-        help='Path to Depot reference dataset e.g. local file or GCS path'
+        help='Path to Depot reference dataset e.g. local file or GCS path, glob pattern or directory'
     ),        
     parser.add_argument(
         '--fresh',
         required=True,
         dest='fresh',
-        help='Path to NFSI Fresh input dataset e.g. local file or GCS path'
+        help='Path to NFSI Fresh input dataset e.g. local file or GCS path, glob pattern or directory'
     ),  
     parser.add_argument(
         '--frozen',
         required=True,
         dest='frozen',
-        help='Path to NFSI Frozen input dataset e.g. local file or GCS path'
+        help='Path to NFSI Frozen input dataset e.g. local file or GCS path, glob pattern or directory'
     ),  
     parser.add_argument(
         '--non-nfsi',
         required=True,
         dest='non_nfsi',
-        help='Path to Non-NFSI input dataset e.g. local file or GCS path'
+        help='Path to Non-NFSI input dataset e.g. local file or GCS path, glob pattern or directory'
     ),   
     parser.add_argument(
         '--start-date',
@@ -136,6 +152,147 @@ def run(argv=None):
         required=False,
         dest='output',
         help='Path to directory for output files'
+    ),
+    parser.add_argument(
+        '--columnar-ingest',
+        required=False,
+        default=False,
+        dest='columnar_ingest',
+        help='Flag indicating whether to read input datasets in columnar chunks of the mapped columns only'
+    ),
+    parser.add_argument(
+        '--batch-models',
+        required=False,
+        default=False,
+        dest='batch_models',
+        help='Flag indicating whether to build FinRecData models from columnar batches of rows'
+    ),
+    parser.add_argument(
+        '--fingerprint-scheme',
+        required=False,
+        default=Fingerprints.DEFAULT_SCHEME,
+        choices=Fingerprints.SCHEMES,
+        dest='fingerprint_scheme',
+        help='Hash scheme for record fingerprints. sha256 writes the fingerprint column, compact schemes write fingerprint_id'
+    ),
+    parser.add_argument(
+        '--join-strategy',
+        required=False,
+        default=HashLeftJoin.JOIN_AUTO,
+        choices=HashLeftJoin.JOIN_STRATEGIES,
+        dest='join_strategy',
+        help='Join to Sales by shuffle (CoGroupByKey), hash (Sales as side input) or auto based on Sales input size'
+    ),
+    parser.add_argument(
+        '--hash-join-max-mb',
+        required=False,
+        default=HashLeftJoin.DEFAULT_MAX_RIGHT_BYTES >> 20,
+        type=int,
+        dest='hash_join_max_mb',
+        help='Largest Sales input size in MB joined by hash join when join strategy is auto'
+    ),
+    parser.add_argument(
+        '--hot-key-threshold',
+        required=False,
+        default=0,
+        type=int,
+        dest='hot_key_threshold',
+        help='Row count at which a shuffle join key is salted across workers. 0 disables hot key handling'
+    ),
+    parser.add_argument(
+        '--join-report-top-n',
+        required=False,
+        default=0,
+        type=int,
+        dest='join_report_top_n',
+        help='Number of largest shuffle join key groups to report as metrics. 0 disables the report'
+    ),
+    parser.add_argument(
+        '--fixed-point-money',
+        required=False,
+        default=False,
+        dest='fixed_point_money',
+        help='Flag indicating whether to hold monetary values as exact integer 1e-5 units until output'
+    ),
+    parser.add_argument(
+        '--project-columns',
+        required=False,
+        default=True,
+        dest='project_columns',
+        help='Flag indicating whether to drop input columns not read by the data models before joins. Disable to carry every CSV column when debugging'
+    ),
+    parser.add_argument(
+        '--limit-outputs-to-report-dates',
+        required=False,
+        default=False,
+        dest='limit_outputs_to_report_dates',
+        help='Flag indicating whether to drop PKRD and NFSI input rows outside the report date range at ingest. This narrows every output, FinRecData, all variance grains and the report totals, to the range. By default only the frozen depot SKU grain is limited to it'
+    ),
+    parser.add_argument(
+        '--state-dir',
+        required=False,
+        default=None,
+        dest='state_dir',
+        help='Path to directory holding the manifest of processed input files and variance partials. Enables incremental runs over new PKRD and NFSI input files'
+    ),
+    parser.add_argument(
+        '--full-refresh',
+        required=False,
+        default=False,
+        dest='full_refresh',
+        help='Flag indicating whether an incremental run ignores the stored manifest and variance partials, processing all input files'
+    ),
+    parser.add_argument(
+        '--fingerprint-dir',
+        required=False,
+        default=None,
+        dest='fingerprint_dir',
+        help='Path to directory of FinRecData fingerprint sets exported per load month and record date. Enables dropping rows already loaded this month before BigQuery writes'
+    ),
+    parser.add_argument(
+        '--fingerprint-fp-rate',
+        required=False,
+        default=BloomFilter.DEFAULT_FP_RATE,
+        type=float,
+        dest='fingerprint_fp_rate',
+        help='False positive rate of the Bloom filter of fingerprints already loaded this month. 0 reads the full fingerprint sets as a side input instead'
+    ),
+    parser.add_argument(
+        '--fingerprint-capacity',
+        required=False,
+        default=DedupFingerprints.DEFAULT_CAPACITY,
+        type=int,
+        dest='fingerprint_capacity',
+        help='Number of fingerprints per load month the Bloom filter is sized for at its false positive rate'
+    ),
+    parser.add_argument(
+        '--lookup-cache-dir',
+        required=False,
+        default=None,
+        dest='lookup_cache_dir',
+        help='Path to directory of depot and transfer pricing look-ups cached by source file content. Enables loading look-ups once per worker process instead of rebuilding side inputs each run'
+    ),
+    parser.add_argument(
+        '--input-metadata-cache',
+        required=False,
+        default=None,
+        dest='input_metadata_cache',
+        help='Path to JSON file caching the header, size, generation and row estimate of each input file. Reruns over unchanged inputs skip reading their headers'
+    ),
+    parser.add_argument(
+        '--transcode-dir',
+        required=False,
+        default=None,
+        dest='transcode_dir',
+        help='Path to directory of sharded gzip copies of gzip, bzip2 and zstd compressed PKRD, Sales and NFSI input files. Enables a pre-stage transcoding compressed files, which are read whole by one worker, so they are read in parallel'
+    ),
+    parser.add_argument(
+        '--transcode-shards',
+        required=False,
+        default=16,
+        type=int,
+        dest='transcode_shards',
+        help='Number of shards each compressed input file is transcoded into'
     )
 
     ########################################################### 
@@ -146,6 +303,14 @@ def run(argv=None):
 
     known_args, pipeline_args = parser.parse_known_args(argv)
             
+    # Resolve the files of each CSV input, which may be a glob pattern or directory, with their headers, sizes and row
+    # estimates concurrently before building the graph. Files of the same input must share a header
+    input_metadata = InputPrefetch.prefetch(
+        [known_args.pkrd, known_args.sales_order, known_args.pricing, known_args.fresh, known_args.frozen, known_args.non_nfsi,
+         known_args.depot],
+        known_args.input_metadata_cache
+    )
+
     # Format report date range and effective date if provided
     filter_dates = Parsers.filter_dates(known_args.start_date, known_args.end_date)
 
@@ -155,6 +320,17 @@ def run(argv=None):
     # Parse options flags
     output_to_bq = Parsers.str_to_bool(str(known_args.bq_output))
     output_to_file = Parsers.str_to_bool(str(known_args.file_output))
+    columnar_ingest = Parsers.str_to_bool(str(known_args.columnar_ingest)) == True
+    batch_models = Parsers.str_to_bool(str(known_args.batch_models)) == True
+    fingerprint_scheme = known_args.fingerprint_scheme
+    hash_join = HashLeftJoin.is_preferred(known_args.join_strategy, known_args.sales_order, known_args.hash_join_max_mb << 20,
+                                          right_bytes=input_metadata[known_args.sales_order].content_size)
+    hot_key_threshold = known_args.hot_key_threshold
+    join_report_top_n = known_args.join_report_top_n
+    fixed_point_money = Parsers.str_to_bool(str(known_args.fixed_point_money)) == True
+    project_columns = Parsers.str_to_bool(str(known_args.project_columns)) == True
+    ingest_dates = filter_dates if Parsers.str_to_bool(str(known_args.limit_outputs_to_report_dates)) == True else None
+    fingerprint_fp_rate = known_args.fingerprint_fp_rate if known_args.fingerprint_fp_rate > 0 else None
      
     # Set pipeline options
     pipeline_options = PipelineOptions(pipeline_args)
@@ -163,15 +339,77 @@ def run(argv=None):
     # Define GCP project ID from pipeline options
     gcp_project_id = pipeline_options_dict[Names.GCP_PROJ_KEY]
 
-    # Extract CSV column names from input datasets
-    pkrd_col_names = CsvFileUtils.csv_column_names(known_args.pkrd)
-    sales_order_col_names = CsvFileUtils.csv_column_names(known_args.sales_order)
-    pricing_col_names = CsvFileUtils.csv_column_names(known_args.pricing)
-    fresh_col_names = CsvFileUtils.csv_column_names(known_args.fresh)
-    frozen_col_names = CsvFileUtils.csv_column_names(known_args.frozen)
-    non_nfsi_col_names = CsvFileUtils.csv_column_names(known_args.non_nfsi)
+    # CSV column names of input datasets
+    pkrd_col_names = input_metadata[known_args.pkrd].header
+    sales_order_col_names = input_metadata[known_args.sales_order].header
+    pricing_col_names = input_metadata[known_args.pricing].header
+    fresh_col_names = input_metadata[known_args.fresh].header
+    frozen_col_names = input_metadata[known_args.frozen].header
+    non_nfsi_col_names = input_metadata[known_args.non_nfsi].header
     depot_col_names = [Names.DEPOT_ID, Names.DEPOT_NAME, Names.DEPOT_CATEGORY]
 
+    # Incremental runs ingest only the PKRD and NFSI files missing from the manifest, merging their variance partials
+    # with those stored by previous runs. Sales and reference data are always read in full
+    pkrd_source = input_metadata[known_args.pkrd].source
+    fresh_source = input_metadata[known_args.fresh].source
+    frozen_source = input_metadata[known_args.frozen].source
+    non_nfsi_source = input_metadata[known_args.non_nfsi].source
+    sales_order_source = input_metadata[known_args.sales_order].source
+    pricing_source = input_metadata[known_args.pricing].source
+    depot_source = input_metadata[known_args.depot].source
+    previous_partials = None
+    partials_output = None
+    if bool(known_args.state_dir):
+        full_refresh = Parsers.str_to_bool(str(known_args.full_refresh)) == True
+        manifest = Manifest() if full_refresh else Manifest.read(known_args.state_dir)
+        if manifest.partials is not None and manifest.fixed_point != fixed_point_money:
+            raise ValueError('Stored variance partials were built with fixed point money {}. Rerun with a full refresh to change mode'.format(
+                manifest.fixed_point))
+        if manifest.partials is not None and manifest.ingest_dates != Manifest.date_window(ingest_dates):
+            raise ValueError('Stored variance partials were built with ingest dates {}. Rerun with a full refresh to change them'.format(
+                manifest.ingest_dates))
+        pkrd_files = manifest.unprocessed(Manifest.scan(pkrd_source))
+        fresh_files = manifest.unprocessed(Manifest.scan(fresh_source))
+        frozen_files = manifest.unprocessed(Manifest.scan(frozen_source))
+        non_nfsi_files = manifest.unprocessed(Manifest.scan(non_nfsi_source))
+        pkrd_source = [entry.path for entry in pkrd_files]
+        fresh_source = [entry.path for entry in fresh_files]
+        frozen_source = [entry.path for entry in frozen_files]
+        non_nfsi_source = [entry.path for entry in non_nfsi_files]
+        logging.info('Incremental run over %d new input files', len(pkrd_files + fresh_files + frozen_files + non_nfsi_files))
+        previous_partials = manifest.partials
+        partials_output = FileSystems.join(known_args.state_dir, 'variance-partials', FileUtils.ts_str(), 'partials')
+
+    # Compressed PKRD, Sales and NFSI files cannot be split, so each is read whole by one worker. Optionally they are
+    # first transcoded into sharded gzip files, reused while the source file is unchanged, which are read in parallel
+    if bool(known_args.transcode_dir):
+        transcode_inputs = [known_args.pkrd, known_args.sales_order, known_args.fresh, known_args.frozen, known_args.non_nfsi]
+        transcoded = {}
+        pending = {}
+        for metadata in (metadata for input in transcode_inputs for metadata in input_metadata[input].files):
+            if not Compression.is_compressed(metadata.path) or len(metadata.header) == 0:
+                continue
+            prefix = Compression.transcoded_prefix(known_args.transcode_dir, metadata.path, metadata.generation)
+            shards = Compression.transcoded_shards(prefix)
+            if shards is None:
+                pending[metadata.path] = (prefix, metadata.header)
+            else:
+                transcoded[metadata.path] = shards
+        if len(pending) > 0:
+            logging.info('Transcoding %d compressed input files into %d shards each', len(pending), known_args.transcode_shards)
+            with beam.Pipeline(options=pipeline_options) as transcode_pipeline:
+                for i, (path, (prefix, header)) in enumerate(pending.items()):
+                    transcode_pipeline | 'Transcode input {}'.format(i) >> TranscodeCsv(path, header, prefix, known_args.transcode_shards)
+            for path, (prefix, _) in pending.items():
+                transcoded[path] = Compression.transcoded_shards(prefix)
+                if transcoded[path] is None:
+                    raise ValueError('Transcoding input {} did not write all shards of {}'.format(path, prefix))
+        pkrd_source = Compression.with_transcoded(pkrd_source, input_metadata[known_args.pkrd].paths, transcoded)
+        fresh_source = Compression.with_transcoded(fresh_source, input_metadata[known_args.fresh].paths, transcoded)
+        frozen_source = Compression.with_transcoded(frozen_source, input_metadata[known_args.frozen].paths, transcoded)
+        non_nfsi_source = Compression.with_transcoded(non_nfsi_source, input_metadata[known_args.non_nfsi].paths, transcoded)
+        sales_order_source = Compression.with_transcoded(sales_order_source, input_metadata[known_args.sales_order].paths, transcoded)
+
     ########################################################### 
     # 
     #              EXECUTE PIPELINE
@@ -180,27 +418,30 @@ def run(argv=None):
 
     with beam.Pipeline(options=pipeline_options) as p:
 
-        # Ingest Depot reference data as side-input for dataset enrichment 
-        depots_decode = (
-            p
-            | 'Depots side input' >> SideInputAsDecodeDict(known_args.depot,
-                                                     depot_col_names,
-                                                     Names.TYPE_DEPOTS,
-                                                     Names.DEPOT_ID)            
-        )
-
         # Ingest Transfer Pricing data
         pricing_data = (
             p
-            | 'Read Pricing CSV' >> ReadFromText(known_args.pricing, skip_header_lines=1)
+            | 'Read Pricing CSV' >> ReadFromText(pricing_source, skip_header_lines=1)
             | 'Pricing to dictionary' >> beam.ParDo(CsvToDict(), pricing_col_names)
         )
 
-        # Create a keyed decode side-input for Transfer Pricing
-        pricing_decode = (
-            pricing_data
-            | 'Pricing as look-up' >> beam.CombineGlobally(CollectionAsDecodeDict(Names.TP_SKU))            
-        )   
+        # Depot and Transfer Pricing look-ups are either read from the look-up cache, building any missing cache
+        # file at launch, or built by the pipeline as keyed decode side-inputs
+        if bool(known_args.lookup_cache_dir):
+            depots_decode = LookupCache.ensure(known_args.lookup_cache_dir, Names.TYPE_DEPOTS, input_metadata[known_args.depot].paths, depot_col_names, Names.DEPOT_ID)
+            pricing_decode = LookupCache.ensure(known_args.lookup_cache_dir, Names.TYPE_PRICING, input_metadata[known_args.pricing].paths, pricing_col_names, Names.TP_SKU)
+        else:
+            depots_decode = (
+                p
+                | 'Depots side input' >> SideInputAsDecodeDict(depot_source,
+                                                         depot_col_names,
+                                                         Names.TYPE_DEPOTS,
+                                                         Names.DEPOT_ID)            
+            )
+            pricing_decode = (
+                pricing_data
+                | 'Pricing as look-up' >> beam.CombineGlobally(CollectionAsDecodeDict(Names.TP_SKU))            
+            )   
          
         # Transform Transfer Pricing to data model 
         pricing = (
@@ -208,11 +449,32 @@ def run(argv=None):
             | 'Pricing to model' >> beam.Map(Pricing.from_dataset).with_output_types(Pricing)
         ) 
 
+        # Ingest sales order data, optionally reading only the mapped columns in columnar chunks
+        if columnar_ingest:
+            sales_data = (
+                p
+                | 'Read Sales Order CSV columns'
+                >> (ReadCsvColumns(sales_order_source, sales_order_col_names, FinRecParsers.source_columns(Names.TYPE_SALES),
+                                   type=Names.TYPE_SALES) if project_columns
+                    else ReadCsvColumns(sales_order_source, sales_order_col_names, sales_order_col_names))
+            )
+        elif isinstance(sales_order_source, list):
+            sales_data = (
+                p
+                | 'List Sales Order CSV files' >> beam.Create(sales_order_source)
+                | 'Read Sales Order CSV' >> ReadAllFromText(skip_header_lines=1)
+                | 'Sales to dictionary' >> beam.ParDo(CsvToDict(Names.TYPE_SALES if project_columns else None), sales_order_col_names)
+            )
+        else:
+            sales_data = (
+                p
+                | 'Read Sales Order CSV' >> ReadFromText(sales_order_source, skip_header_lines=1)
+                | 'Sales to dictionary' >> beam.ParDo(CsvToDict(Names.TYPE_SALES if project_columns else None), sales_order_col_names)
+            )
+
         # Enrich and transform sales order data to join to PKRD 
         sales = (
-            p
-            | 'Read Sales Order CSV' >> ReadFromText(known_args.sales_order, skip_header_lines=1)
-            | 'Sales to dictionary' >> beam.ParDo(CsvToDict(), sales_order_col_names)
+            sales_data
             | 'Add Sales computed fields' >> beam.Map(Mappers.add_computed_fields, Names.TYPE_SALES)
         )
 
@@ -229,73 +491,92 @@ def run(argv=None):
         )
 
         # Enrich and transform PKRD data to join to Sales
+        ingest_and_enrich = ColumnarDatasetIngestAndEnrich if columnar_ingest else DatasetIngestAndEnrich
         pkrd_sales_extract = (
             p
             | 'Ingest and enrich PKRD'
-            >> DatasetIngestAndEnrich(known_args.pkrd,
-                                      pkrd_col_names,
-                                      Names.TYPE_PKRD,
-                                      depots_decode)
+            >> ingest_and_enrich(pkrd_source,
+                                 pkrd_col_names,
+                                 Names.TYPE_PKRD,
+                                 depots_decode,
+                                 project_columns,
+                                 ingest_dates)
             | 'Add pricing to PKRD'
-            >> beam.Map(Mappers.add_pricing_data_fields, beam.pvalue.AsSingleton(pricing_decode))
+            >> EnrichWithLookup(Mappers.add_pricing_data_fields, pricing_decode)
             | 'PKRD sales extract'
-            >> beam.Map(Mappers.subset_for_join, Names.SKU_MO)
+            >> beam.Map(Mappers.project_for_join, Names.SKU_MO, FinRecParsers.model_columns(Names.TYPE_PKRD) if project_columns else None)
         )
 
         # Join PKRD to Sales to add NFSI Order Number. Transform rows to FinRecData model
-        # Note : input data is filtered to remove any records with move orders starting 'SS'
+        # Note : input data is filtered at ingest to remove any records with move orders starting 'SS' or depots 'CSL'
         pkrd = ((
             {Names.TYPE_PKRD: pkrd_sales_extract, Names.TYPE_SALES: sales_pkrd_extract}
             )
             | 'Join PKRD to Sales'
-            >> LeftJoin(Names.TYPE_PKRD, Names.TYPE_SALES)
+            >> (HashLeftJoin(Names.TYPE_PKRD, Names.TYPE_SALES) if hash_join
+                else LeftJoin(Names.TYPE_PKRD, Names.TYPE_SALES, hot_key_threshold, report_top_n=join_report_top_n))
             | 'PKRD to FinRecData'
-            >> beam.Map(FinRecData.from_pkrd).with_output_types(FinRecData)
-            | 'Filter PKRD moveorders'
-            >> beam.Filter(lambda row: Filters.filter_exclude_moveorder_prefix(row, prefix='SS')).with_input_types(FinRecData)
-            | 'Filter PKRD depots'
-            >> beam.Filter(lambda row: Filters.filter_exclude_depot_id(row, id='CSL')).with_input_types(FinRecData)
+            >> ToFinRecData(Names.TYPE_PKRD, batch_models, fingerprint_scheme=fingerprint_scheme, fixed_point=fixed_point_money)
         )
 
         # Enrich NFSI Fresh data with computed fields and joins to Sales and PKRD. Transform to FinRecData model
         fresh = (
             p
             | 'Enrich and transform Fresh'
-            >> NFSIDataEnrichAndTransform(known_args.fresh, 
+            >> NFSIDataEnrichAndTransform(fresh_source,
                                           fresh_col_names,
                                           Names.TYPE_FRESH,
                                           depots_decode,
-                                          sales_nfsi_extract)                                                                                                                               
+                                          sales_nfsi_extract,
+                                          columnar_ingest,
+                                          hash_join,
+                                          hot_key_threshold,
+                                          join_report_top_n,
+                                          project_columns,
+                                          ingest_dates)                                                                                                                               
             | 'Fresh to FinRecData'
-            >> beam.Map(FinRecData.from_fresh).with_output_types(FinRecData)
+            >> ToFinRecData(Names.TYPE_FRESH, batch_models, fingerprint_scheme=fingerprint_scheme, fixed_point=fixed_point_money)
         )
      
         # Enrich NFSI Frozen data with computed fields and joins to Sales and PKRD. Transform to FinRecData model
         frozen = (
             p
             | 'Enrich and transform Frozen'
-            >> NFSIDataEnrichAndTransform(known_args.frozen, 
+            >> NFSIDataEnrichAndTransform(frozen_source,
                                           frozen_col_names,
                                           Names.TYPE_FROZEN,
                                           depots_decode,
-                                          sales_nfsi_extract)
+                                          sales_nfsi_extract,
+                                          columnar_ingest,
+                                          hash_join,
+                                          hot_key_threshold,
+                                          join_report_top_n,
+                                          project_columns,
+                                          ingest_dates)
             | 'Frozen to FinRecData'
-            >> beam.Map(FinRecData.from_frozen).with_output_types(FinRecData)            
+            >> ToFinRecData(Names.TYPE_FROZEN, batch_models, fingerprint_scheme=fingerprint_scheme, fixed_point=fixed_point_money)            
         )
 
         # Enrich Non-NFSI data with computed fields and joins to Sales and PKRD. Transform to FinRecData model
         non_nfsi = (
             p
             | 'Enrich and transform Non-NFSI'
-            >> NFSIDataEnrichAndTransform(known_args.non_nfsi,
+            >> NFSIDataEnrichAndTransform(non_nfsi_source,
                                           non_nfsi_col_names,
                                           Names.TYPE_NON_NFSI,
                                           depots_decode,
-                                          sales_nfsi_extract)
+                                          sales_nfsi_extract,
+                                          columnar_ingest,
+                                          hash_join,
+                                          hot_key_threshold,
+                                          join_report_top_n,
+                                          project_columns,
+                                          ingest_dates)
             | 'Non-NFSI to FinRecData'
-            >> beam.Map(FinRecData.from_non_nfsi).with_output_types(FinRecData)
+            >> ToFinRecData(Names.TYPE_NON_NFSI, batch_models, fingerprint_scheme=fingerprint_scheme, fixed_point=fixed_point_money)
             | 'Filter Non-NSFI depot category'
-            >> beam.Filter(lambda row: Filters.filter_by_category(row, category=Names.TYPE_NON_NFSI)).with_input_types(FinRecData)
+            >> beam.Filter(lambda row: Filters.filter_by_category(row, category=Names.TYPE_NON_NFSI))
+                .with_input_types(FinRecData.model(fixed_point_money))
         )   
 
         # Flatten PKRD, Fresh, Frozen and Non-NFSI into a single PCollection of FinRecData models
@@ -304,98 +585,45 @@ def run(argv=None):
             | 'Flatten pcolls' >> beam.Flatten()
         )
 
-        # Variance aggregation by Depot by SKU for Frozen
-        var_by_depot_sku_frozen = (
-            fin_rec_data
-            | 'Filter combined data for date range'
-            >> beam.Filter(lambda row: Filters.filter_for_dates(row, dates=filter_dates)).with_input_types(FinRecData)
-            | 'Variance by Frozen, Depot, SKU'
-            >> AggregateVariance(Names.TYPE_FROZEN, ['depot_id', 'depot_category', 'depot_name', 'sku'])   
-            | 'Convert Depot, SKU to model'
-            >> beam.Map(lambda r: Variance.from_result(r, var_type=Names.FROZEN_DEPOT_SKU_VAR)).with_output_types(Variance)
-        )
-
-        # Variance aggregation by SKU for Fresh
-        var_by_sku_fresh = (
-            fin_rec_data  
-            | 'Variance by Fresh, SKU'
-            >> AggregateVariance(Names.TYPE_FRESH, ['depot_category','sku'])
-            | 'Convert Fresh, SKU to model'
-            >> beam.Map(lambda r: Variance.from_result(r, var_type=Names.FRESH_SKU_VAR)).with_output_types(Variance)     
-        )
-
-        # Variance aggregation by SKU for Frozen
-        var_by_sku_frozen = (
+        # Variance aggregation for every report grain in a single pass over the combined data
+        variance_by_grain = (
             fin_rec_data
-            | 'Variance by Frozen, SKU'
-            >> AggregateVariance(Names.TYPE_FROZEN, ['depot_category','sku'])             
-            | 'Convert Frozen, SKU to model'
-            >> beam.Map(lambda r: Variance.from_result(r, var_type=Names.FROZEN_SKU_VAR)).with_output_types(Variance)
-        )
-
-        # Variance aggregation by Moveorder, Fresh
-        var_by_mo_fresh = (
-            fin_rec_data
-            | 'Variance by Fresh, Moveorder'
-            >> AggregateVariance(Names.TYPE_FRESH, ['depot_category','moveorder_short']) 
-            | 'Convert Fresh, Moveorder to model'
-            >> beam.Map(lambda r: Variance.from_result(r, var_type=Names.FRESH_MO_VAR)).with_output_types(Variance)             
+            | 'Variance by grain' >> MultiGrainVariance(Names.VARIANCE_GRAINS, filter_dates, fixed_point_money,
+                                                      previous_partials, partials_output)
         )
+        var_by_depot_sku_frozen = variance_by_grain[Names.FROZEN_DEPOT_SKU_VAR]
+        var_by_sku_fresh = variance_by_grain[Names.FRESH_SKU_VAR]
+        var_by_sku_frozen = variance_by_grain[Names.FROZEN_SKU_VAR]
+        var_by_mo_fresh = variance_by_grain[Names.FRESH_MO_VAR]
+        var_by_mo_non_nfsi = variance_by_grain[Names.NON_NFSI_MO_VAR]
+        var_by_depot_date_frozen = variance_by_grain[Names.FROZEN_DEPOT_DATE_VAR]
 
         # Calculate summary variance, PTD and sales percentage reporting values including ex-GIT values
         fresh_summary_totals = (
             var_by_mo_fresh
-            | 'Calculate summary for Fresh' >> CalculateVarianceTotals(Names.TYPE_FRESH)   
+            | 'Calculate summary for Fresh' >> CalculateVarianceTotals(Names.TYPE_FRESH, fixed_point=fixed_point_money)   
             | 'Convert Fresh result to summary model'
-            >> beam.Map(lambda r: SummaryTotal.from_result(r)).with_output_types(SummaryTotal)                                                                                             
+            >> beam.Map(lambda r: SummaryTotal.from_result(r, fixed_point=fixed_point_money))
+                .with_output_types(SummaryTotal.model(fixed_point_money))
         )
 
-        # Variance aggregation by Moveorder, Non-NFSI
-        var_by_mo_non_nfsi = (
-            fin_rec_data
-            | 'Variance by Non-NFSI, Moveorder'
-            >> AggregateVariance(Names.TYPE_NON_NFSI, ['depot_category','moveorder_short'])
-            | 'Convert Non-NFSI, Moveorder to model'
-            >> beam.Map(lambda r: Variance.from_result(r, var_type=Names.NON_NFSI_MO_VAR)).with_output_types(Variance)  
-        )   
-
         # Calculate summary variance, PTD and sales percentage reporting values including ex-GIT values
         non_nfsi_summary_totals = (
             var_by_mo_non_nfsi
-            | 'Calculate summary for Non-NFSI' >> CalculateVarianceTotals(Names.TYPE_NON_NFSI)   
+            | 'Calculate summary for Non-NFSI' >> CalculateVarianceTotals(Names.TYPE_NON_NFSI, fixed_point=fixed_point_money)   
             | 'Convert Non-NFSI result to summary model'
-            >> beam.Map(lambda r: SummaryTotal.from_result(r)).with_output_types(SummaryTotal)                                                                                      
-        )
-
-        # Variance aggregation by Depot, Date, Frozen (Goods in transit ?)
-        var_by_depot_date_frozen = (
-            fin_rec_data
-            | 'Variance for Frozen, Depot, Date'
-            >> AggregateVariance(Names.TYPE_FROZEN, ['depot_category', 'depot_id', 'depot_name', 'record_date'])
-            | 'Convert Depot, Date, Frozen to model'
-            >> beam.Map(lambda r: Variance.from_result(r, var_type=Names.FROZEN_DEPOT_DATE_VAR)).with_output_types(Variance)                                       
-        ) 
-
-        # Flatten variance results into a single PCollection
-        variance_datasets = (
-            [
-                var_by_depot_sku_frozen,
-                var_by_sku_fresh,
-                var_by_sku_frozen,
-                var_by_mo_fresh,
-                var_by_mo_non_nfsi,
-                var_by_depot_date_frozen
-            ]
-            | 'Flatten variance datasets into single collection' >> beam.Flatten()
+            >> beam.Map(lambda r: SummaryTotal.from_result(r, fixed_point=fixed_point_money))
+                .with_output_types(SummaryTotal.model(fixed_point_money))
         )
 
         # Calculate summary variance, PTD and sales percentage reporting values including ex-GIT values
         frozen_summary_totals = (
             var_by_depot_date_frozen
             | 'Calculate summary for Frozen'
-            >> CalculateVarianceTotals(Names.TYPE_FROZEN)   
+            >> CalculateVarianceTotals(Names.TYPE_FROZEN, fixed_point=fixed_point_money)   
             | 'Convert Frozen result to summary model'
-            >> beam.Map(lambda r: SummaryTotal.from_result(r)).with_output_types(SummaryTotal)                                                                                                 
+            >> beam.Map(lambda r: SummaryTotal.from_result(r, fixed_point=fixed_point_money))
+                .with_output_types(SummaryTotal.model(fixed_point_money))
         )        
 
         # Flatten summary totals into single PCollection
@@ -418,7 +646,8 @@ def run(argv=None):
                     .aggregate_field('git_quantity_sum', sum, 'sum_git_quantity')
                     .aggregate_field('git_value_sum', sum, 'sum_git_value') 
             | 'Convert grand totals to summary model'
-            >> beam.Map(lambda r: SummaryTotal.from_result(r)).with_output_types(SummaryTotal)                                                    
+            >> beam.Map(lambda r: SummaryTotal.from_result(r, fixed_point=fixed_point_money))
+                .with_output_types(SummaryTotal.model(fixed_point_money))
         )
 
         # Flatten summary and grand total collections
@@ -427,6 +656,30 @@ def run(argv=None):
             | 'Flatten summary and grand totals' >> beam.Flatten()
         )
 
+        # Convert fixed point money units back to float values for output
+        if fixed_point_money:
+            fin_rec_data = fin_rec_data | 'FinRecData for output' >> ToMoneyValues(FinRecData)
+            var_by_depot_sku_frozen = var_by_depot_sku_frozen | 'Frozen, Depot, SKU for output' >> ToMoneyValues(Variance)
+            var_by_sku_fresh = var_by_sku_fresh | 'Fresh, SKU for output' >> ToMoneyValues(Variance)
+            var_by_sku_frozen = var_by_sku_frozen | 'Frozen, SKU for output' >> ToMoneyValues(Variance)
+            var_by_mo_fresh = var_by_mo_fresh | 'Fresh, Moveorder for output' >> ToMoneyValues(Variance)
+            var_by_mo_non_nfsi = var_by_mo_non_nfsi | 'Non-NFSI, Moveorder for output' >> ToMoneyValues(Variance)
+            var_by_depot_date_frozen = var_by_depot_date_frozen | 'Frozen, Depot, Date for output' >> ToMoneyValues(Variance)
+            summary_report = summary_report | 'Summary report for output' >> ToMoneyValues(SummaryTotal)
+
+        # Flatten variance results into a single PCollection
+        variance_datasets = (
+            [
+                var_by_depot_sku_frozen,
+                var_by_sku_fresh,
+                var_by_sku_frozen,
+                var_by_mo_fresh,
+                var_by_mo_non_nfsi,
+                var_by_depot_date_frozen
+            ]
+            | 'Flatten variance datasets into single collection' >> beam.Flatten()
+        )
+
         ########################################################### 
         # 
         #   OPTIONALLY LOAD PROCESSED RESULT SETS INTO BIGQUERY
@@ -447,8 +700,20 @@ def run(argv=None):
                 >> LoadIntoBigQuery(Names.TABLE_FIN_REC_PRICING, Names.DATASET_INTERNAL, gcp_project_id)
             )
 
+            # Optionally drop rows loaded earlier in the month, as fin_rec_data_view would when deduplicating on fingerprint
+            fin_rec_data_for_bq = fin_rec_data
+            if bool(known_args.fingerprint_dir):
+                fingerprint_month = metadata_fields[Names.UTC_TS].strftime('%Y%m')
+                fingerprint_run_id = FileUtils.ts_str()
+                fin_rec_data_for_bq = (
+                    fin_rec_data
+                    | 'Dedup FinRecData fingerprints'
+                    >> DedupFingerprints(known_args.fingerprint_dir, fingerprint_month, fingerprint_run_id,
+                                         fp_rate=fingerprint_fp_rate, capacity=known_args.fingerprint_capacity)
+                )
+
             _ = (
-                fin_rec_data
+                fin_rec_data_for_bq
                 | 'Format FinRecData for BigQuery'
                 >> beam.Map(lambda row: row.bigquery_dict(metadata_plus_valid_from)).with_input_types(FinRecData)
                 | 'Write FinRecData to BigQuery'
@@ -556,6 +821,18 @@ def run(argv=None):
             #     | 'Write report grand totals'
             #     >> WriteDataAsCsv(f'{known_args.output}/report-totals', 'fin-rec-report-totals')
             # )                                              
+
+    # Publish the fingerprints of the rows loaded into BigQuery once the pipeline, and so the load, has succeeded
+    if output_to_bq == True and bool(known_args.fingerprint_dir):
+        DedupFingerprints.publish(known_args.fingerprint_dir, fingerprint_month, fingerprint_run_id)
+
+    # Record the processed files and their merged variance partials once the pipeline has succeeded
+    if bool(known_args.state_dir):
+        manifest.add(pkrd_files + fresh_files + frozen_files + non_nfsi_files)
+        manifest.partials = partials_output + '*'
+        manifest.fixed_point = fixed_point_money
+        manifest.ingest_dates = Manifest.date_window(ingest_dates)
+        manifest.write(known_args.state_dir)
         
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.INFO)
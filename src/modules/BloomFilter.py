@@ -0,0 +1,114 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Serialisable Bloom filter class for fingerprint set membership
+"""
+
+__all__ = ["BloomFilter"]
+
+import hashlib
+import math
+import struct
+from apache_beam.io.filesystems import FileSystems
+
+class BloomFilter(object):
+    """Compact probabilistic set of string keys. Membership tests never miss an added key, and report a key
+    that was not added with a false positive rate bounded by the rate the filter was sized for, while no
+    more keys than its capacity have been added. Bit positions are derived by double hashing one 128 bit
+    BLAKE2b digest per key. Filters serialise to a small fixed header followed by the bit array"""
+
+    DEFAULT_FP_RATE = 0.001
+    MAGIC = b'FRBF'
+    _HEADER = struct.Struct('<4sQIQQ')
+
+    def __init__(self, num_bits: int, num_hashes: int, capacity: int = 0, count: int = 0, bits: bytearray = None):
+        if num_bits < 1 or num_hashes < 1:
+            raise ValueError('Bloom filter needs at least one bit and one hash function')
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.capacity = capacity
+        self.count = count
+        self.bits = bytearray((num_bits + 7) // 8) if bits is None else bits
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float = DEFAULT_FP_RATE):
+        """Returns an empty filter sized for a number of keys at a false positive rate"""
+        if not 0 < fp_rate < 1:
+            raise ValueError(f'Bloom filter false positive rate must be between 0 and 1, got {fp_rate}')
+        capacity = max(1, capacity)
+        num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes, capacity)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def add_all(self, keys):
+        """Adds an iterable of keys, returning the filter"""
+        for key in keys:
+            self.add(key)
+        return self
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BloomFilter):
+            return (self.num_bits, self.num_hashes, self.bits) == (other.num_bits, other.num_hashes, other.bits)
+        return NotImplemented
+
+    def copy(self):
+        return BloomFilter(self.num_bits, self.num_hashes, self.capacity, self.count, bytearray(self.bits))
+
+    def merge(self, other):
+        """Adds the keys of another filter with the same sizing in place, returning the filter"""
+        if (self.num_bits, self.num_hashes) != (other.num_bits, other.num_hashes):
+            raise ValueError('Bloom filters of different sizes cannot be merged')
+        merged = int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little')
+        self.bits = bytearray(merged.to_bytes(len(self.bits), 'little'))
+        self.count += other.count
+        return self
+
+    @property
+    def size_in_bytes(self) -> int:
+        return len(self.bits)
+
+    def to_bytes(self) -> bytes:
+        return self._HEADER.pack(self.MAGIC, self.num_bits, self.num_hashes, self.capacity, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        magic, num_bits, num_hashes, capacity, count = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError('Data is not a serialised Bloom filter')
+        bits = bytearray(data[cls._HEADER.size:])
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError('Serialised Bloom filter is truncated')
+        return cls(num_bits, num_hashes, capacity, count, bits)
+
+    @classmethod
+    def read(cls, path: str):
+        """Returns the filter stored in a file"""
+        with FileSystems.open(path) as f:
+            return cls.from_bytes(f.read())
+
+    def write(self, path: str):
+        """Stores the filter in a file"""
+        with FileSystems.create(path) as f:
+            f.write(self.to_bytes())
+
+# fmt: on
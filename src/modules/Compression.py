@@ -0,0 +1,116 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Compressed input file handling class
+"""
+
+__all__ = ["Compression", "DecompressedRangeReader"]
+
+import bz2
+import hashlib
+import re
+import zlib
+from apache_beam.io.filesystem import CompressionTypes
+from apache_beam.io.filesystems import FileSystems
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class Compression(object):
+    """Detects input file compression from the file extension, as Beam text and file reads do, and names the
+    sharded gzip files unsplittable compressed inputs are transcoded to. Gzip, bzip2 and zstd are supported"""
+
+    SUPPORTED = [CompressionTypes.GZIP, CompressionTypes.BZIP2, CompressionTypes.ZSTD]
+    TRANSCODE_SUFFIX = '.csv.gz'
+    # Arrow codec names, for reading compressed files as Arrow input streams
+    ARROW_CODECS = {CompressionTypes.GZIP: 'gzip', CompressionTypes.BZIP2: 'bz2', CompressionTypes.ZSTD: 'zstd'}
+
+    @classmethod
+    def detect(cls, path: str) -> str:
+        """Returns the compression type of a file, raising ValueError for compressed formats not supported"""
+        compression = CompressionTypes.detect_compression_type(path)
+        if compression != CompressionTypes.UNCOMPRESSED and compression not in cls.SUPPORTED:
+            raise ValueError(f'Input {path} is {compression} compressed, expected one of {cls.SUPPORTED}')
+        return compression
+
+    @classmethod
+    def is_compressed(cls, path: str) -> bool:
+        """True if a file is compressed. Compressed files are read whole by one worker, as they cannot be split"""
+        return cls.detect(path) != CompressionTypes.UNCOMPRESSED
+
+    @classmethod
+    def decompressor(cls, compression: str):
+        """Returns a streaming decompressor object with a decompress method for a compression type"""
+        if compression == CompressionTypes.GZIP:
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if compression == CompressionTypes.BZIP2:
+            return bz2.BZ2Decompressor()
+        if compression == CompressionTypes.ZSTD:
+            if zstandard is None:
+                raise ValueError('Zstd compressed inputs require the zstandard package')
+            return zstandard.ZstdDecompressor().decompressobj()
+        raise ValueError(f'No decompressor for {compression}')
+
+    @classmethod
+    def transcoded_prefix(cls, transcode_dir: str, path: str, generation: str) -> str:
+        """Returns the shard path prefix for a compressed file transcoded at a generation"""
+        digest = hashlib.sha256(f'{path}#{generation}'.encode('utf-8')).hexdigest()[:16]
+        name = re.sub(r'\.(csv\.)?[^./]+$', '', path.rstrip('/').split('/')[-1])
+        return FileSystems.join(transcode_dir, f'{name}-{digest}', 'part')
+
+    @classmethod
+    def transcoded_shards(cls, prefix: str) -> list[str] | None:
+        """Returns the shard paths written for a prefix, or None unless every shard of the write is present"""
+        match_result = FileSystems.match([f'{prefix}-*-of-*{cls.TRANSCODE_SUFFIX}'])[0]
+        paths = sorted(metadata.path for metadata in match_result.metadata_list)
+        totals = {int(re.search(r'-of-(\d+)', path).group(1)) for path in paths}
+        return paths if len(paths) > 0 and totals == {len(paths)} else None
+
+    @classmethod
+    def with_transcoded(cls, source: str | list[str], paths: list[str], transcoded: dict[str, list[str]]) -> str | list[str]:
+        """Returns the source to read for input files, a list of their paths with transcoded files replaced by their
+        shards, or the source unchanged if none of its files were transcoded. A list source holds the input paths"""
+        paths = source if isinstance(source, list) else paths
+        if not any(path in transcoded for path in paths):
+            return source
+        return [shard for path in paths for shard in transcoded.get(path, [path])]
+
+class DecompressedRangeReader(object):
+    """Reads byte ranges of the decompressed content of a file from its start, through a reader of compressed
+    byte ranges. Ranges must be read in ascending order, as content is decompressed as a stream. Only the
+    compressed bytes needed to cover the ranges read are fetched"""
+
+    def __init__(self, read_range, compression: str, range_bytes: int = 64 << 10):
+        self._read_range = read_range
+        self._decompressor = Compression.decompressor(compression)
+        self._range_bytes = range_bytes
+        self._data = b''
+        self._offset = 0
+        self.compressed_bytes_read = 0
+        self.eof = False
+
+    def __call__(self, start: int, end: int) -> bytes:
+        while self._offset + len(self._data) < end and not self.eof:
+            chunk = self._read_range(self.compressed_bytes_read, self.compressed_bytes_read + self._range_bytes)
+            self.compressed_bytes_read += len(chunk)
+            if len(chunk) == 0:
+                self.eof = True
+                break
+            self._data += self._decompressor.decompress(chunk)
+            if getattr(self._decompressor, 'eof', False):
+                self.eof = True
+        # Content before the earliest range still to be read is dropped
+        if start > self._offset:
+            self._data = self._data[start - self._offset:]
+            self._offset = start
+        return self._data[start - self._offset:end - self._offset]
+
+    @property
+    def decompressed_bytes(self) -> int:
+        """Decompressed content bytes produced so far, the whole content size once eof is reached"""
+        return self._offset + len(self._data)
+
+# fmt: on
@@ -7,8 +7,11 @@ CSV File handling utility class
 
 __all__ = ["CsvFileUtils, EXTRA_COLS_KEY, MISSING_COLS_VALUE"]
 
+import io
 from modules.FileUtils import FileUtils
-from csv import reader, DictReader
+from csv import reader, writer, DictReader, Error as CsvError
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 
 class CsvFileUtils(object):
     """CSV File handling utility class"""
@@ -16,6 +19,7 @@ class CsvFileUtils(object):
     EXTRA_COLS_KEY='extras'
     MISSING_COLS_VALUE='MISSING_COLUMN_INPUT'
     TS_FORMAT='%Y%m%d'
+    DEFAULT_BLOCK_SIZE=8 << 20
 
     @classmethod
     def csv_column_names(cls, f) -> list[str]:
@@ -34,12 +38,17 @@ class CsvFileUtils(object):
     def csv_column_names_from_local_file(cls, f):
         """Returns CSV column names from local file"""   
         try:
-            with open(f, encoding='utf-8-sig',mode='r') as csv_file:
-                header_row = csv_file.readline().strip()
-            return next(reader([header_row]))
+            return FileUtils.get_local_csv_column_names(f)
         except OSError as ex:
             print('Error loading file [%s] : %s', f, ex)
 
+    @classmethod
+    def csv_line(cls, values: list[str]) -> str:
+        """Returns values formatted as a CSV row, without a line terminator"""
+        line = io.StringIO()
+        writer(line, lineterminator='').writerow(values)
+        return line.getvalue()
+
     @classmethod
     def csv_row_as_dict(cls, row, csv_cols) -> dict:
         """Returns a single CSV row as a dict, tagging any malformed rows"""
@@ -55,6 +64,64 @@ class CsvFileUtils(object):
         except Exception as ex:
             print('Error parsing CSV row "%s" --> [%s]', row, ex)
 
+    @classmethod
+    def csv_rows_as_dicts(cls, rows: list[str], csv_cols) -> list[dict]:
+        """Returns a batch of CSV rows as dicts decoded by a single reader, tagging any malformed rows"""
+        try:
+            parsed_rows = list(reader(rows))
+        except CsvError:
+            parsed_rows = []
+        if len(parsed_rows) != len(rows):
+            # Quoted values spanning lines or unreadable rows misalign the batch so decode row by row
+            return [d for d in (cls.csv_row_as_dict(row, csv_cols) for row in rows) if d is not None]
+
+        col_count = len(csv_cols)
+        dicts = []
+        for values in parsed_rows:
+            # Blank lines are skipped, as per DictReader
+            if not values:
+                continue
+            d = dict(zip(csv_cols, values))
+            value_count = len(values)
+            if value_count > col_count:
+                d[cls.EXTRA_COLS_KEY] = values[col_count:]
+            elif value_count < col_count:
+                for col in csv_cols[value_count:]:
+                    d[col] = cls.MISSING_COLS_VALUE
+            dicts.append(d)
+        return dicts
+
+    @classmethod
+    def arrow_input_stream(cls, raw_file, codec: str = None):
+        """Wraps a file opened without decompression as an Arrow input stream, decompressing it with an Arrow codec if
+        given. Beam decompressing file objects are not read by Arrow, as their closed attribute is a method"""
+        stream = pa.PythonFile(raw_file, mode='r')
+        return stream if codec is None else pa.CompressedInputStream(stream, codec)
+
+    @classmethod
+    def csv_record_batches(cls, csv_file, columns: list[str], block_size: int = DEFAULT_BLOCK_SIZE, invalid_rows: list = None):
+        """Yields CSV file contents as Arrow record batches of string columns, reading only the listed columns.
+        Rows with the wrong number of values are skipped and their text appended to invalid_rows if provided"""
+        def skip_invalid_row(row):
+            if invalid_rows is not None:
+                invalid_rows.append(row.text)
+            return 'skip'
+
+        batch_reader = pa_csv.open_csv(
+            csv_file,
+            read_options=pa_csv.ReadOptions(block_size=block_size, use_threads=False),
+            parse_options=pa_csv.ParseOptions(invalid_row_handler=skip_invalid_row),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=columns,
+                column_types={col: pa.string() for col in columns},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False
+            )
+        )
+        for batch in batch_reader:
+            if batch.num_rows > 0:
+                yield batch
+
     @classmethod
     def is_row_well_formed(cls, row, csv_cols, schema_cols) -> bool:
         """Validates row column names, column count and row length against schema"""
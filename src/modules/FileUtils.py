@@ -7,14 +7,26 @@ File handling utility class
 
 __all__ = ["FileUtils"]
 
+import hashlib
+import io
+from csv import reader
 from pathlib import Path
 from datetime import datetime
-from google.cloud import storage
+from apache_beam.io.filesystems import FileSystems
+from modules.Compression import Compression, DecompressedRangeReader
+from modules.StorageBackend import GcsStorageBackend, LocalStorageBackend, StorageBackend
 
 class FileUtils(object):
-    """File handling utility class"""
+    """File handling utility class. Files are read through the storage backend for their path, which is the
+    pooled GCS backend for gs:// paths and the local backend otherwise, unless a backend is registered for a prefix"""
 
     GCS_PREFIX = 'gs:'
+    HASH_BLOCK_SIZE = 8 << 20
+    HEADER_RANGE_BYTES = 64 << 10
+
+    _gcs_backend = GcsStorageBackend()
+    _local_backend = LocalStorageBackend()
+    _registered_backends = {}
 
     @classmethod
     def is_gcs_path(cls, f) -> bool:
@@ -22,34 +34,96 @@ class FileUtils(object):
         file_path = Path(f)
         return file_path.parts[0] == cls.GCS_PREFIX
     
+    @classmethod
+    def register_storage_backend(cls, prefix: str, backend: StorageBackend | None):
+        """Reads paths starting with a prefix through a backend, or stops doing so if the backend is None"""
+        if backend is None:
+            cls._registered_backends.pop(prefix, None)
+        else:
+            cls._registered_backends[prefix] = backend
+
+    @classmethod
+    def storage_backend(cls, f) -> StorageBackend:
+        """Returns the storage backend reading a file path"""
+        for prefix, backend in cls._registered_backends.items():
+            if str(f).startswith(prefix):
+                return backend
+        return cls._gcs_backend if cls.is_gcs_path(f) else cls._local_backend
+
+    @classmethod
+    def get_csv_column_names(cls, f):
+        """Gets first row of a file e.g. CSV header row, reading only the leading byte ranges that hold it"""
+        return cls.csv_header_from_ranges(cls.range_reader(f))
+
+    @classmethod
+    def range_reader(cls, f):
+        """Returns a reader of byte ranges of the content of a file through its storage backend. Gzip, bzip2 and zstd
+        files, detected by extension, are decompressed from their start, so ranges must be read in ascending order"""
+        backend = cls.storage_backend(f)
+        read_range = lambda start, end: backend.read_range(f, start, end)
+        if not Compression.is_compressed(f):
+            return read_range
+        return DecompressedRangeReader(read_range, Compression.detect(f))
+
     @classmethod
     def get_gcs_csv_column_names(cls, f):
-        """Gets first line of GCS file e.g. CSV header row"""
-        file_bytes = FileUtils.get_gcs_file_as_bytes(f)
-        first_row_bytes = file_bytes.split(b'\n')[0]
-        first_row_str = first_row_bytes.decode('utf-8-sig')
-        return first_row_str.rstrip().split(',')
-    
+        """Gets first row of GCS file e.g. CSV header row, downloading only the leading byte ranges that hold it"""
+        return cls.get_csv_column_names(f)
+
+    @classmethod
+    def get_local_csv_column_names(cls, f):
+        """Gets first row of local file e.g. CSV header row, reading the same leading byte ranges as for GCS"""
+        return cls.get_csv_column_names(f)
+
+    @classmethod
+    def csv_header_from_ranges(cls, read_range, range_bytes: int = HEADER_RANGE_BYTES) -> list[str]:
+        """Parses the first CSV row of a file read through a byte range reader, fetching ranges of doubling size
+        until the row ends or the file does. A newline ends the row only outside quoted values, so quoted names
+        may hold commas and newlines. A UTF-8 byte order mark is dropped"""
+        data = b''
+        while True:
+            chunk = read_range(len(data), len(data) + range_bytes)
+            data += chunk
+            end = cls.first_row_end(data)
+            if end is not None:
+                data = data[:end]
+                break
+            if len(chunk) < range_bytes:
+                break
+            range_bytes *= 2
+        header_row = data.decode('utf-8-sig').rstrip()
+        return next(reader(io.StringIO(header_row, newline='')), [])
+
+    @classmethod
+    def first_row_end(cls, data: bytes) -> int | None:
+        """Position of the first newline outside quoted CSV values, if any"""
+        quotes = 0
+        start = 0
+        end = data.find(b'\n')
+        while end != -1:
+            quotes += data.count(b'"', start, end)
+            if quotes % 2 == 0:
+                return end
+            start = end
+            end = data.find(b'\n', end + 1)
+        return None
+
     @classmethod
     def get_gcs_file_as_text(cls, f):
         """GCS blob for file as text"""
-        blob = FileUtils.get_gcs_file_blob(f)
-        return blob.download_as_text()
+        return cls.storage_backend(f).read_text(f)
 
     @classmethod
     def get_gcs_file_as_bytes(cls, f):
         """GCS blob for file as bytes"""
-        blob = FileUtils.get_gcs_file_blob(f)
-        return blob.download_as_bytes()
+        return cls.storage_backend(f).read_bytes(f)
 
     @classmethod
     def get_gcs_file_blob(cls, f):
-        """Returns GCS file as Blob"""
+        """Returns GCS file as Blob, using the process-wide storage client"""
         bucket_name = FileUtils.get_gcs_file_bucket_name(f)
         file_path = FileUtils.get_gcs_file_path(f)
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        return bucket.blob(file_path)
+        return GcsStorageBackend.client().bucket(bucket_name).blob(file_path)
 
     @classmethod
     def get_gcs_file_bucket_name(cls, f) -> str:
@@ -65,6 +139,23 @@ class FileUtils(object):
         file_path = "/".join(file_path_parts)
         return file_path
     
+    @classmethod
+    def total_size_bytes(cls, pattern) -> int:
+        """Total size in bytes of the local or GCS files matching a path or glob pattern"""
+        match_result = FileSystems.match([pattern])[0]
+        return sum(metadata.size_in_bytes for metadata in match_result.metadata_list)
+
+    @classmethod
+    def checksum(cls, path: str) -> str:
+        """Content hash of a file, taken from GCS object metadata or by hashing local file content"""
+        if cls.is_gcs_path(path):
+            return FileSystems.checksum(path)
+        sha = hashlib.sha256()
+        with FileSystems.open(path) as f:
+            for block in iter(lambda: f.read(cls.HASH_BLOCK_SIZE), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
     @classmethod
     def ts_str(cls, format: str = '%Y%m%d%H%M%S') -> str:
         """Generates a UNIX epoch timestamp string"""
@@ -7,7 +7,9 @@ Filters module
 
 __all__ = ["Filters"]
 
+from datetime import date
 from modules.FinRecData import FinRecData
+from modules.FinRecParsers import FinRecParsers
 from modules.Names import Names
 
 class Filters(object):
@@ -26,14 +28,19 @@ class Filters(object):
     @classmethod
     def filter_for_dates(cls, row: FinRecData, dates: dict) -> bool:
         """Returns true if range is empty or if row date is in the populated range"""
+        return cls.in_date_range(row.record_date, dates)
+
+    @classmethod
+    def in_date_range(cls, record_date: date, dates: dict) -> bool:
+        """Returns true if range is empty or if date is in the populated range"""
         start = dates.get(Names.START_DATE, None)
         end = dates.get(Names.END_DATE, None)
         if bool(start) and bool(end):
-            return (row.record_date >= start and row.record_date <= end)
+            return (record_date >= start and record_date <= end)
         elif bool(start):
-            return row.record_date >= start
+            return record_date >= start
         elif bool(end):
-            return row.record_date <= end
+            return record_date <= end
         else:
             return True
         
@@ -46,5 +53,26 @@ class Filters(object):
     def filter_exclude_depot_id(cls, row: FinRecData, id: str) -> bool:
         """Returns true if depot ID does NOT start with specified ID"""
         return row.depot_id.startswith(id) == False    
+
+    @classmethod
+    def filter_source_row(cls, data, type: str, dates: dict | None = None) -> bool:
+        """Returns true if a raw source row passes the exclusions declared in Names for its type and, if provided,
+        the date range. Fields are parsed as FinRecData.from_dataset parses them, so filtering at ingest keeps
+        exactly the rows the equivalent FinRecData filters would"""
+        plan = FinRecParsers.plan(type)
+        prefixes = Names.EXCLUDED_MO_PREFIXES.get(type, [])
+        if len(prefixes) > 0 and plan.short_moveorder(data).startswith(tuple(prefixes)):
+            return False
+        ids = Names.EXCLUDED_DEPOT_IDS.get(type, [])
+        if len(ids) > 0 and plan.depot_id(data).startswith(tuple(ids)):
+            return False
+        if bool(dates):
+            return cls.in_date_range(plan.record_date(data), dates)
+        return True
+
+    @classmethod
+    def has_source_filters(cls, type: str, dates: dict | None = None) -> bool:
+        """Returns true if filter_source_row can exclude rows of a source data type"""
+        return bool(dates) or type in Names.EXCLUDED_MO_PREFIXES or type in Names.EXCLUDED_DEPOT_IDS
         
 # fmt: on
\ No newline at end of file
@@ -0,0 +1,202 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Fin Rec data batch builder class
+"""
+
+__all__ = ["FinRecBatch"]
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from modules.Fingerprints import Fingerprints
+from modules.FinRecData import FinRecData
+from modules.FinRecParserPlan import FinRecParserPlan
+from modules.FinRecParsers import FinRecParsers
+from modules.Names import Names
+
+class FinRecBatch(object):
+    """Builds FinRecData models from a columnar batch of rows for a single source data type.
+
+    String keys are derived with Arrow compute kernels and value parsers run once per distinct
+    value rather than once per row. Results are identical to FinRecData.from_dataset; batches the
+    columnar path cannot reproduce exactly (e.g. rows without depot fields) are converted row by row.
+    Null values are treated as absent keys"""
+
+    @classmethod
+    def batch_columns(cls, type: str) -> list[str]:
+        """Returns the row keys read by FinRecData.from_dataset for a source data type"""
+        return FinRecParsers.model_columns(type)
+
+    @classmethod
+    def from_dicts(cls, type: str, rows: list, fingerprint_scheme: str = Fingerprints.DEFAULT_SCHEME, fixed_point: bool = False) -> list[FinRecData]:
+        """Returns FinRecData models for a batch of row dicts of one source data type"""
+        try:
+            table = pa.table({
+                key: pa.array([row.get(key, None) for row in rows])
+                for key in cls.batch_columns(type)
+            })
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return [FinRecData.from_dataset(type, row, fingerprint_scheme, fixed_point) for row in rows]
+
+        # Drop columns absent from every row so parsers fall back to their defaults
+        absent = [name for name in table.column_names if table.column(name).null_count == table.num_rows]
+        table = table.drop_columns(absent)
+        if not cls.is_exact(table):
+            return [FinRecData.from_dataset(type, row, fingerprint_scheme, fixed_point) for row in rows]
+        return cls.from_table(type, table, fingerprint_scheme, fixed_point)
+
+    @classmethod
+    def is_exact(cls, table: pa.Table) -> bool:
+        """True if the columnar path reproduces the row by row conversion for the table"""
+        # Rows without depot fields raise a KeyError in the row path
+        return all(
+            name in table.column_names and table.column(name).null_count == 0
+            for name in (Names.DEPOT_NAME, Names.DEPOT_CATEGORY)
+        )
+
+    @classmethod
+    def from_table(cls, type: str, table: pa.Table, fingerprint_scheme: str = Fingerprints.DEFAULT_SCHEME, fixed_point: bool = False) -> list[FinRecData]:
+        """Returns FinRecData models for an Arrow table or record batch of one source data type"""
+        cols = Names.COLS[type]
+        plan = FinRecParsers.plan(type, fixed_point)
+        size = table.num_rows
+        is_pkrd = type == Names.TYPE_PKRD
+
+        record_date = cls.map_distinct(table, cols[Names.DATE_KEY], plan.record_date)
+        item_id = cls.item_numbers(table, type)
+        mo = cls.short_moveorders(table, type)
+        lot_no = cls.map_distinct(table, cols[Names.LOT_KEY], plan.lot_number) if is_pkrd else [''] * size
+        depot_id = cls.depot_ids(table, type)
+        order_no = cls.map_distinct(table, cols[Names.ORDER_KEY], plan.order_number)
+        sku_mo = cls.composite_keys(item_id, mo)
+        sku_and_order = cls.composite_keys(item_id, order_no)
+        depot_name = table.column(Names.DEPOT_NAME).to_pylist()
+        depot_category = table.column(Names.DEPOT_CATEGORY).to_pylist()
+
+        if is_pkrd:
+            unit_price = cls.map_distinct(table, Names.UNIT_PRICE, plan.unit_price)
+            case_price = cls.map_distinct(table, Names.CASE_PRICE, plan.case_price)
+            pkrd_qty = cls.map_distinct(table, cols[Names.PKRD_QTY_KEY], plan.pkrd_qty)
+            pkrd_val = cls.map_distinct(table, cols[Names.PKRD_VAL_KEY], plan.pkrd_val)
+            pkrd_val_tp = [
+                q * p if fixed_point else round((q * p), 5)
+                for q, p in zip(pkrd_qty, case_price)
+            ]
+            nfsi_qty = [0] * size
+            nfsi_val = [0] * size
+        else:
+            unit_price = [0] * size
+            case_price = [0] * size
+            pkrd_qty = cls.map_distinct(table, Names.PKRD_QTY, plan.pkrd_qty)
+            pkrd_val = cls.map_distinct(table, Names.PKRD_VAL, plan.pkrd_val)
+            pkrd_val_tp = cls.map_distinct(table, Names.PKRD_VAL_TP, plan.pkrd_val_tp)
+            nfsi_qty = cls.map_distinct(table, cols[Names.NFSI_QTY_KEY], plan.nfsi_qty)
+            nfsi_val = cls.map_distinct(table, cols[Names.NFSI_VAL_KEY], plan.nfsi_val)
+
+        # Float sums are rounded per value to match Python round() exactly, fixed point sums are exact
+        qty_var = [p + n for p, n in zip(pkrd_qty, nfsi_qty)]
+        if fixed_point:
+            value_var = [p + n for p, n in zip(pkrd_val, nfsi_val)]
+            value_var_tp = [p + n for p, n in zip(pkrd_val_tp, nfsi_val)]
+        else:
+            value_var = [round(p + n, 4) for p, n in zip(pkrd_val, nfsi_val)]
+            value_var_tp = [round(p + n, 4) for p, n in zip(pkrd_val_tp, nfsi_val)]
+
+        hasher = Fingerprints.hasher(fingerprint_scheme)
+        fingerprint, fingerprint_id = zip(*[
+            hasher(f'{rd}{type}{smo}{sao}{dep}{lot}{pq}{nq}')
+            for rd, smo, sao, dep, lot, pq, nq
+            in zip(record_date, sku_mo, sku_and_order, depot_id, lot_no, pkrd_qty, nfsi_qty)
+        ])
+
+        return list(map(FinRecData.model(fixed_point)._make, zip(
+            record_date,
+            [type] * size,
+            item_id,
+            mo,
+            lot_no,
+            depot_id,
+            depot_name,
+            depot_category,
+            sku_mo,
+            order_no,
+            sku_and_order,
+            unit_price,
+            case_price,
+            pkrd_qty,
+            pkrd_val,
+            pkrd_val_tp,
+            nfsi_qty,
+            nfsi_val,
+            qty_var,
+            value_var,
+            value_var_tp,
+            fingerprint,
+            fingerprint_id
+        )))
+
+    @classmethod
+    def map_distinct(cls, table: pa.Table, col: str, parser) -> list:
+        """Applies a parser plan field parser once per distinct column value and gathers results per row"""
+        if col not in table.column_names:
+            return [parser({})] * table.num_rows
+        encoded = pc.dictionary_encode(table.column(col).combine_chunks())
+        distinct = encoded.dictionary.to_pylist()
+        results = np.empty(len(distinct) + 1, dtype=object)
+        results[:] = [parser({col: v}) for v in distinct] + [parser({})]
+        indices = pc.fill_null(encoded.indices, len(distinct))
+        return results[indices.to_numpy(zero_copy_only=False)].tolist()
+
+    @classmethod
+    def item_numbers(cls, table: pa.Table, type: str) -> list[str]:
+        """Item numbers with the NFSI SKU offset applied by casting digit strings to integers"""
+        col = Names.COLS[type][Names.SKU_KEY]
+        if col not in table.column_names or type not in (Names.TYPE_FRESH, Names.TYPE_FROZEN, Names.TYPE_NON_NFSI):
+            return cls.map_distinct(table, col, FinRecParsers.plan(type).item_number)
+        items = pc.fill_null(table.column(col).combine_chunks(), '')
+        lengths = pc.utf8_length(items)
+        if type == Names.TYPE_NON_NFSI:
+            mask = pc.and_(pc.greater(lengths, 1), pc.less(lengths, 8))
+        else:
+            mask = pc.greater(lengths, 0)
+        try:
+            offset = pc.cast(pc.add(pc.cast(pc.filter(items, mask), pa.int64()), FinRecParserPlan.SKU_OFFSET), pa.string())
+        except pa.ArrowInvalid:
+            # Values int() accepts but Arrow does not e.g. signs or whitespace
+            return cls.map_distinct(table, col, FinRecParsers.plan(type).item_number)
+        return pc.replace_with_mask(items, mask, offset).to_pylist()
+
+    @classmethod
+    def short_moveorders(cls, table: pa.Table, type: str) -> list[str]:
+        """Move orders truncated at the first '/' for PKRD and Sales"""
+        col = Names.COLS[type][Names.MO_KEY]
+        if col not in table.column_names:
+            return cls.map_distinct(table, col, FinRecParsers.plan(type).short_moveorder)
+        mo = pc.fill_null(table.column(col).combine_chunks(), Names.MISSING_MO)
+        if type == Names.TYPE_PKRD or type == Names.TYPE_SALES:
+            mo = pc.list_element(pc.split_pattern(mo, '/', max_splits=1), 0)
+        return mo.to_pylist()
+
+    @classmethod
+    def depot_ids(cls, table: pa.Table, type: str) -> list[str]:
+        """Depot IDs taken from the last three characters for Fresh and Frozen"""
+        col = Names.COLS[type][Names.DEPOT_KEY]
+        if col not in table.column_names:
+            return cls.map_distinct(table, col, FinRecParsers.plan(type).depot_id)
+        depot = pc.fill_null(table.column(col).combine_chunks(), '')
+        if type == Names.TYPE_FRESH or type == Names.TYPE_FROZEN:
+            depot = pc.utf8_slice_codeunits(depot, start=-3)
+        return depot.to_pylist()
+
+    @classmethod
+    def composite_keys(cls, prefixes: list, suffixes: list) -> list[str]:
+        """Vectorised equivalent of Parsers.composite_key"""
+        def key_part(values):
+            arr = pa.array(values, type=pa.string())
+            present = pc.fill_null(pc.greater(pc.utf8_length(arr), 0), False)
+            return pc.if_else(present, arr, Names.MISSING)
+        return pc.binary_join_element_wise(key_part(prefixes), key_part(suffixes), '_').to_pylist()
+
+# fmt: on
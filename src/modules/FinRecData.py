@@ -5,14 +5,16 @@
 Fin Rec data model class
 """
 
-__all__ = ["FinRecData"]
+__all__ = ["FinRecData", "FinRecDataUnits"]
 
+from apache_beam import coders
 from typing import NamedTuple, Optional
 from datetime import date
+from modules.Fingerprints import Fingerprints
 from modules.FinRecParsers import FinRecParsers
+from modules.Money import Money
 from modules.Names import Names
 from modules.Parsers import Parsers
-import hashlib
 
 # Schema for merged PKRD and NFSI dataset
 class FinRecData(NamedTuple):
@@ -37,8 +39,17 @@ class FinRecData(NamedTuple):
     quantity_variance: float
     value_variance: float
     value_variance_tp: float
-    fingerprint: str
+    fingerprint: Optional[str]
+    fingerprint_id: Optional[int] = None
+
+    # Monetary fields held as integer money units in fixed point mode
+    MONEY_FIELDS = ['pkrd_unit_price', 'pkrd_case_price', 'pkrd_value', 'pkrd_value_tp', 'nfsi_value', 'value_variance', 'value_variance_tp']
                     
+    @classmethod
+    def model(cls, fixed_point: bool = False) -> type:
+        """Returns the model type for a money mode, FinRecDataUnits with money fields as int64 units in fixed point mode"""
+        return FinRecDataUnits if fixed_point else cls
+
     def bigquery_dict(self, metadata_fields: dict) -> dict:
         """Returns instance as dict keyed on BigQuery table column names"""
         d = self._asdict()
@@ -62,28 +73,33 @@ class FinRecData(NamedTuple):
         return cls.from_dataset(Names.TYPE_NON_NFSI, data)    
 
     @classmethod
-    def from_dataset(cls, type_const: str, data: dict):   
-        record_date = FinRecParsers.record_date(type_const, data)
+    def from_dataset(cls, type_const: str, data: dict, fingerprint_scheme: str = Fingerprints.DEFAULT_SCHEME, fixed_point: bool = False):   
+        plan = FinRecParsers.plan(type_const, fixed_point)
+        record_date = plan.record_date(data)
         type = type_const
-        item_id = FinRecParsers.item_number(type_const, data)
-        mo = FinRecParsers.short_moveorder(type_const, data)
-        lot_no = FinRecParsers.lot_number(type_const, data)
-        depot_id = FinRecParsers.depot_id(type_const, data)
+        item_id = plan.item_number(data)
+        mo = plan.short_moveorder(data)
+        lot_no = plan.lot_number(data)
+        depot_id = plan.depot_id(data)
         depot_name = data[Names.DEPOT_NAME]
         depot_category = data[Names.DEPOT_CATEGORY]
         sku_mo = Parsers.composite_key(item_id, mo)
-        order_no = FinRecParsers.order_number(type_const, data)
+        order_no = plan.order_number(data)
         sku_and_order = Parsers.composite_key(item_id, order_no)
-        unit_price = FinRecParsers.unit_price(type_const, data)
-        case_price = FinRecParsers.case_price(type_const, data)
-        pkrd_qty = FinRecParsers.pkrd_qty(type_const, data)
-        pkrd_val = FinRecParsers.pkrd_val(type_const, data)
-        pkrd_val_tp = FinRecParsers.pkrd_val_tp(type_const, data) 
-        nfsi_qty = FinRecParsers.nfsi_qty(type_const, data)
-        nfsi_val = FinRecParsers.nfsi_val(type_const, data)  
+        unit_price = plan.unit_price(data)
+        case_price = plan.case_price(data)
+        pkrd_qty = plan.pkrd_qty(data)
+        pkrd_val = plan.pkrd_val(data)
+        pkrd_val_tp = plan.pkrd_val_tp(data) 
+        nfsi_qty = plan.nfsi_qty(data)
+        nfsi_val = plan.nfsi_val(data)  
         qty_var = pkrd_qty + nfsi_qty
         value_var = pkrd_val + nfsi_val
         value_var_tp = pkrd_val_tp + nfsi_val      
+        # Float value variances are rounded to 4DP. Fixed point variances keep the exact 5DP sum of their units
+        if not fixed_point:
+            value_var = round(value_var, 4)
+            value_var_tp = round(value_var_tp, 4)
         hash_input = (
             f'{record_date}'
             f'{type}'
@@ -94,8 +110,8 @@ class FinRecData(NamedTuple):
             f'{pkrd_qty}'
             f'{nfsi_qty}'
         )
-        fingerprint_str = hashlib.sha256(hash_input.encode('utf-8')).hexdigest()
-        return cls(
+        fingerprint_str, fingerprint_id = Fingerprints.hasher(fingerprint_scheme)(hash_input)
+        return cls.model(fixed_point)(
             record_date=record_date,
             source_data_type=type,
             sku=item_id,
@@ -115,9 +131,17 @@ class FinRecData(NamedTuple):
             nfsi_quantity=nfsi_qty,
             nfsi_value=nfsi_val,
             quantity_variance=qty_var,
-            value_variance=round(value_var,4),
-            value_variance_tp=round(value_var_tp,4),
-            fingerprint=fingerprint_str
+            value_variance=value_var,
+            value_variance_tp=value_var_tp,
+            fingerprint=fingerprint_str,
+            fingerprint_id=fingerprint_id
         )
-    
-# fmt: on
\ No newline at end of file
+
+# Fixed point variant of FinRecData with money fields schema coded as INT64 units
+FinRecDataUnits = Money.units_model(FinRecData, int_fields=['quantity_variance'])
+
+# Encode FinRecData with the schema aware RowCoder rather than pickling
+coders.registry.register_coder(FinRecData, coders.RowCoder)
+coders.registry.register_coder(FinRecDataUnits, coders.RowCoder)
+
+# fmt: on
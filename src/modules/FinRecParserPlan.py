@@ -0,0 +1,128 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Fin Rec per source type parser plan class
+"""
+
+__all__ = ["FinRecParserPlan"]
+
+from datetime import date
+from typing import Callable
+from modules.Money import Money
+from modules.Names import Names
+from modules.Parsers import Parsers
+
+class FinRecParserPlan(object):
+    """Field parsers for a single source data type.
+
+    Column names and source type branches are resolved once when the plan is built,
+    so each field parser is a single callable taking the row dict. With fixed_point set, monetary
+    fields are parsed to exact integer money units and PKRD TP values are not rounded"""
+
+    SKU_OFFSET = 60000000
+
+    def __init__(self, type: str, fixed_point: bool = False):
+        cols = Names.COLS[type]
+        is_pkrd = type == Names.TYPE_PKRD
+        self.type = type
+        self.fixed_point = fixed_point
+        self.record_date = self._record_date(cols[Names.DATE_KEY])
+        self.short_moveorder = self._short_moveorder(cols[Names.MO_KEY], is_pkrd or type == Names.TYPE_SALES)
+        self.item_number = self._item_number(cols[Names.SKU_KEY], type)
+        self.lot_number = self._value(cols[Names.LOT_KEY], '') if is_pkrd else self._constant('')
+        self.depot_id = self._depot_id(cols[Names.DEPOT_KEY], type == Names.TYPE_FRESH or type == Names.TYPE_FROZEN)
+        self.order_number = self._value(cols[Names.ORDER_KEY], None)
+        if is_pkrd:
+            self.unit_price = self._price(Names.UNIT_PRICE, fixed_point)
+            self.case_price = self._price(Names.CASE_PRICE, fixed_point)
+            self.pkrd_qty = self._int_value(cols[Names.PKRD_QTY_KEY])
+            self.pkrd_val = self._float_value(cols[Names.PKRD_VAL_KEY], fixed_point)
+            self.pkrd_val_tp = self._pkrd_val_tp(self.pkrd_qty, self.case_price, fixed_point)
+            self.nfsi_qty = self._constant(0)
+            self.nfsi_val = self._constant(0)
+        else:
+            self.unit_price = self._constant(0)
+            self.case_price = self._constant(0)
+            self.pkrd_qty = self._value(Names.PKRD_QTY, 0)
+            self.pkrd_val = self._value(Names.PKRD_VAL, 0)
+            self.pkrd_val_tp = self._value(Names.PKRD_VAL_TP, 0)
+            self.nfsi_qty = self._int_value(cols[Names.NFSI_QTY_KEY])
+            self.nfsi_val = self._float_value(cols[Names.NFSI_VAL_KEY], fixed_point)
+
+    def computed_fields(self, data: dict) -> dict:
+        """Returns the computed key fields added to every ingested row"""
+        sku = self.item_number(data)
+        order = self.order_number(data)
+        mo = self.short_moveorder(data)
+        return {
+            Names.DEPOT_ID: self.depot_id(data),
+            Names.MO_SHORT: mo,
+            Names.ORDER_ID: order,
+            Names.SKU: sku,
+            Names.SKU_MO: Parsers.composite_key(sku, mo),
+            Names.SKU_ORDER: Parsers.composite_key(sku, order),
+        }
+
+    @staticmethod
+    def _constant(value) -> Callable[[dict], object]:
+        return lambda data: value
+
+    @staticmethod
+    def _value(col: str, default) -> Callable[[dict], object]:
+        return lambda data: data.get(col, default)
+
+    @staticmethod
+    def _record_date(col: str) -> Callable[[dict], date]:
+        return lambda data: Parsers.str_to_date(data.get(col, None), Parsers.MAX_DATE)
+
+    @staticmethod
+    def _short_moveorder(col: str, truncate: bool) -> Callable[[dict], str]:
+        if truncate:
+            return lambda data: data.get(col, Names.MISSING_MO).split('/')[0]
+        return lambda data: data.get(col, Names.MISSING_MO)
+
+    @classmethod
+    def _item_number(cls, col: str, type: str) -> Callable[[dict], str]:
+        offset = cls.SKU_OFFSET
+        if type == Names.TYPE_FRESH or type == Names.TYPE_FROZEN:
+            def item_number(data: dict) -> str:
+                item_id = data.get(col, '')
+                return str(int(item_id) + offset) if len(item_id) > 0 else item_id
+            return item_number
+        if type == Names.TYPE_NON_NFSI:
+            def item_number(data: dict) -> str:
+                item_id = data.get(col, '')
+                return str(int(item_id) + offset) if 1 < len(item_id) < 8 else item_id
+            return item_number
+        return cls._value(col, '')
+
+    @staticmethod
+    def _depot_id(col: str, slice_last_three: bool) -> Callable[[dict], str]:
+        if slice_last_three:
+            return lambda data: data.get(col, '')[-3:]
+        return lambda data: data.get(col, '')
+
+    @staticmethod
+    def _price(col: str, fixed_point: bool) -> Callable[[dict], float | int]:
+        if fixed_point:
+            return lambda data: Money.to_units(float(data.get(col, 0)))
+        return lambda data: float(data.get(col, 0))
+
+    @staticmethod
+    def _int_value(col: str) -> Callable[[dict], int]:
+        return lambda data: Parsers.clean_int_value(data.get(col, '0'))
+
+    @staticmethod
+    def _float_value(col: str, fixed_point: bool) -> Callable[[dict], float | int]:
+        if fixed_point:
+            return lambda data: Parsers.clean_money_value(data.get(col, '0'))
+        return lambda data: Parsers.clean_float_value(data.get(col, '0'))
+
+    @staticmethod
+    def _pkrd_val_tp(qty: Callable[[dict], int], price: Callable[[dict], float], fixed_point: bool) -> Callable[[dict], float | int]:
+        if fixed_point:
+            return lambda data: qty(data) * price(data)
+        return lambda data: round((qty(data) * price(data)), 5)
+
+# fmt: on
@@ -8,29 +8,62 @@ Fin Rec data parsing class
 __all__ = ["FinRecParsers"]
 
 from datetime import date
+from modules.FinRecParserPlan import FinRecParserPlan
 from modules.Names import Names
-from modules.Parsers import Parsers
 
 class FinRecParsers(object):
     """Fin Rec data parsing class"""
 
+    # Parser plans keyed on source data type and fixed point money mode
+    _plans = {}
+
+    @classmethod
+    def source_columns(cls, type: str) -> list[str]:
+        """Returns the source column names mapped in Names.COLS for a dataset type"""
+        return [col for col in Names.COLS[type].values() if bool(col)]
+
+    @classmethod
+    def model_columns(cls, type: str) -> list[str]:
+        """Returns the row keys read by FinRecData.from_dataset for a source data type"""
+        cols = Names.COLS[type]
+        keys = [
+            cols[Names.DATE_KEY],
+            cols[Names.SKU_KEY],
+            cols[Names.MO_KEY],
+            cols[Names.DEPOT_KEY],
+            cols[Names.ORDER_KEY],
+            Names.DEPOT_NAME,
+            Names.DEPOT_CATEGORY
+        ]
+        if type == Names.TYPE_PKRD:
+            keys += [
+                cols[Names.LOT_KEY],
+                cols[Names.PKRD_QTY_KEY],
+                cols[Names.PKRD_VAL_KEY],
+                Names.UNIT_PRICE,
+                Names.CASE_PRICE
+            ]
+        else:
+            keys += [
+                cols[Names.NFSI_QTY_KEY],
+                cols[Names.NFSI_VAL_KEY],
+                Names.PKRD_QTY,
+                Names.PKRD_VAL,
+                Names.PKRD_VAL_TP
+            ]
+        return keys
+
+    @classmethod
+    def plan(cls, type: str, fixed_point: bool = False) -> FinRecParserPlan:
+        """Returns the parser plan for a source data type, building it on first use"""
+        plan = cls._plans.get((type, fixed_point), None)
+        if plan is None:
+            plan = cls._plans[(type, fixed_point)] = FinRecParserPlan(type, fixed_point)
+        return plan
+
     @classmethod
     def add_computed_fields(cls, type: str, data: dict) -> dict:
-        depot = cls.depot_id(type, data)
-        sku = cls.item_number(type, data)
-        order = cls.order_number(type, data)
-        mo = cls.short_moveorder(type, data)
-        sku_mo = Parsers.composite_key(sku, mo)
-        sku_order_id = Parsers.composite_key(sku, order)
-
-        return {
-            Names.DEPOT_ID: depot,
-            Names.MO_SHORT: mo,
-            Names.ORDER_ID: order,
-            Names.SKU: sku,
-            Names.SKU_MO: sku_mo,
-            Names.SKU_ORDER: sku_order_id,
-        }
+        return cls.plan(type).computed_fields(data)
             
     @classmethod
     def decode_depot(cls, data: dict, depots: dict) -> dict:
@@ -55,110 +88,54 @@ class FinRecParsers(object):
     
     @classmethod
     def record_date(cls, type: str, data: dict) -> date:
-        cols = Names.COLS[type]
-        rd_str = data.get(cols[Names.DATE_KEY], None)
-        rd_datetime = Parsers.str_to_date(rd_str, Parsers.MAX_DATE)
-        return rd_datetime
+        return cls.plan(type).record_date(data)
 
     @classmethod
     def short_moveorder(cls, type: str, data: dict) -> str:
-        cols = Names.COLS[type]
-        mo = data.get(cols[Names.MO_KEY], Names.MISSING_MO)
-        if len(mo) > 0 and (type == Names.TYPE_PKRD or type == Names.TYPE_SALES):
-            return mo.split('/')[0]
-        else:
-            return mo
-            
+        return cls.plan(type).short_moveorder(data)
+
     @classmethod
     def item_number(cls, type: str, data: dict) -> str:
-        cols = Names.COLS[type]
-        item_id = data.get(cols[Names.SKU_KEY], '')
-        if len(item_id) > 0 and (type == Names.TYPE_FRESH or type == Names.TYPE_FROZEN):
-            return str(int(item_id)+60000000)
-        elif (len(item_id) > 1 and len(item_id) < 8) and type == Names.TYPE_NON_NFSI:
-            return str(int(item_id)+60000000)
-        else:
-            return item_id
-        
+        return cls.plan(type).item_number(data)
+
     @classmethod
     def lot_number(cls, type: str, data: dict) -> str:
-        cols = Names.COLS[type]
-        if type == Names.TYPE_PKRD:
-            return data.get(cols[Names.LOT_KEY], '')
-        else:
-            return ''
-            
+        return cls.plan(type).lot_number(data)
+
     @classmethod
     def depot_id(cls, type: str, data: dict) -> str:
-        cols = Names.COLS[type]
-        depot = data.get(cols[Names.DEPOT_KEY],'')
-        if len(depot) > 0 and (type == Names.TYPE_FRESH or type == Names.TYPE_FROZEN):
-            return depot[-3:]
-        else:
-            return depot
-        
+        return cls.plan(type).depot_id(data)
+
     @classmethod
     def order_number(cls, type: str, data: dict) -> str:
-        cols = Names.COLS[type]
-        return data.get(cols[Names.ORDER_KEY], None)
-    
+        return cls.plan(type).order_number(data)
+
     @classmethod
     def unit_price(cls, type: str, data: dict) -> float:
-        if type == Names.TYPE_PKRD:
-            return float(data.get(Names.UNIT_PRICE,0))
-        else: 
-            return 0
-        
+        return cls.plan(type).unit_price(data)
+
     @classmethod
     def case_price(cls, type: str, data: dict) -> float:
-        if type == Names.TYPE_PKRD:
-            return float(data.get(Names.CASE_PRICE,0))
-        else: 
-            return 0
+        return cls.plan(type).case_price(data)
 
     @classmethod
     def pkrd_qty(cls, type: str, data: dict):
-        cols = Names.COLS[type]
-        if type == Names.TYPE_PKRD:
-            qty = data.get(cols[Names.PKRD_QTY_KEY],'0')
-            return Parsers.clean_int_value(qty)
-        else:
-            return data.get(Names.PKRD_QTY, 0)
-        
+        return cls.plan(type).pkrd_qty(data)
+
     @classmethod
     def pkrd_val(cls, type: str, data: dict):
-        cols = Names.COLS[type]
-        if type == Names.TYPE_PKRD:
-            pval = data.get(cols[Names.PKRD_VAL_KEY],'0')
-            return Parsers.clean_float_value(pval)
-        else:
-            return data.get(Names.PKRD_VAL, 0)
-        
+        return cls.plan(type).pkrd_val(data)
+
     @classmethod
     def pkrd_val_tp(cls, type: str, data: dict):
-        if type == Names.TYPE_PKRD:
-            qty = cls.pkrd_qty(type, data)
-            price = cls.case_price(type, data)
-            return round((qty * price), 5)
-        else:
-            return data.get(Names.PKRD_VAL_TP, 0)
+        return cls.plan(type).pkrd_val_tp(data)
 
     @classmethod
     def nfsi_qty(cls, type: str, data: dict):
-        cols = Names.COLS[type]
-        if type == Names.TYPE_PKRD:
-            return 0
-        else:
-            val = data.get(cols[Names.NFSI_QTY_KEY],'0')
-            return Parsers.clean_int_value(val)
-    
+        return cls.plan(type).nfsi_qty(data)
+
     @classmethod
     def nfsi_val(cls, type: str, data: dict):
-        cols = Names.COLS[type]
-        if type == Names.TYPE_PKRD:
-            return 0
-        else:
-            val = data.get(cols[Names.NFSI_VAL_KEY],'0')
-            return Parsers.clean_float_value(val)
+        return cls.plan(type).nfsi_val(data)
 
 # fmt: on
\ No newline at end of file
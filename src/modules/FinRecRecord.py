@@ -0,0 +1,160 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Fin Rec compact pre-model record class
+"""
+
+__all__ = ["FinRecRecord"]
+
+from modules.FinRecParsers import FinRecParsers
+from modules.Names import Names
+
+class FinRecRecord(object):
+    """Compact dict-like row of one source data type, used between CSV ingest and the FinRecData model.
+
+    Values are held in a list laid out by a field index shared by every record of the type, covering
+    the mapped source columns in Names.COLS, computed, depot, pricing and Sales join fields. Unmapped
+    CSV columns are dropped. Fields outside the layout are kept in an overflow dict. Records pickle
+    as their type and values only, without repeating field names per row"""
+
+    __slots__ = ('_type', '_index', '_values', '_extra')
+
+    # Marker for layout fields not yet set
+    _UNSET = object()
+
+    # Shared field layouts keyed on source data type
+    _layouts = {}
+
+    ENRICHED_FIELDS = [
+        Names.DEPOT_ID,
+        Names.MO_SHORT,
+        Names.ORDER_ID,
+        Names.SKU,
+        Names.SKU_MO,
+        Names.SKU_ORDER,
+        Names.DEPOT_NAME,
+        Names.DEPOT_CATEGORY,
+        Names.UNIT_PRICE,
+        Names.CASE_PRICE,
+        Names.JOIN_MATCH
+    ]
+
+    def __init__(self, type: str, values: list = None, extra: dict = None):
+        self._type = type
+        self._index = self.layout(type)
+        self._values = [self._UNSET] * len(self._index) if values is None else values
+        self._extra = extra
+
+    @classmethod
+    def layout(cls, type: str) -> dict[str, int]:
+        """Returns the field index for a source data type, building it on first use"""
+        index = cls._layouts.get(type, None)
+        if index is None:
+            fields = dict.fromkeys(
+                FinRecParsers.source_columns(type)
+                + cls.ENRICHED_FIELDS
+                + FinRecParsers.source_columns(Names.TYPE_SALES)
+            )
+            index = cls._layouts[type] = {field: i for i, field in enumerate(fields)}
+        return index
+
+    @classmethod
+    def from_dict(cls, type: str, data: dict):
+        """Returns a record holding the layout fields of a row dict, dropping any other columns"""
+        record = cls(type)
+        values = record._values
+        for field, i in record._index.items():
+            if field in data:
+                values[i] = data[field]
+        return record
+
+    @property
+    def type(self) -> str:
+        return self._type
+
+    def slice(self, keys: list[str]):
+        """Returns a record of the same type holding only the provided keys"""
+        record = FinRecRecord(self._type)
+        for key in keys:
+            record[key] = self[key]
+        return record
+
+    def project(self, keys: list[str]):
+        """Returns a record of the same type holding only those of the provided keys that are set"""
+        record = FinRecRecord(self._type)
+        for key in keys:
+            value = self.get(key, self._UNSET)
+            if value is not self._UNSET:
+                record[key] = value
+        return record
+
+    def get(self, key: str, default=None):
+        i = self._index.get(key, None)
+        if i is None:
+            return default if self._extra is None else self._extra.get(key, default)
+        value = self._values[i]
+        return default if value is self._UNSET else value
+
+    def __getitem__(self, key: str):
+        value = self.get(key, self._UNSET)
+        if value is self._UNSET:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        i = self._index.get(key, None)
+        if i is not None:
+            self._values[i] = value
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, self._UNSET) is not self._UNSET
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+
+    def items(self):
+        values = self._values
+        for field, i in self._index.items():
+            if values[i] is not self._UNSET:
+                yield field, values[i]
+        if self._extra is not None:
+            yield from self._extra.items()
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (FinRecRecord, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return 'FinRecRecord({!r}, {!r})'.format(self._type, dict(self.items()))
+
+    def __reduce__(self):
+        values = [None if value is self._UNSET else value for value in self._values]
+        unset = [i for i, value in enumerate(self._values) if value is self._UNSET]
+        return FinRecRecord._restore, (self._type, values, unset, self._extra)
+
+    @classmethod
+    def _restore(cls, type: str, values: list, unset: list, extra: dict):
+        for i in unset:
+            values[i] = cls._UNSET
+        return cls(type, values, extra)
+
+# fmt: on
@@ -0,0 +1,62 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Record fingerprint hashing class
+"""
+
+__all__ = ["Fingerprints"]
+
+import hashlib
+from typing import Callable
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+class Fingerprints(object):
+    """Hashes composite row key values to a record fingerprint using a configurable scheme.
+
+    SHA-256 produces the original 64 character hex string fingerprint. The compact schemes produce a
+    signed 64 bit integer fingerprint ID, stored in the INT64 fingerprint_id column instead"""
+
+    SHA256 = 'sha256'
+    BLAKE2B = 'blake2b'
+    XXHASH = 'xxhash'
+    SCHEMES = [SHA256, BLAKE2B, XXHASH]
+    DEFAULT_SCHEME = SHA256
+
+    @classmethod
+    def hasher(cls, scheme: str = DEFAULT_SCHEME) -> Callable[[str], tuple[str | None, int | None]]:
+        """Returns a function hashing a string to a (fingerprint, fingerprint_id) pair for a scheme"""
+        if scheme == cls.SHA256:
+            return cls.sha256
+        if scheme == cls.BLAKE2B:
+            return cls.blake2b
+        if scheme == cls.XXHASH:
+            if xxhash is None:
+                raise ValueError(f'Fingerprint scheme {scheme} requires the xxhash package')
+            return cls.xxh64
+        raise ValueError(f'Unknown fingerprint scheme {scheme}, expected one of {cls.SCHEMES}')
+
+    @classmethod
+    def partition_key(cls, record_date, fingerprint: str | None, fingerprint_id: int | None) -> str:
+        """Returns the record date partition, fingerprint and fingerprint ID of a row as one comma separated key"""
+        return '{},{},{}'.format(record_date, fingerprint or '', '' if fingerprint_id is None else fingerprint_id)
+
+    @classmethod
+    def sha256(cls, hash_input: str) -> tuple[str, None]:
+        return hashlib.sha256(hash_input.encode('utf-8')).hexdigest(), None
+
+    @classmethod
+    def blake2b(cls, hash_input: str) -> tuple[None, int]:
+        digest = hashlib.blake2b(hash_input.encode('utf-8'), digest_size=8).digest()
+        return None, int.from_bytes(digest, 'big', signed=True)
+
+    @classmethod
+    def xxh64(cls, hash_input: str) -> tuple[None, int]:
+        digest = xxhash.xxh64(hash_input.encode('utf-8')).digest()
+        return None, int.from_bytes(digest, 'big', signed=True)
+
+# fmt: on
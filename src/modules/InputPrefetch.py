@@ -0,0 +1,173 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Launch-time input file metadata prefetch class
+"""
+
+__all__ = ["InputFiles", "InputMetadata", "InputPrefetch"]
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from apache_beam.io.filesystems import FileSystems
+from modules.Compression import DecompressedRangeReader
+from modules.FileUtils import FileUtils
+
+# Schema for the metadata of an input file
+class InputMetadata(NamedTuple):
+    path: str
+    header: list[str]
+    size: int
+    generation: str
+    row_estimate: int
+    content_size: int = None
+
+# Schema for the files matched by an input path, glob pattern or directory
+class InputFiles(NamedTuple):
+    source: str
+    files: list[InputMetadata]
+
+    @property
+    def paths(self) -> list[str]:
+        return [metadata.path for metadata in self.files]
+
+    @property
+    def header(self) -> list[str]:
+        """Header shared by the input files, ignoring empty files"""
+        return next((metadata.header for metadata in self.files if len(metadata.header) > 0), [])
+
+    @property
+    def size(self) -> int:
+        return sum(metadata.size for metadata in self.files)
+
+    @property
+    def row_estimate(self) -> int:
+        return sum(metadata.row_estimate for metadata in self.files)
+
+    @property
+    def content_size(self) -> int:
+        """Size of the input content, estimated after decompression for compressed files"""
+        return sum(metadata.size if metadata.content_size is None else metadata.content_size for metadata in self.files)
+
+class InputPrefetch(object):
+    """Resolves the metadata of the pipeline input files concurrently before the graph is built. Inputs are a
+    file path, a glob pattern or a directory, read as all the files it holds. Each file is stat'ed for its size
+    and generation, and its leading bytes, decompressed for gzip, bzip2 and zstd files, are sampled for the CSV
+    header and a row count estimate. Every file of an input must have the same header, as rows are decoded by
+    position. Metadata can be cached in a JSON sidecar file, so files whose size and generation are unchanged
+    since the last run are only stat'ed"""
+
+    SAMPLE_BYTES = 256 << 10
+    MAX_WORKERS = 16
+    GLOB_CHARS = '*?['
+
+    @classmethod
+    def prefetch(cls, inputs: list[str], cache_path: str = None) -> dict[str, InputFiles]:
+        """Returns the files of each distinct input with their metadata, keyed on input, updating the sidecar cache
+        if provided. Raises ValueError if an input matches no files or its files have different headers"""
+        inputs = list(dict.fromkeys(inputs))
+        cached = cls.read_cache(cache_path) if bool(cache_path) else {}
+        with ThreadPoolExecutor(max_workers=cls.MAX_WORKERS) as executor:
+            expanded = dict(zip(inputs, executor.map(cls.expand, inputs)))
+            paths = list(dict.fromkeys(path for _, input_paths in expanded.values() for path in input_paths))
+            resolved = list(executor.map(lambda path: cls.resolve(path, cached.get(path, None)), paths))
+        metadata = {entry.path: entry for entry in resolved}
+        if bool(cache_path) and any(cached.get(path, None) != entry for path, entry in metadata.items()):
+            cls.write_cache(cache_path, dict(cached, **metadata))
+        return {
+            input: cls.check_headers(input, InputFiles(source, [metadata[path] for path in input_paths]))
+            for input, (source, input_paths) in expanded.items()
+        }
+
+    @classmethod
+    def is_directory(cls, path: str) -> bool:
+        """True for paths ending in a separator, or local directories. GCS directories need the trailing separator"""
+        return path.endswith('/') or (not FileUtils.is_gcs_path(path) and os.path.isdir(path))
+
+    @classmethod
+    def expand(cls, path: str) -> tuple[str, list[str]]:
+        """Returns the path or pattern to read for an input, with the files it matches in path order. A directory
+        is read as the pattern matching the files directly within it"""
+        if cls.is_directory(path):
+            source = FileSystems.join(path.rstrip('/'), '*')
+        elif any(c in path for c in cls.GLOB_CHARS):
+            source = path
+        else:
+            return path, [path]
+        match_result = FileSystems.match([source])[0]
+        return source, sorted(metadata.path for metadata in match_result.metadata_list if not cls.is_directory(metadata.path))
+
+    @classmethod
+    def check_headers(cls, input: str, input_files: InputFiles) -> InputFiles:
+        """Returns the files of an input if any match and all those that are not empty have the same header"""
+        if len(input_files.files) == 0:
+            raise ValueError(f'No input files match {input}')
+        header = input_files.header
+        mismatched = [metadata.path for metadata in input_files.files if len(metadata.header) > 0 and metadata.header != header]
+        if len(mismatched) > 0:
+            raise ValueError(f'Input {input} files {mismatched} have headers different to {header}')
+        return input_files
+
+    @classmethod
+    def resolve(cls, path: str, cached: InputMetadata = None) -> InputMetadata:
+        """Returns the metadata of a file, reusing the cached metadata if the file size and generation match"""
+        backend = FileUtils.storage_backend(path)
+        size, generation = backend.stat(path)
+        if cached is not None and (cached.size, cached.generation) == (size, generation):
+            return cached
+        read_range = FileUtils.range_reader(path)
+        sample = read_range(0, cls.SAMPLE_BYTES)
+        content_size = cls.content_size(read_range, size)
+        header_end = FileUtils.first_row_end(sample)
+        if header_end is None and len(sample) < content_size:
+            # Header rows longer than the sample are read separately
+            header = FileUtils.get_csv_column_names(path)
+        else:
+            header = FileUtils.csv_header_from_ranges(lambda start, end: sample[start:end], range_bytes=len(sample) + 1)
+        metadata = InputMetadata(path, header, size, generation, cls.row_estimate(sample, header_end, content_size), content_size)
+        logging.info('Input %s is %d bytes with an estimated %d rows', path, size, metadata.row_estimate)
+        return metadata
+
+    @classmethod
+    def content_size(cls, read_range, size: int) -> int:
+        """Returns the content size of a file read through a range reader. The decompressed size of a compressed
+        file is exact if the sample decompressed all of it, and otherwise extrapolated from the compression ratio
+        of the bytes read"""
+        if not isinstance(read_range, DecompressedRangeReader):
+            return size
+        if read_range.eof:
+            return read_range.decompressed_bytes
+        return round(read_range.decompressed_bytes * size / max(1, read_range.compressed_bytes_read))
+
+    @classmethod
+    def row_estimate(cls, sample: bytes, header_end: int | None, size: int) -> int:
+        """Estimates the data rows of a file of a content size from the newlines in its leading bytes. Rows are
+        counted exactly when the sample holds the whole file"""
+        if header_end is None:
+            return 0
+        body = sample[header_end + 1:]
+        rows = body.count(b'\n')
+        if len(sample) >= size:
+            return rows + (1 if len(body.strip()) > 0 and not body.endswith(b'\n') else 0)
+        return round(rows * (size - header_end - 1) / max(1, len(body)))
+
+    @classmethod
+    def read_cache(cls, cache_path: str) -> dict[str, InputMetadata]:
+        """Returns the metadata stored in a sidecar cache file, or none if there is no file"""
+        if not FileSystems.exists(cache_path):
+            return {}
+        with FileSystems.open(cache_path) as cache_file:
+            data = json.loads(cache_file.read().decode('utf-8'))
+        return {entry['path']: InputMetadata(**entry) for entry in data.get('inputs', [])}
+
+    @classmethod
+    def write_cache(cls, cache_path: str, metadata: dict[str, InputMetadata]):
+        """Stores metadata in a sidecar cache file"""
+        data = {'inputs': [entry._asdict() for entry in sorted(metadata.values())]}
+        with FileSystems.create(cache_path) as cache_file:
+            cache_file.write(json.dumps(data, indent=2).encode('utf-8'))
+
+# fmt: on
@@ -22,8 +22,8 @@ class JsonFileUtils(object):
             return cls.load_json_file_from_local_path(f)
 
     @classmethod
-    def load_json_file_from_gcs(f):
-        """Loads JSON file from GCS path"""
+    def load_json_file_from_gcs(cls, f):
+        """Loads JSON file from GCS path through the pooled storage client"""
         contents = FileUtils.get_gcs_file_as_text(f)
         return json.loads(contents)
 
@@ -0,0 +1,83 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Persisted reference data look-up cache class
+"""
+
+__all__ = ["LookupCache", "LookupTable"]
+
+import hashlib
+import io
+import json
+import pickle
+import uuid
+from apache_beam.io.filesystems import FileSystems
+from modules.CsvFileUtils import CsvFileUtils
+from modules.FileUtils import FileUtils
+
+class LookupTable(dict):
+    """Look-up dictionary loaded from a cache file. Unlike a plain dict it can be weakly referenced,
+    so one copy can be held per worker process by apache_beam.utils.shared.Shared"""
+
+class LookupCache(object):
+    """Builds reference data look-up dictionaries, keyed on a lookup column as CollectionAsDecodeDict does,
+    and stores them as pickled files in a cache directory. Cache files are named by a key hashed from the
+    source file content, the CSV columns, the lookup column and the cache format version, so a change to
+    any of them builds a new file and existing files are never rewritten. Files are written under a temporary name
+    and renamed into place once complete, so a writer failing part way never leaves a truncated file to be loaded"""
+
+    FORMAT_VERSION = 1
+    PICKLE_PROTOCOL = 5
+    SUFFIX = '.pkl'
+    TEMP_SUFFIX = '.tmp'
+
+    @classmethod
+    def key(cls, source: str | list[str], cols: list[str], lookup_key: str) -> str:
+        """Returns the cache key for a look-up built from one or more reference data files"""
+        checksums = [FileUtils.checksum(path) for path in cls.files(source)]
+        key_data = [cls.FORMAT_VERSION, checksums[0] if len(checksums) == 1 else checksums, cols, lookup_key]
+        return hashlib.sha256(json.dumps(key_data).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def files(cls, source: str | list[str]) -> list[str]:
+        return [source] if isinstance(source, str) else source
+
+    @classmethod
+    def path(cls, cache_dir: str, type: str, source: str | list[str], cols: list[str], lookup_key: str) -> str:
+        """Returns the cache file path for a look-up built from one or more reference data files"""
+        return FileSystems.join(cache_dir, '{}-{}{}'.format(type.lower(), cls.key(source, cols, lookup_key), cls.SUFFIX))
+
+    @classmethod
+    def build(cls, source: str | list[str], cols: list[str], lookup_key: str) -> dict:
+        """Reads reference data CSV files in order, skipping the header row of each, into a dictionary keyed on the
+        lookup column"""
+        lines = []
+        for path in cls.files(source):
+            with FileSystems.open(path) as f:
+                lines.extend(io.TextIOWrapper(f, encoding='utf-8').read().splitlines()[1:])
+        return {row[lookup_key]: row for row in CsvFileUtils.csv_rows_as_dicts(lines, cols)}
+
+    @classmethod
+    def ensure(cls, cache_dir: str, type: str, source: str | list[str], cols: list[str], lookup_key: str) -> str:
+        """Returns the cache file path for a look-up, building and storing the look-up if it is not cached"""
+        path = cls.path(cache_dir, type, source, cols, lookup_key)
+        if not FileSystems.exists(path):
+            lookup = cls.build(source, cols, lookup_key)
+            temp_path = '{}.{}{}'.format(path, uuid.uuid4().hex, cls.TEMP_SUFFIX)
+            try:
+                with FileSystems.create(temp_path) as f:
+                    f.write(pickle.dumps(lookup, protocol=cls.PICKLE_PROTOCOL))
+                FileSystems.rename([temp_path], [path])
+            finally:
+                if FileSystems.exists(temp_path):
+                    FileSystems.delete([temp_path])
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> LookupTable:
+        """Returns the look-up stored in a cache file"""
+        with FileSystems.open(path) as f:
+            return LookupTable(pickle.loads(f.read()))
+
+# fmt: on
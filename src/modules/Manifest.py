@@ -0,0 +1,114 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Processed input file manifest class for incremental runs
+"""
+
+__all__ = ["Manifest", "ManifestEntry"]
+
+import json
+from typing import NamedTuple
+from apache_beam.io.filesystems import FileSystems
+from modules.FileUtils import FileUtils
+from modules.Names import Names
+
+# Schema for a processed input file
+class ManifestEntry(NamedTuple):
+    path: str
+    last_updated: float
+    size: int
+    checksum: str
+
+class Manifest(object):
+    """Records the input files processed by incremental runs and where the variance partials of those
+    files are stored. Inputs are treated as append only : new files are processed, unchanged files are
+    skipped and a previously processed file whose content has changed is rejected, as its earlier
+    contribution to the stored partials cannot be subtracted. Partials hold only rows within the ingest date
+    window they were built with, if any, so it is recorded alongside the money mode"""
+
+    FILE_NAME = 'manifest.json'
+
+    def __init__(self, entries: dict = None, partials: str = None, fixed_point: bool = False, ingest_dates: list[str] = None):
+        self.entries = {} if entries is None else entries
+        self.partials = partials
+        self.fixed_point = fixed_point
+        self.ingest_dates = ingest_dates
+
+    @classmethod
+    def date_window(cls, dates: dict | None) -> list[str] | None:
+        """ISO start and end dates of an ingest date filter, as stored in the manifest, or None if inputs are unfiltered"""
+        if dates is None:
+            return None
+        return [dates[Names.START_DATE].isoformat(), dates[Names.END_DATE].isoformat()]
+
+    @classmethod
+    def path(cls, state_dir: str) -> str:
+        """Manifest file path within a state directory"""
+        return FileSystems.join(state_dir, cls.FILE_NAME)
+
+    @classmethod
+    def read(cls, state_dir: str):
+        """Returns the manifest stored in a state directory, or an empty manifest if there is none"""
+        path = cls.path(state_dir)
+        if not FileSystems.exists(path):
+            return cls()
+        with FileSystems.open(path) as manifest_file:
+            data = json.loads(manifest_file.read().decode('utf-8'))
+        entries = {
+            entry['path']: ManifestEntry(**entry)
+            for entry in data.get('files', [])
+        }
+        return cls(entries, data.get('partials', None), data.get('fixed_point', False), data.get('ingest_dates', None))
+
+    def write(self, state_dir: str):
+        """Stores the manifest in a state directory"""
+        data = {
+            'fixed_point': self.fixed_point,
+            'ingest_dates': self.ingest_dates,
+            'partials': self.partials,
+            'files': [entry._asdict() for entry in sorted(self.entries.values())]
+        }
+        with FileSystems.create(self.path(state_dir)) as manifest_file:
+            manifest_file.write(json.dumps(data, indent=2).encode('utf-8'))
+
+    @classmethod
+    def scan(cls, pattern: str) -> list[ManifestEntry]:
+        """Returns entries, without checksums, for the files matching a path or glob pattern"""
+        match_result = FileSystems.match([pattern])[0]
+        return [
+            ManifestEntry(metadata.path, metadata.last_updated_in_seconds, metadata.size_in_bytes, '')
+            for metadata in sorted(match_result.metadata_list, key=lambda m: m.path)
+        ]
+
+    @classmethod
+    def checksum(cls, path: str) -> str:
+        """Content hash of a file, taken from GCS object metadata or by hashing local file content"""
+        return FileUtils.checksum(path)
+
+    def unprocessed(self, scanned: list[ManifestEntry]) -> list[ManifestEntry]:
+        """Returns the scanned files not yet processed, with checksums. Files whose size and update time
+        match their entry are unchanged. Otherwise content hashes are compared, raising ValueError if a
+        processed file has changed. Processed files touched without changes have their entry refreshed"""
+        pending = []
+        for entry in scanned:
+            previous = self.entries.get(entry.path, None)
+            if previous is not None and (previous.size, previous.last_updated) == (entry.size, entry.last_updated):
+                continue
+            entry = entry._replace(checksum=self.checksum(entry.path))
+            if previous is None:
+                pending.append(entry)
+            elif previous.checksum == entry.checksum:
+                self.entries[entry.path] = entry
+            else:
+                raise ValueError(
+                    'Input {} has changed since it was processed. Rerun with a full refresh '
+                    'over the complete input history'.format(entry.path))
+        return pending
+
+    def add(self, entries: list[ManifestEntry]):
+        """Records processed files"""
+        for entry in entries:
+            self.entries[entry.path] = entry
+
+# fmt: on
@@ -8,6 +8,7 @@ Mappers module
 __all__ = ["Mappers"]
 
 from modules.FinRecParsers import FinRecParsers
+from modules.FinRecRecord import FinRecRecord
 from modules.DictUtils import DictUtils
 from modules.Names import Names
 
@@ -38,6 +39,18 @@ class Mappers(object):
     @classmethod
     def subset_for_join(cls, element, join_key: str, keys: list[str]=None):
         """Create subset of data ready for join transform"""
+        if isinstance(element, FinRecRecord):
+            # Records already hold only their layout fields, so are only copied when sliced
+            return element[join_key], element if keys is None else element.slice(keys)
         if keys is None:
             keys = element.keys()
-        return DictUtils(element).slice(keys).as_keyed_tuple(join_key)
\ No newline at end of file
+        return DictUtils(element).slice(keys).as_keyed_tuple(join_key)
+
+    @classmethod
+    def project_for_join(cls, element, join_key: str, keys: list[str] | None = None):
+        """Create projection of data ready for join transform, keeping only the provided keys present in the element"""
+        if keys is None:
+            return cls.subset_for_join(element, join_key)
+        if isinstance(element, FinRecRecord):
+            return element[join_key], element.project(keys)
+        return element[join_key], { k: element[k] for k in keys if k in element }
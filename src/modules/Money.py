@@ -0,0 +1,62 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Fixed point money class
+"""
+
+__all__ = ["Money"]
+
+import types
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import NamedTuple, Optional, get_args, get_type_hints
+
+class Money(object):
+    """Fixed point monetary values held as integer counts of 1e-5 units.
+
+    Units add exactly, so totals built from them match the source to the last unit. Values are
+    converted back to floats only when written to BigQuery or CSV"""
+
+    DECIMAL_PLACES = 5
+    SCALE = 10 ** DECIMAL_PLACES
+
+    @classmethod
+    def to_units(cls, value: float) -> int:
+        """Scales a numeric value to units, rounded half to even at 5DP"""
+        return round(value * cls.SCALE)
+
+    @classmethod
+    def parse_units(cls, str_val: str) -> int:
+        """Parses a decimal string to units exactly, rounded half to even at 5DP"""
+        return int((Decimal(str_val) * cls.SCALE).to_integral_value(ROUND_HALF_EVEN))
+
+    @classmethod
+    def to_value(cls, units: int) -> float:
+        """Converts units back to a float value"""
+        return units / cls.SCALE
+
+    @classmethod
+    def units_model(cls, model: type, int_fields: list[str] = ()) -> type:
+        """Returns a NamedTuple model with the fields of a model and its MONEY_FIELDS typed as integer units, so fixed
+        point values are schema coded as INT64. Integer measures the model types as float are listed in int_fields.
+        Its money_values method returns the model with float values"""
+        hints = get_type_hints(model)
+        money_fields = model.MONEY_FIELDS
+
+        def money_values(self):
+            """Returns instance with fixed point money units converted back to float values"""
+            return model._make(cls.to_value(v) if f in money_fields else v for f, v in zip(self._fields, self))
+
+        namespace = {
+            '__module__': model.__module__,
+            '__annotations__': {
+                f: (Optional[int] if type(None) in get_args(hints[f]) else int) if f in money_fields or f in int_fields else hints[f]
+                for f in model._fields
+            },
+            **model._field_defaults,
+            'MONEY_FIELDS': money_fields,
+            'money_values': money_values,
+        }
+        return types.new_class(f'{model.__name__}Units', (NamedTuple,), exec_body=lambda ns: ns.update(namespace))
+
+# fmt: on
@@ -194,6 +194,15 @@ class Names(object):
         SKU
     ]
 
+    # Source rows excluded at ingest by source data type : move order prefixes and depot IDs. Only columns
+    # not replaced by the Sales join may be filtered before it, so NFSI move orders are not eligible
+    EXCLUDED_MO_PREFIXES = {
+        TYPE_PKRD: ['SS']
+    }
+    EXCLUDED_DEPOT_IDS = {
+        TYPE_PKRD: ['CSL']
+    }
+
     # Join related constants
     JOIN_MATCH = 'JOIN_MATCH'
     MISSING = 'MISSING'
@@ -207,6 +216,16 @@ class Names(object):
     FROZEN_SKU_VAR = 'frozen-sku'
     NON_NFSI_MO_VAR = 'non-nfsi-moveorder'
 
+    # Variance report grains : variance type, depot category, group keys, filtered to report date range
+    VARIANCE_GRAINS = [
+        (FROZEN_DEPOT_SKU_VAR, TYPE_FROZEN, ['depot_id', 'depot_category', 'depot_name', 'sku'], True),
+        (FRESH_SKU_VAR, TYPE_FRESH, ['depot_category', 'sku'], False),
+        (FROZEN_SKU_VAR, TYPE_FROZEN, ['depot_category', 'sku'], False),
+        (FRESH_MO_VAR, TYPE_FRESH, ['depot_category', 'moveorder_short'], False),
+        (NON_NFSI_MO_VAR, TYPE_NON_NFSI, ['depot_category', 'moveorder_short'], False),
+        (FROZEN_DEPOT_DATE_VAR, TYPE_FROZEN, ['depot_category', 'depot_id', 'depot_name', 'record_date'], False)
+    ]
+
     # GCP Project ID options key
     GCP_PROJ_KEY = 'project'
 
@@ -7,9 +7,13 @@ Parsing utility class
 
 __all__ = ["Parsers"]
 
+import re
+from decimal import InvalidOperation
 from typing import NamedTuple, Any
+from apache_beam.metrics import Metrics
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
+from modules.Money import Money
 from modules.Names import Names
 
 class Parsers(object):
@@ -19,6 +23,20 @@ class Parsers(object):
     MAX_DATE = datetime.strptime('31/12/2099',DATE_FORMAT).date()
     BOOL_MAP = {"TRUE": True, "FALSE": False}
 
+    # Translation tables and patterns for scrubbing values, built once
+    NUMERIC_JUNK_TABLE = str.maketrans('(', '-', ',)£*_?/\\!#@%^&+={}<>~`abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ ')
+    DESC_JUNK_TABLE = str.maketrans({'"': None})
+    PLAIN_NUMERIC = re.compile(r'-?\d+(?:\.\d+)?')
+
+    # Parsed dates keyed on date string and format, bounded to a number of distinct entries
+    DATE_CACHE_SIZE = 4096
+    DATE_CACHE_HITS = Metrics.counter('Parsers', 'date_cache_hits')
+    DATE_CACHE_MISSES = Metrics.counter('Parsers', 'date_cache_misses')
+    _date_cache = {}
+
+    # Count of numeric values that could not be parsed and defaulted to 0
+    NUMERIC_PARSE_ERRORS = Metrics.counter('Parsers', 'numeric_parse_errors')
+
     @classmethod
     def str_to_bool(cls, str_val) -> bool | None:
         """Decodes TRUE|True|FALSE|False string values to bool"""
@@ -26,14 +44,32 @@ class Parsers(object):
         return cls.BOOL_MAP.get(val_str, None)
     
     @classmethod
-    def str_to_date(cls, date_str: str, default = None) -> date | None:
-        """Converts string with format dd/mm/yyyy to date"""
+    def str_to_date(cls, date_str: str, default = None, date_format: str = DATE_FORMAT) -> date | None:
+        """Converts string with format dd/mm/yyyy to date, caching parsed dates by string and format"""
         if bool(date_str):
-            try:
-                return datetime.strptime(date_str, "%d/%m/%Y").date()
-            except ValueError as err:
-                print(f'Incorrect date format : {err}')
+            key = (date_str, date_format)
+            parsed = cls._date_cache.get(key, False)
+            if parsed is False:
+                cls.DATE_CACHE_MISSES.inc()
+                parsed = cls.parse_date(date_str, date_format)
+                # Bound the cache by starting afresh once full
+                if len(cls._date_cache) >= cls.DATE_CACHE_SIZE:
+                    cls._date_cache.clear()
+                cls._date_cache[key] = parsed
+            else:
+                cls.DATE_CACHE_HITS.inc()
+            if parsed is not None:
+                return parsed
         return default
+
+    @classmethod
+    def parse_date(cls, date_str: str, date_format: str = DATE_FORMAT) -> date | None:
+        """Converts string to date without caching"""
+        try:
+            return datetime.strptime(date_str, date_format).date()
+        except ValueError as err:
+            print(f'Incorrect date format : {err}')
+            return None
     
     @classmethod
     def define_date_range(cls, start_str: str, end_str: str) -> dict:
@@ -77,34 +113,57 @@ class Parsers(object):
     @classmethod
     def clean_numeric_str(cls, str_val: str) -> str | None:
         """Strips out any undesirable non-numeric characters from a string"""
-        junk = ',)£*_?/\!#@%^&+={}<>~`abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ '
-        return str_val.translate(str.maketrans('(', '-', junk))
+        return str_val.translate(cls.NUMERIC_JUNK_TABLE)
         
     @classmethod
     def clean_float_value(cls, str_val: str) -> float:
         """Scrubs and transforms string currency values to 5DP float"""
+        if cls.PLAIN_NUMERIC.fullmatch(str_val):
+            return round(float(str_val), 5)
         clean_str = cls.clean_numeric_str(str_val)
         try:
             return round(float(clean_str), 5)
-        except ValueError as err:
-            print(f'Parsing info : {err}. Defaulting value to 0')
+        except ValueError:
+            cls.NUMERIC_PARSE_ERRORS.inc()
             return 0
     
+    @classmethod
+    def clean_money_value(cls, str_val: str) -> int:
+        """Scrubs and transforms string currency values to exact fixed point money units"""
+        clean_str = str_val if cls.PLAIN_NUMERIC.fullmatch(str_val) else cls.clean_numeric_str(str_val)
+        try:
+            return Money.parse_units(clean_str)
+        except (InvalidOperation, ValueError, OverflowError):
+            cls.NUMERIC_PARSE_ERRORS.inc()
+            return 0
+
     @classmethod
     def clean_int_value(cls, str_val: str) -> int:
         """Scrubs and transforms string values to int"""
-        clean_str = cls.clean_numeric_str(str_val)
+        clean_str = str_val if cls.PLAIN_NUMERIC.fullmatch(str_val) else cls.clean_numeric_str(str_val)
         int_str = clean_str.split('.')[0]
         try:
             return int(int_str)
-        except ValueError as err:
-            print(f'Parsing info : {err}. Defaulting value to 0')
+        except ValueError:
+            cls.NUMERIC_PARSE_ERRORS.inc()
             return 0
+
+    @classmethod
+    def clean_float_values(cls, str_vals) -> list[float]:
+        """Scrubs and transforms a column (list or NumPy array) of string values to 5DP floats, parsing each distinct value once"""
+        parsed = {v: cls.clean_float_value(v) for v in set(str_vals)}
+        return [parsed[v] for v in str_vals]
+
+    @classmethod
+    def clean_int_values(cls, str_vals) -> list[int]:
+        """Scrubs and transforms a column (list or NumPy array) of string values to int, parsing each distinct value once"""
+        parsed = {v: cls.clean_int_value(v) for v in set(str_vals)}
+        return [parsed[v] for v in str_vals]
     
     @classmethod
     def clean_desc(cls, str_val: str) -> str:
         """Scrubs descriptions to remove quotation marks and newlines"""
-        clean_str = str_val.translate(str.maketrans({'"': None}))
+        clean_str = str_val.translate(cls.DESC_JUNK_TABLE)
         return clean_str.rstrip()
     
     @classmethod
@@ -7,6 +7,7 @@ Transfer Pricing data model class
 
 __all__ = ["Pricing"]
 
+from apache_beam import coders
 from typing import NamedTuple, Optional
 from datetime import datetime, date
 from modules.Names import Names
@@ -50,7 +51,7 @@ class Pricing(NamedTuple):
     def from_dataset(cls, data: dict):
         """Returns an instance of Pricing from source dataset"""
         cols = Names.COLS[Names.TYPE_PRICING]
-        pricing_date = data.get(cols.get(Names.DATE_KEY, None), datetime.now().date())
+        pricing_date = Parsers.str_to_date(data.get(cols[Names.DATE_KEY], None), datetime.now().date())
         sku = data[cols[Names.SKU_KEY]]
         min = data.get(cols[Names.MIN_KEY], None)
         pin = data.get(cols[Names.PIN_KEY], None)
@@ -103,4 +104,7 @@ class Pricing(NamedTuple):
             total_case=Parsers.clean_float_value(total_case)
         )
 
-# fmt: on
\ No newline at end of file
+# Encode Pricing with the schema aware RowCoder rather than pickling
+coders.registry.register_coder(Pricing, coders.RowCoder)
+
+# fmt: on
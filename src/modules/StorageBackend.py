@@ -0,0 +1,129 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+"""
+Storage backend classes for reading whole files or byte ranges by path
+"""
+
+__all__ = ["GcsStorageBackend", "InMemoryStorageBackend", "LocalStorageBackend", "StorageBackend"]
+
+import google.auth
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from google.api_core.exceptions import RequestRangeNotSatisfiable
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import storage
+from requests.adapters import HTTPAdapter
+
+class StorageBackend(ABC):
+    """Reads files by path. Subclasses implement stat, read_range and read_bytes"""
+
+    @abstractmethod
+    def stat(self, path: str) -> tuple[int, str]:
+        """Returns the size in bytes and a generation identifying the current content of a file"""
+
+    @abstractmethod
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        """Returns bytes start to end, exclusive, of a file, or those up to the end of the file"""
+
+    @abstractmethod
+    def read_bytes(self, path: str) -> bytes:
+        """Returns the whole content of a file"""
+
+    def read_text(self, path: str, encoding: str = 'utf-8-sig') -> str:
+        return self.read_bytes(path).decode(encoding)
+
+class GcsStorageBackend(StorageBackend):
+    """Reads Google Cloud Storage objects through one storage client per process. The client is created on first use,
+    under a lock so concurrent callers share it, and is given an authorized HTTP session keeping a pool of reusable
+    connections. A process forked after the client was created builds its own, as connections cannot be shared
+    across processes"""
+
+    SCHEME = 'gs://'
+    POOL_SIZE = 32
+    SCOPES = storage.Client.SCOPE
+
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def client(cls) -> storage.Client:
+        """Returns the process-wide storage client, creating it on first use"""
+        if cls._client is None or cls._client_pid != os.getpid():
+            with cls._lock:
+                if cls._client is None or cls._client_pid != os.getpid():
+                    credentials, _ = google.auth.default(scopes=cls.SCOPES)
+                    session = AuthorizedSession(credentials)
+                    session.mount('https://', HTTPAdapter(pool_connections=cls.POOL_SIZE, pool_maxsize=cls.POOL_SIZE))
+                    client = storage.Client(credentials=credentials, _http=session)
+                    cls._client, cls._client_pid = client, os.getpid()
+        return cls._client
+
+    @classmethod
+    def blob(cls, path: str) -> storage.Blob:
+        """Returns the blob for a gs:// path"""
+        bucket_name, _, blob_name = path[len(cls.SCHEME):].partition('/')
+        return cls.client().bucket(bucket_name).blob(blob_name)
+
+    def stat(self, path: str) -> tuple[int, str]:
+        blob = self.blob(path)
+        blob.reload()
+        return blob.size, str(blob.generation)
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        try:
+            return self.blob(path).download_as_bytes(start=start, end=end - 1)
+        except RequestRangeNotSatisfiable:
+            return b''
+
+    def read_bytes(self, path: str) -> bytes:
+        return self.blob(path).download_as_bytes()
+
+class LocalStorageBackend(StorageBackend):
+    """Reads local files, using the modification time in nanoseconds as the generation"""
+
+    def stat(self, path: str) -> tuple[int, str]:
+        stat_result = os.stat(path)
+        return stat_result.st_size, str(stat_result.st_mtime_ns)
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        with open(path, mode='rb') as local_file:
+            local_file.seek(start)
+            return local_file.read(end - start)
+
+    def read_bytes(self, path: str) -> bytes:
+        with open(path, mode='rb') as local_file:
+            return local_file.read()
+
+class InMemoryStorageBackend(StorageBackend):
+    """Reads files held in a dict of path to content, recording each read as a (path, start, end) tuple, with
+    None bounds for whole file reads, and each stat by path. The generation is a CRC-32 of the content.
+    Stands in for GCS in tests"""
+
+    def __init__(self, files: dict[str, bytes] = None):
+        self.files = {} if files is None else files
+        self.reads = []
+        self.stats = []
+
+    def stat(self, path: str) -> tuple[int, str]:
+        self.stats.append(path)
+        content = self._content(path)
+        return len(content), str(zlib.crc32(content))
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        self.reads.append((path, start, end))
+        return self._content(path)[start:end]
+
+    def read_bytes(self, path: str) -> bytes:
+        self.reads.append((path, None, None))
+        return self._content(path)
+
+    def _content(self, path: str) -> bytes:
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return self.files[path]
+
+# fmt: on
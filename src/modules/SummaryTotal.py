@@ -5,9 +5,11 @@
 Summary Total data model class
 """
 
-__all__ = ["SummaryTotal"]
+__all__ = ["SummaryTotal", "SummaryTotalUnits"]
 
+from apache_beam import coders
 from typing import NamedTuple
+from modules.Money import Money
 from modules.Names import Names
 from modules.Parsers import Parsers
 
@@ -27,6 +29,14 @@ class SummaryTotal(NamedTuple):
     ptd_ex_git: float
     pct_of_sales_ex_git: float
 
+    # Monetary fields held as integer money units in fixed point mode. Percentages are unit free
+    MONEY_FIELDS = ['pkrd_value_tp_sum', 'nfsi_value_sum', 'value_variance_sum', 'git_value_sum', 'ptd_ex_git']
+
+    @classmethod
+    def model(cls, fixed_point: bool = False) -> type:
+        """Returns the model type for a money mode, SummaryTotalUnits with money fields as int64 units in fixed point mode"""
+        return SummaryTotalUnits if fixed_point else cls
+
     def bigquery_dict(self, metadata_fields: dict) -> dict:
         """Returns instance as dict keyed on BigQuery table column names"""
         d = self._asdict()
@@ -34,8 +44,8 @@ class SummaryTotal(NamedTuple):
         return metadata_fields
 
     @classmethod
-    def from_result(cls, result, report_type: str = Names.TYPE_SUMMARY):
-        return cls(
+    def from_result(cls, result, report_type: str = Names.TYPE_SUMMARY, fixed_point: bool = False):
+        return cls.model(fixed_point)(
             report_type=report_type,
             category=Parsers.get_attribute(result, Names.DEPOT_CATEGORY, Names.TYPE_SUMMARY),
             pkrd_quantity_sum=result.sum_pkrd_quantity,
@@ -63,5 +73,12 @@ class SummaryTotal(NamedTuple):
     def percent_sales_ex_git(cls, result) -> float:
         ptd_ex_git = cls.profits_to_date_ex_git(result)
         return (ptd_ex_git / result.sum_pkrd_value_tp) * 100
-    
-# fmt: on
\ No newline at end of file
+
+# Fixed point variant of SummaryTotal with money fields schema coded as INT64 units
+SummaryTotalUnits = Money.units_model(SummaryTotal)
+
+# Encode SummaryTotal with the schema aware RowCoder rather than pickling
+coders.registry.register_coder(SummaryTotal, coders.RowCoder)
+coders.registry.register_coder(SummaryTotalUnits, coders.RowCoder)
+
+# fmt: on
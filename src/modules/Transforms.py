@@ -6,29 +6,61 @@ Provides a number of reusable Apache Beam composite transforms
 """
 
 __all__ = [
-    "AggregateVariance",
+    "BloomFilterCombineFn",
     "CalculateVarianceTotals",
     "CollectionAsDecodeDict",
+    "ColumnarDatasetIngestAndEnrich",
+    "CsvFileAsColumnChunks",
     "CsvToDict",
     "DatasetIngestAndEnrich",
+    "DedupFingerprints",
+    "EnrichWithLookup",
+    "FilterSourceRows",
+    "FinRecDataFromBatch",
+    "HashLeftJoin",
     "LeftJoin",
-    "LoadIntoBigQuery"
+    "LoadIntoBigQuery",
+    "MultiGrainVariance",
     "NFSIDataEnrichAndTransform",
+    "ReadCsvColumns",
     "SideInputAsDecodeDict",
+    "ToFinRecData",
+    "ToMoneyValues",
+    "TranscodeCsv",
+    "VarianceSumCombineFn",
     "write_data_as_csv"
 ]
 
+import json
+import logging
+import numpy as np
+from datetime import date
+from itertools import islice
 import apache_beam as beam
+from apache_beam.utils.shared import Shared
 from apache_beam.io import fileio
-from apache_beam.io.textio import ReadFromText, WriteToText, WriteToCsv
+from apache_beam.io.textio import ReadAllFromText, ReadFromText, WriteToText, WriteToCsv
 from apache_beam.dataframe.convert import to_dataframe
 from apache_beam.dataframe.io import to_csv
+from apache_beam.io.filesystem import BeamIOError, CompressionTypes
+from apache_beam.io.filesystems import FileSystems
 from apache_beam.io.gcp.bigquery import WriteToBigQuery, BigQueryDisposition
+from apache_beam.metrics import Metrics
+from apache_beam.transforms.window import GlobalWindows
+from modules.BloomFilter import BloomFilter
+from modules.Compression import Compression
 from modules.CsvFileUtils import CsvFileUtils
+from modules.FileUtils import FileUtils
+from modules.Fingerprints import Fingerprints
+from modules.FinRecBatch import FinRecBatch
 from modules.FinRecData import FinRecData
+from modules.FinRecParsers import FinRecParsers
+from modules.FinRecRecord import FinRecRecord
+from modules.LookupCache import LookupCache
 from modules.Names import Names
 from modules.Filters import Filters
 from modules.Mappers import Mappers
+from modules.Variance import Variance
 
 # Transform reference data PCollection into decode dictionary
 class CollectionAsDecodeDict(beam.CombineFn):
@@ -62,36 +94,212 @@ class CollectionAsDecodeDict(beam.CombineFn):
 
 # Transform to convert each row in ingested CSV PCollection to a dict
 class CsvToDict(beam.DoFn):
-    """Transforms CSV rows into dictionary"""
+    """Transforms CSV rows into dictionary, decoding buffered rows in batches through a single CSV reader.
+    With a source data type, rows are emitted as compact FinRecRecords holding only the mapped columns"""
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, type: str = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        beam.DoFn.__init__(self)
+        self._type = type
+        self._batch_size = batch_size
+
+    def start_bundle(self):
+        self._rows = []
+        self._csv_col_names = None
+
     def process(self, element, csv_col_names):
-        yield CsvFileUtils.csv_row_as_dict(element, csv_col_names)      
+        self._csv_col_names = csv_col_names
+        self._rows.append(element)
+        if len(self._rows) >= self._batch_size:
+            yield from self._decode_rows()
+
+    def finish_bundle(self):
+        # Rows are read from text files into the global window
+        for d in self._decode_rows():
+            yield GlobalWindows.windowed_value(d)
+
+    def _decode_rows(self) -> list[dict]:
+        rows, self._rows = self._rows, []
+        if len(rows) == 0:
+            return []
+        dicts = CsvFileUtils.csv_rows_as_dicts(rows, self._csv_col_names)
+        if self._type is None:
+            return dicts
+        return [FinRecRecord.from_dict(self._type, d) for d in dicts]
 
 # Composite transform to peform common load and enrichment transforms
 class DatasetIngestAndEnrich(beam.PTransform):
-    """Ingests CSV data, adds computed fields, enriches with static reference data from side input"""
+    """Ingests CSV data, adds computed fields, enriches with static reference data from side input.
+    Rows are projected onto the columns mapped in Names.COLS unless project is disabled, and excluded
+    rows are dropped as soon as they are parsed. The data source is a path or pattern, or a list of file paths"""
 
-    def __init__(self, data_source, cols: list[str], type: str, depots: dict):
+    def __init__(self, data_source, cols: list[str], type: str, depots: dict, project: bool = True, dates: dict = None):
         beam.PTransform.__init__(self)
         self._data_source = data_source
         self._cols = cols
         self._type = type
         self._cols = cols
         self._depots = depots
+        self._project = project
+        self._dates = dates
 
     def expand(self, pcoll):
+        if isinstance(self._data_source, list):
+            lines = (
+                pcoll
+                | 'List {} CSV files'.format(self._type) >> beam.Create(self._data_source)
+                | 'Read {} CSV'.format(self._type) >> ReadAllFromText(skip_header_lines=1)
+            )
+        else:
+            lines = pcoll | 'Read {} CSV'.format(self._type) >> ReadFromText(self._data_source, skip_header_lines=1)
         return (
-            pcoll
-            | 'Read {} CSV'.format(self._type) >> ReadFromText(self._data_source, skip_header_lines=1)
-            | '{} to dictionary'.format(self._type) >> beam.ParDo(CsvToDict(), self._cols)
+            lines
+            | '{} to dictionary'.format(self._type) >> beam.ParDo(CsvToDict(self._type if self._project else None), self._cols)
+            | 'Filter {} source rows'.format(self._type) >> FilterSourceRows(self._type, self._dates)
             | 'Add {} computed fields'.format(self._type) >> beam.Map(Mappers.add_computed_fields, self._type)
-            | 'Add depot fields to {}'.format(self._type) >> beam.Map(Mappers.add_depot_ref_data_fields, beam.pvalue.AsSingleton(self._depots))
+            | 'Add depot fields to {}'.format(self._type) >> EnrichWithLookup(Mappers.add_depot_ref_data_fields, self._depots)
         )
     
+# Composite transform to drop excluded raw source rows ahead of joins and shuffles
+class FilterSourceRows(beam.PTransform):
+    """Drops raw source rows failing the exclusions declared in Names for the source data type or, if provided,
+    outside the date range. The exclusions leave every output unchanged, while a date range narrows every output
+    to it. Rows pass through unchanged if no filters apply to the type"""
+
+    def __init__(self, type: str, dates: dict = None):
+        beam.PTransform.__init__(self)
+        self._type = type
+        self._dates = dates
+
+    def expand(self, pcoll):
+        if not Filters.has_source_filters(self._type, self._dates):
+            return pcoll
+        return pcoll | 'Filter rows' >> beam.Filter(Filters.filter_source_row, self._type, self._dates)
+
+# Transform to read whole CSV files in columnar chunks, materialising only the requested columns
+class CsvFileAsColumnChunks(beam.DoFn):
+    """Reads CSV files as Arrow record batches and emits a dictionary per row holding only the requested columns,
+    or a FinRecRecord per row given a source data type. Rows with the wrong number of values, which Arrow cannot
+    batch, are decoded against the header columns as CsvToDict decodes them, so short rows hold the missing
+    column value and long rows their extra values, and are emitted after the batches of the file"""
+
+    def __init__(self, cols: list[str], columns: list[str], block_size: int = CsvFileUtils.DEFAULT_BLOCK_SIZE, type: str = None):
+        beam.DoFn.__init__(self)
+        self._cols = cols
+        self._columns = columns
+        self._block_size = block_size
+        self._type = type
+        self._invalid_rows = Metrics.counter(self.__class__, 'invalid_rows')
+
+    def process(self, readable_file):
+        invalid_rows = []
+        codec = Compression.ARROW_CODECS.get(Compression.detect(readable_file.metadata.path), None)
+        with readable_file.open(compression_type=CompressionTypes.UNCOMPRESSED) as raw_file:
+            csv_file = CsvFileUtils.arrow_input_stream(raw_file, codec)
+            for batch in CsvFileUtils.csv_record_batches(csv_file, self._columns, self._block_size, invalid_rows):
+                if self._type is None:
+                    yield from batch.to_pylist()
+                else:
+                    yield from (FinRecRecord.from_dict(self._type, d) for d in batch.to_pylist())
+        if len(invalid_rows) > 0:
+            self._invalid_rows.inc(len(invalid_rows))
+            logging.warning('Decoded %d malformed rows in %s row by row', len(invalid_rows), readable_file.metadata.path)
+            yield from self._decode_invalid_rows(invalid_rows)
+
+    def _decode_invalid_rows(self, rows: list[str]):
+        keys = set(self._columns + [CsvFileUtils.EXTRA_COLS_KEY])
+        for d in CsvFileUtils.csv_rows_as_dicts(rows, self._cols):
+            if self._type is None:
+                yield {k: v for k, v in d.items() if k in keys}
+            else:
+                yield FinRecRecord.from_dict(self._type, d)
+
+# Composite transform to read selected columns from CSV files in fixed-size columnar chunks
+class ReadCsvColumns(beam.PTransform):
+    """Reads the requested columns of matching CSV files, or of a list of file paths, redistributing rows for parallel
+    downstream processing. An optional row filter transform is applied before rows are redistributed"""
+
+    def __init__(self, data_source, cols: list[str], columns: list[str], block_size: int = CsvFileUtils.DEFAULT_BLOCK_SIZE,
+                 type: str = None, row_filter: beam.PTransform = None):
+        beam.PTransform.__init__(self)
+        self._data_source = data_source
+        self._cols = cols
+        self._columns = columns
+        self._block_size = block_size
+        self._type = type
+        self._row_filter = row_filter
+
+    def expand(self, pcoll):
+        # Only request columns present in the file header so absent columns keep their parser defaults
+        columns = [col for col in self._columns if col in self._cols]
+        if isinstance(self._data_source, list):
+            matches = pcoll | 'List CSV files' >> beam.Create(self._data_source) | 'Match CSV files' >> fileio.MatchAll()
+        else:
+            matches = pcoll | 'Match CSV files' >> fileio.MatchFiles(self._data_source)
+        rows = (
+            matches
+            | 'Read CSV files' >> fileio.ReadMatches()
+            | 'CSV columns to dictionary' >> beam.ParDo(CsvFileAsColumnChunks(self._cols, columns, self._block_size, self._type))
+        )
+        if self._row_filter is not None:
+            rows = rows | 'Filter rows' >> self._row_filter
+        return rows | 'Redistribute rows' >> beam.Reshuffle()
+
+# Composite transform to perform common load and enrichment transforms using the columnar CSV reader
+class ColumnarDatasetIngestAndEnrich(beam.PTransform):
+    """Ingests mapped CSV columns in chunks, adds computed fields, enriches with static reference data from side input.
+    All columns are read when project is disabled. Excluded rows are dropped before rows are redistributed"""
+
+    def __init__(self, data_source, cols: list[str], type: str, depots: dict, project: bool = True, dates: dict = None):
+        beam.PTransform.__init__(self)
+        self._data_source = data_source
+        self._cols = cols
+        self._type = type
+        self._depots = depots
+        self._project = project
+        self._dates = dates
+
+    def expand(self, pcoll):
+        columns = FinRecParsers.source_columns(self._type) if self._project else self._cols
+        record_type = self._type if self._project else None
+        return (
+            pcoll
+            | 'Read {} CSV columns'.format(self._type) >> ReadCsvColumns(self._data_source, self._cols, columns, type=record_type,
+                                                                        row_filter=FilterSourceRows(self._type, self._dates))
+            | 'Add {} computed fields'.format(self._type) >> beam.Map(Mappers.add_computed_fields, self._type)
+            | 'Add depot fields to {}'.format(self._type) >> EnrichWithLookup(Mappers.add_depot_ref_data_fields, self._depots)
+        )
+
+# Composite transform to rewrite a CSV file as sharded gzip CSV files that can be read in parallel
+class TranscodeCsv(beam.PTransform):
+    """Reads a CSV file, which is read whole by one worker if it is compressed, and writes its rows across a number
+    of gzip CSV shards named <prefix>-SSSSS-of-NNNNN.csv.gz, each starting with the header row"""
+
+    def __init__(self, data_source: str, cols: list[str], output_prefix: str, num_shards: int):
+        beam.PTransform.__init__(self)
+        self._data_source = data_source
+        self._cols = cols
+        self._output_prefix = output_prefix
+        self._num_shards = num_shards
+
+    def expand(self, pcoll):
+        return (
+            pcoll
+            | 'Read CSV' >> ReadFromText(self._data_source, skip_header_lines=1)
+            | 'Write CSV shards' >> WriteToText(self._output_prefix,
+                                                file_name_suffix=Compression.TRANSCODE_SUFFIX,
+                                                num_shards=self._num_shards,
+                                                header=CsvFileUtils.csv_line(self._cols))
+        )
+
 # Composite transform to ingest, enrich and join to NFSI datasets to Sales data
 class NFSIDataEnrichAndTransform(beam.PTransform):
-    """Enriches NFSI dataset with computed fields, Sales and PKRD data via joins"""
+    """Enriches NFSI dataset with computed fields, Sales and PKRD data via joins. Unless project is disabled, the
+    join extract holds only the fields read by FinRecData.from_dataset"""
 
-    def __init__(self, data_source, cols: list[str], type: str, depots: dict, sales):
+    def __init__(self, data_source, cols: list[str], type: str, depots: dict, sales, columnar: bool = False, hash_join: bool = False,
+                 hot_key_threshold: int = 0, report_top_n: int = 0, project: bool = True, dates: dict = None):
         beam.PTransform.__init__(self)
         self._data_source = data_source
         self._cols = cols
@@ -99,23 +307,39 @@ class NFSIDataEnrichAndTransform(beam.PTransform):
         self._cols = cols
         self._depots = depots
         self._sales = sales
+        self._columnar = columnar
+        self._hash_join = hash_join
+        self._hot_key_threshold = hot_key_threshold
+        self._report_top_n = report_top_n
+        self._project = project
+        self._dates = dates
 
     def expand(self, pcoll):
+        ingest = ColumnarDatasetIngestAndEnrich if self._columnar else DatasetIngestAndEnrich
+        projection = FinRecParsers.model_columns(self._type) if self._project else None
         nfsi_sales_extract = (
             pcoll
-            | 'Ingest and enrich {}'.format(self._type) >> DatasetIngestAndEnrich(self._data_source,
-                                                                                    self._cols, 
-                                                                                    self._type, 
-                                                                                    self._depots)
-            | '{} Sales extract'.format(self._type) >> beam.Map(Mappers.subset_for_join, Names.ORDER_ID)
+            | 'Ingest and enrich {}'.format(self._type) >> ingest(self._data_source,
+                                                                   self._cols, 
+                                                                   self._type, 
+                                                                   self._depots,
+                                                                   self._project,
+                                                                   self._dates)
+            | '{} Sales extract'.format(self._type) >> beam.Map(Mappers.project_for_join, Names.ORDER_ID, projection)
         )
 
         # Join NFSI to Sales to add sku_and_moveorder using SKU and NFSI Order Number composite key
         return ((
             {self._type: nfsi_sales_extract, Names.TYPE_SALES: self._sales}
             )
-            | 'Join {} to Sales'.format(self._type) >> LeftJoin(self._type, Names.TYPE_SALES)   
-        )     
+            | 'Join {} to Sales'.format(self._type) >> self.join()   
+        )
+
+    def join(self) -> beam.PTransform:
+        """Join of the dataset extract to the Sales extract"""
+        if self._hash_join:
+            return HashLeftJoin(self._type, Names.TYPE_SALES)
+        return LeftJoin(self._type, Names.TYPE_SALES, self._hot_key_threshold, report_top_n=self._report_top_n)
     
 # Composite transform to load a side input dataset as a keyed decode look-up dictionary
 class SideInputAsDecodeDict(beam.PTransform):
@@ -136,6 +360,38 @@ class SideInputAsDecodeDict(beam.PTransform):
             | '{} as look-up'.format(self._type) >> beam.CombineGlobally(CollectionAsDecodeDict(self._lookup_key))
         )
 
+# Transform to apply a look-up mapper with a cached look-up held once per worker process
+class AddCachedLookupFields(beam.DoFn):
+    """Applies a mapper taking an element and a look-up dictionary, loading the look-up from its cache file on setup.
+    The loaded look-up is shared by every DoFn instance and bundle in the worker process"""
+
+    def __init__(self, mapper, cache_path: str):
+        beam.DoFn.__init__(self)
+        self._mapper = mapper
+        self._cache_path = cache_path
+        self._shared_handle = Shared()
+
+    def setup(self):
+        self._lookup = self._shared_handle.acquire(lambda: LookupCache.load(self._cache_path), tag=self._cache_path)
+
+    def process(self, element):
+        yield self._mapper(element, self._lookup)
+
+# Composite transform to enrich rows from a reference data look-up
+class EnrichWithLookup(beam.PTransform):
+    """Applies a mapper taking an element and a look-up dictionary. The look-up is either a LookupCache file path,
+    loaded once per worker process, or a PCollection holding the look-up as a singleton side input"""
+
+    def __init__(self, mapper, lookup):
+        beam.PTransform.__init__(self)
+        self._mapper = mapper
+        self._lookup = lookup
+
+    def expand(self, pcoll):
+        if isinstance(self._lookup, str):
+            return pcoll | 'Cached look-up' >> beam.ParDo(AddCachedLookupFields(self._mapper, self._lookup))
+        return pcoll | 'Side input look-up' >> beam.Map(self._mapper, beam.pvalue.AsSingleton(self._lookup))
+
 # Transform nested joined datasets into a flat dict
 class UnnestJoinedData(beam.DoFn):
     """Unnests source and joined data to produce a merged dict"""
@@ -145,78 +401,716 @@ class UnnestJoinedData(beam.DoFn):
         join_dicts = grouped_data[join_name]
 
         for sd in source_dicts:
-            match = 0
-            if len(join_dicts) > 0:
-                match = 1
-                sd.update(join_dicts[0])
-            sd.update({'JOIN_MATCH': match})
-            yield sd
+            yield self.merge(sd, join_dicts)
+
+    @staticmethod
+    def merge(source_dict: dict, join_dicts: list[dict]) -> dict:
+        """Updates source data with the first joined row, flagging whether a match was found"""
+        match = 0
+        if len(join_dicts) > 0:
+            match = 1
+            source_dict.update(join_dicts[0])
+        source_dict.update({'JOIN_MATCH': match})
+        return source_dict
+
+# Transform to measure join key group sizes and pick out hot keys
+class HotJoinKeys(beam.DoFn):
+    """Records the distribution of key group sizes and emits keys with groups at or above a threshold"""
+
+    def __init__(self, namespace: str, threshold: int):
+        beam.DoFn.__init__(self)
+        self._namespace = namespace
+        self._threshold = threshold
+
+    def setup(self):
+        self._group_sizes = Metrics.distribution(self._namespace, 'key_group_size')
+        self._hot_keys = Metrics.counter(self._namespace, 'hot_keys')
+
+    def process(self, element):
+        key, size = element
+        self._group_sizes.update(size)
+        if self._threshold > 0 and size >= self._threshold:
+            self._hot_keys.inc()
+            yield key, size
+
+# Transform to export the largest join key groups as metrics
+class ReportTopJoinKeys(beam.DoFn):
+    """Sets a gauge per rank for the largest key groups of a join and logs their keys"""
+
+    def __init__(self, namespace: str):
+        beam.DoFn.__init__(self)
+        self._namespace = namespace
+
+    def process(self, top_keys):
+        for rank, (key, size) in enumerate(top_keys, start=1):
+            Metrics.gauge(self._namespace, 'top_{}_key_group_size'.format(rank)).set(size)
+            logging.info('%s key group %d : %s has %d rows', self._namespace, rank, key, size)
+
+# Transform to spread left-hand side rows with hot keys across salted sub-keys
+class SaltHotKeys(beam.DoFn):
+    """Keys rows on (key, salt), cycling the salt over the fan-out for hot keys and using 0 otherwise"""
+
+    def __init__(self, fanout: int, known_hot_keys: list):
+        beam.DoFn.__init__(self)
+        self._fanout = fanout
+        self._known_hot_keys = known_hot_keys
+
+    def setup(self):
+        self._next_salt = 0
+
+    def process(self, element, hot_keys: dict):
+        key, data = element
+        salt = 0
+        if key in hot_keys or key in self._known_hot_keys:
+            self._next_salt = (self._next_salt + 1) % self._fanout
+            salt = self._next_salt
+        yield (key, salt), data
+
+# Transform to replicate right-hand side rows with hot keys to every salted sub-key
+class FanOutHotKeys(beam.DoFn):
+    """Keys rows on (key, salt), emitting a copy per salt in the fan-out for hot keys and salt 0 otherwise"""
+
+    def __init__(self, fanout: int, known_hot_keys: list):
+        beam.DoFn.__init__(self)
+        self._fanout = fanout
+        self._known_hot_keys = known_hot_keys
+
+    def process(self, element, hot_keys: dict):
+        key, data = element
+        salts = range(self._fanout) if key in hot_keys or key in self._known_hot_keys else [0]
+        for salt in salts:
+            yield (key, salt), data
 
 # Composite transform for a left join operation on two dataset extracts
 class LeftJoin(beam.PTransform):
-    """Groups two dataset extracts on a common key and enriches left-hand side with fields from right-hand side"""
+    """Groups two dataset extracts on a common key and enriches left-hand side with fields from right-hand side.
 
-    def __init__(self, left_key: str, right_key: str):
+    With a hot key threshold, left-hand side keys with at least that many rows, and keys that are
+    always hot such as blank composite keys, are salted across a fan-out of groups, with matching
+    right-hand side rows replicated to each. Optionally reports the top N left-hand side key group sizes as metrics"""
+
+    DEFAULT_HOT_KEY_FANOUT = 10
+    KNOWN_HOT_KEYS = [None, '', '{}_{}'.format(Names.MISSING, Names.MISSING)]
+
+    def __init__(self, left_key: str, right_key: str, hot_key_threshold: int = 0,
+                 hot_key_fanout: int = DEFAULT_HOT_KEY_FANOUT, report_top_n: int = 0):
         beam.PTransform.__init__(self)            
         self._left_key = left_key
         self._right_key = right_key
+        self._hot_key_threshold = hot_key_threshold
+        self._hot_key_fanout = hot_key_fanout
+        self._report_top_n = report_top_n
 
     def expand(self, pcoll):
-        return (
-            pcoll
-            | 'Left join' >> beam.CoGroupByKey()
-            | 'Unnest joined data' >> beam.ParDo(UnnestJoinedData(), self._left_key, self._right_key)
+        if self._hot_key_threshold <= 0 and self._report_top_n <= 0:
+            return (
+                pcoll
+                | 'Left join' >> beam.CoGroupByKey()
+                | 'Unnest joined data' >> beam.ParDo(UnnestJoinedData(), self._left_key, self._right_key)
+            )
+
+        namespace = 'LeftJoin {} to {}'.format(self._left_key, self._right_key)
+        left = pcoll[self._left_key]
+        right = pcoll[self._right_key]
+        key_group_sizes = (
+            left
+            | 'Left keys' >> beam.Keys()
+            | 'Count left keys' >> beam.combiners.Count.PerElement()
         )
+        hot_keys = key_group_sizes | 'Hot keys' >> beam.ParDo(HotJoinKeys(namespace, self._hot_key_threshold))
+
+        if self._report_top_n > 0:
+            _ = (
+                key_group_sizes
+                | 'Top key groups' >> beam.combiners.Top.Of(self._report_top_n, key=lambda element: element[1])
+                | 'Report top key groups' >> beam.ParDo(ReportTopJoinKeys(namespace))
+            )
+
+        if self._hot_key_threshold <= 0:
+            grouped = pcoll | 'Left join' >> beam.CoGroupByKey()
+        else:
+            known_hot_keys = self.KNOWN_HOT_KEYS
+            grouped = ({
+                self._left_key: left
+                | 'Salt left keys' >> beam.ParDo(SaltHotKeys(self._hot_key_fanout, known_hot_keys), beam.pvalue.AsDict(hot_keys)),
+                self._right_key: right
+                | 'Fan out right keys' >> beam.ParDo(FanOutHotKeys(self._hot_key_fanout, known_hot_keys), beam.pvalue.AsDict(hot_keys))
+            }
+            | 'Left join' >> beam.CoGroupByKey()
+            )
+        return grouped | 'Unnest joined data' >> beam.ParDo(UnnestJoinedData(), self._left_key, self._right_key)
     
-# Transforms to aggregate variance values on a PCollection 
-class AggregateVariance(beam.PTransform):
-    """Aggregates variance totals using grouping fields"""
+# Transform probing a keyed side input with each left-hand side row
+class ProbeJoinedData(beam.DoFn):
+    """Looks up each source row key in the side input of joined data to produce a merged dict"""
+    def process(self, element, join_data: dict):
+        key, sd = element
+        # Multimap side input values are iterables, empty for unmatched keys
+        yield UnnestJoinedData.merge(sd, list(islice(join_data[key], 1)))
+
+# Composite transform for a left join operation broadcasting the right-hand side extract as a side input
+class HashLeftJoin(beam.PTransform):
+    """Enriches left-hand side with fields from a small right-hand side held in memory as a multimap, avoiding a shuffle"""
+
+    JOIN_SHUFFLE = 'shuffle'
+    JOIN_HASH = 'hash'
+    JOIN_AUTO = 'auto'
+    JOIN_STRATEGIES = [JOIN_AUTO, JOIN_SHUFFLE, JOIN_HASH]
+    DEFAULT_MAX_RIGHT_BYTES = 100 << 20
 
-    def __init__(self, category: str, group_keys: list[str]):
+    def __init__(self, left_key: str, right_key: str):
         beam.PTransform.__init__(self)
-        self._category = category
-        self._group_keys = group_keys
+        self._left_key = left_key
+        self._right_key = right_key
 
     def expand(self, pcoll):
-        types = [Names.TYPE_PKRD, self._category]
+        return (
+            pcoll[self._left_key]
+            | 'Probe joined data' >> beam.ParDo(ProbeJoinedData(), beam.pvalue.AsMultiMap(pcoll[self._right_key]))
+        )
+
+    @classmethod
+    def is_preferred(cls, strategy: str, right_source, max_right_bytes: int = DEFAULT_MAX_RIGHT_BYTES,
+                     right_bytes: int | None = None) -> bool:
+        """True if the join strategy, or for auto the size of the right-hand side input files, favours a hash join.
+        The input files are sized unless their size is provided"""
+        if strategy != cls.JOIN_AUTO:
+            return strategy == cls.JOIN_HASH
+        if right_bytes is None:
+            try:
+                right_bytes = FileUtils.total_size_bytes(right_source)
+            except BeamIOError as ex:
+                logging.warning('Unable to size %s, defaulting to shuffle join : %s', right_source, ex)
+                return False
+        logging.info('Right-hand side join input %s is %d bytes, hash join limit %d bytes', right_source, right_bytes, max_right_bytes)
+        return right_bytes <= max_right_bytes
+
+# Transform to convert batches of enriched rows into FinRecData models
+class FinRecDataFromBatch(beam.DoFn):
+    """Converts a batch of enriched rows of one source data type to FinRecData models"""
+
+    def __init__(self, type: str, fingerprint_scheme: str = Fingerprints.DEFAULT_SCHEME, fixed_point: bool = False):
+        beam.DoFn.__init__(self)
+        self._type = type
+        self._fingerprint_scheme = fingerprint_scheme
+        self._fixed_point = fixed_point
+
+    def process(self, rows):
+        yield from FinRecBatch.from_dicts(self._type, rows, self._fingerprint_scheme, self._fixed_point)
+
+# Composite transform to convert enriched rows into FinRecData models
+class ToFinRecData(beam.PTransform):
+    """Converts enriched rows to FinRecData models, either row by row or in columnar batches"""
+
+    DEFAULT_MAX_BATCH_SIZE = 5000
+
+    def __init__(self, type: str, batched: bool = False, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 fingerprint_scheme: str = Fingerprints.DEFAULT_SCHEME, fixed_point: bool = False):
+        beam.PTransform.__init__(self)
+        self._type = type
+        self._batched = batched
+        self._max_batch_size = max_batch_size
+        self._fingerprint_scheme = fingerprint_scheme
+        self._fixed_point = fixed_point
+
+    def expand(self, pcoll):
+        if not self._batched:
+            return (
+                pcoll
+                | '{} rows to FinRecData'.format(self._type)
+                >> beam.Map(lambda data, type, scheme, fixed_point: FinRecData.from_dataset(type, data, scheme, fixed_point),
+                            self._type,
+                            self._fingerprint_scheme,
+                            self._fixed_point).with_output_types(FinRecData.model(self._fixed_point))
+            )
         return (
             pcoll
-            | 'Filter for PKRD, {}'.format(self._category)
-            >> beam.Filter(lambda row: Filters.filter_by_types(row, types=[Names.TYPE_PKRD, self._category], depot_type=self._category))                                                         
-            | 'Variance by {}, {}'.format(self._category, self._group_keys[1])
-            >> beam.GroupBy(*self._group_keys)
-                        .aggregate_field('pkrd_quantity', sum, 'total_pkrd_quantity')
-                        .aggregate_field('pkrd_value_tp', sum, 'total_pkrd_value_tp')
-                        .aggregate_field('nfsi_quantity', sum, 'total_nfsi_quantity')
-                        .aggregate_field('nfsi_value', sum, 'total_nfsi_value')
-                        .aggregate_field('quantity_variance', sum, 'total_quantity_variance')
-                        .aggregate_field('value_variance_tp', sum, 'total_value_variance_tp')                 
-        )     
-    
+            | 'Batch {} rows'.format(self._type) >> beam.BatchElements(max_batch_size=self._max_batch_size)
+            | '{} batches to FinRecData'.format(self._type)
+            >> beam.ParDo(FinRecDataFromBatch(self._type, self._fingerprint_scheme, self._fixed_point))
+                .with_output_types(FinRecData.model(self._fixed_point))
+        )
+
+# Combiner to sum variance measures into a single fixed size vector accumulator
+class VarianceSumCombineFn(beam.CombineFn):
+    """Sums tuples of variance measures into one float64 vector accumulator, compacted to raw bytes for shuffle.
+
+    Measures at the quantity indexes are output as integers. With fixed_point set every measure is integer
+    money units or quantity, summed exactly in an int64 vector, so float measures are rejected rather than
+    truncated. With goods_in_transit set the measures are the six variance totals, and the output is extended
+    with the GIT flag, quantity and value of the summed totals"""
+
+    # PKRD, NFSI and variance quantities (and GIT quantity in totals) are integer measures in both the row and total measure layouts
+    QUANTITY_INDEXES = (0, 2, 4, 6)
+
+    def __init__(self, size: int, quantity_indexes: tuple[int] = QUANTITY_INDEXES, goods_in_transit: bool = False,
+                 fixed_point: bool = False):
+        beam.CombineFn.__init__(self)
+        self._size = size
+        self._quantity_indexes = range(size) if fixed_point else quantity_indexes
+        self._goods_in_transit = goods_in_transit
+        self._dtype = np.int64 if fixed_point else np.float64
+
+    def _vector(self, accumulator):
+        # Compacted accumulators arrive as raw vector bytes
+        if isinstance(accumulator, bytes):
+            return np.frombuffer(accumulator, dtype=self._dtype).copy()
+        return accumulator
+
+    def create_accumulator(self):
+        return np.zeros(self._size, dtype=self._dtype)
+
+    def add_input(self, accumulator, element):
+        accumulator = self._vector(accumulator)
+        np.add(accumulator, element, out=accumulator)
+        return accumulator
+
+    def merge_accumulators(self, accumulators):
+        merged = self.create_accumulator()
+        for a in accumulators:
+            merged += self._vector(a)
+        return merged
+
+    def extract_output(self, accumulator):
+        totals = [
+            int(v) if i in self._quantity_indexes else float(v)
+            for i, v in enumerate(self._vector(accumulator))
+        ]
+        if self._goods_in_transit:
+            is_git = Variance.goods_in_transit(*totals[:4])
+            totals += [is_git, totals[4] if is_git else 0, totals[5] if is_git else 0]
+        return tuple(totals)
+
+    def compact(self, accumulator):
+        return self._vector(accumulator).tobytes()
+
+# Transform to key each FinRecData row by every variance grain it contributes to
+class KeyByVarianceGrains(beam.DoFn):
+    """Emits the variance measures of a row once per matching grain, keyed on variance type and group key values.
+    Partial keys add the record date ordinal in place of the date filter, so it can be applied once partials are merged"""
+
+    def __init__(self, grains: list[tuple], dates: dict, partial: bool = False):
+        beam.DoFn.__init__(self)
+        self._grains = grains
+        self._dates = dates
+        self._partial = partial
+
+    def process(self, row):
+        measures = tuple(getattr(row, field) for field in MultiGrainVariance.MEASURE_FIELDS)
+        for var_type, category, group_keys, date_filtered in self._grains:
+            if not Filters.filter_by_types(row, types=[Names.TYPE_PKRD, category], depot_type=category):
+                continue
+            group_values = tuple(self._key_value(row, key) for key in group_keys)
+            if self._partial:
+                yield (var_type, group_values, self._key_value(row, Names.RECORD_DATE)), measures
+            elif not date_filtered or Filters.filter_for_dates(row, dates=self._dates):
+                yield (var_type, group_values), measures
+
+    @staticmethod
+    def _key_value(row, key: str):
+        # Dates have no deterministic key encoding, so are keyed on their ordinal
+        value = getattr(row, key)
+        return value.toordinal() if key in MultiGrainVariance.DATE_KEYS and value is not None else value
+
+# Transform to key merged variance partials on their grain, applying the date filter of date filtered grains
+class VarianceGrainsFromPartials(beam.DoFn):
+    """Drops the record date from variance partial keys, skipping partials outside the date range for date filtered grains"""
+
+    def __init__(self, grains: list[tuple], dates: dict):
+        beam.DoFn.__init__(self)
+        self._date_filtered = {var_type for var_type, _, _, date_filtered in grains if date_filtered}
+        self._dates = dates
+
+    def process(self, element):
+        (var_type, group_values, record_date), measures = element
+        if var_type in self._date_filtered and not Filters.in_date_range(date.fromordinal(record_date), self._dates):
+            return
+        yield (var_type, group_values), measures
+
+# Transform to convert combined variance grain totals into Variance models
+class VarianceFromGrainTotals(beam.DoFn):
+    """Names the group key values and totals of a variance grain result and converts to a Variance model"""
+
+    def __init__(self, grains: list[tuple], fixed_point: bool = False):
+        beam.DoFn.__init__(self)
+        self._group_keys = {var_type: group_keys for var_type, _, group_keys, _ in grains}
+        self._fixed_point = fixed_point
+
+    def process(self, element):
+        (var_type, group_values), totals = element
+        group_fields = dict(zip(self._group_keys[var_type], group_values))
+        for key in MultiGrainVariance.DATE_KEYS:
+            if group_fields.get(key, None) is not None:
+                group_fields[key] = date.fromordinal(group_fields[key])
+        result = beam.Row(
+            **group_fields,
+            **dict(zip(MultiGrainVariance.TOTAL_FIELDS + MultiGrainVariance.GIT_FIELDS, totals))
+        )
+        yield Variance.from_result(result, var_type=var_type, fixed_point=self._fixed_point)
+
+# Transform to route Variance models to an output per variance grain
+class SplitVarianceByGrain(beam.DoFn):
+    """Emits each Variance model to the tagged output named by its variance type"""
+    def process(self, row):
+        yield beam.pvalue.TaggedOutput(row.variance_type, row)
+
+# Composite transform to aggregate variance for several grains in a single pass
+class MultiGrainVariance(beam.PTransform):
+    """Aggregates variance totals for each declared grain with one scan and one combine of the input, returning a dict of Variance collections keyed on variance type.
+
+    With a partials output path, measures are first summed per grain and record date into partials, merged with any
+    previous partials read from a file pattern and written out as JSON lines. Grain totals are then summed from the
+    merged partials, so incremental runs only scan new rows yet report totals over the full history. In fixed point
+    mode the collections hold VarianceUnits models"""
+
+    MEASURE_FIELDS = ['pkrd_quantity', 'pkrd_value_tp', 'nfsi_quantity', 'nfsi_value', 'quantity_variance', 'value_variance_tp']
+    TOTAL_FIELDS = ['total_' + field for field in MEASURE_FIELDS]
+    GIT_FIELDS = ['is_git', 'git_quantity', 'git_value']
+    DATE_KEYS = [Names.RECORD_DATE]
+
+    def __init__(self, grains: list[tuple] = Names.VARIANCE_GRAINS, dates: dict = None, fixed_point: bool = False,
+                 previous_partials: str = None, partials_output: str = None):
+        beam.PTransform.__init__(self)
+        self._grains = grains
+        self._dates = {} if dates is None else dates
+        self._fixed_point = fixed_point
+        self._previous_partials = previous_partials
+        self._partials_output = partials_output
+
+    def expand(self, pcoll):
+        if self._partials_output is None:
+            keyed = pcoll | 'Key by variance grains' >> beam.ParDo(KeyByVarianceGrains(self._grains, self._dates))
+        else:
+            keyed = self.merge_partials(pcoll) | 'Key partials by variance grains' >> beam.ParDo(
+                VarianceGrainsFromPartials(self._grains, self._dates))
+        model = Variance.model(self._fixed_point)
+        variance = (
+            keyed
+            | 'Sum variance by grain'
+            >> beam.CombinePerKey(VarianceSumCombineFn(len(self.MEASURE_FIELDS), goods_in_transit=True, fixed_point=self._fixed_point))
+            | 'Variance grain totals to model'
+            >> beam.ParDo(VarianceFromGrainTotals(self._grains, self._fixed_point)).with_output_types(model)
+        )
+        var_types = [var_type for var_type, _, _, _ in self._grains]
+        grains = (
+            variance
+            | 'Split variance by grain'
+            >> beam.ParDo(SplitVarianceByGrain())
+                .with_output_types(model, **{var_type: model for var_type in var_types})
+                .with_outputs(*var_types)
+        )
+        return {var_type: grains[var_type] for var_type in var_types}
+
+    def merge_partials(self, pcoll):
+        """Sums measures per grain and record date, merged with previous partials and written to the partials output"""
+        partials = [pcoll | 'Key by variance grain dates' >> beam.ParDo(KeyByVarianceGrains(self._grains, self._dates, partial=True))]
+        if self._previous_partials is not None:
+            partials.append(
+                pcoll.pipeline
+                | 'Read previous variance partials' >> ReadFromText(self._previous_partials, validate=False)
+                | 'Decode previous variance partials' >> beam.Map(self.decode_partial)
+            )
+        merged = (
+            partials
+            | 'Flatten variance partials' >> beam.Flatten()
+            | 'Sum variance partials'
+            >> beam.CombinePerKey(VarianceSumCombineFn(len(self.MEASURE_FIELDS), fixed_point=self._fixed_point))
+        )
+        _ = (
+            merged
+            | 'Encode variance partials' >> beam.Map(self.encode_partial)
+            | 'Write variance partials' >> WriteToText(self._partials_output, file_name_suffix='.json')
+        )
+        return merged
+
+    @staticmethod
+    def encode_partial(element) -> str:
+        (var_type, group_values, record_date), measures = element
+        return json.dumps([var_type, list(group_values), record_date, list(measures)])
+
+    @staticmethod
+    def decode_partial(line: str) -> tuple:
+        var_type, group_values, record_date, measures = json.loads(line)
+        return (var_type, tuple(group_values), record_date), tuple(measures)
+
 # Transform to generate variance totals
 class CalculateVarianceTotals(beam.PTransform):
     """Aggregates category level totals for variance. Calculates GIT impact on PTD/Sales"""
 
-    def __init__(self, report_type: str, group_key: str = 'depot_category'):
+    TOTAL_FIELDS = MultiGrainVariance.TOTAL_FIELDS + ['git_quantity', 'git_value']
+    SUM_FIELDS = ['sum_' + field.removeprefix('total_') for field in TOTAL_FIELDS]
+
+    def __init__(self, report_type: str, group_key: str = 'depot_category', fixed_point: bool = False):
         beam.PTransform.__init__(self)
         self._report_type = report_type
         self._group_key = group_key
+        self._fixed_point = fixed_point
 
     def expand(self, pcoll):
         return (
             pcoll
+            | 'Key totals for {}'.format(self._report_type)
+            >> beam.Map(lambda row: (getattr(row, self._group_key), tuple(getattr(row, f) for f in self.TOTAL_FIELDS)))
             | 'Grand totals for {}'.format(self._report_type)
-            >> beam.GroupBy(self._group_key)
-                        .aggregate_field('total_pkrd_quantity', sum, 'sum_pkrd_quantity')  
-                        .aggregate_field('total_pkrd_value_tp', sum, 'sum_pkrd_value_tp')
-                        .aggregate_field('total_nfsi_quantity', sum, 'sum_nfsi_quantity')
-                        .aggregate_field('total_nfsi_value', sum, 'sum_nfsi_value')
-                        .aggregate_field('total_quantity_variance', sum, 'sum_quantity_variance')
-                        .aggregate_field('total_value_variance_tp', sum, 'sum_value_variance_tp') 
-                        .aggregate_field('git_quantity', sum, 'sum_git_quantity')
-                        .aggregate_field('git_value', sum, 'sum_git_value') 
+            >> beam.CombinePerKey(VarianceSumCombineFn(len(self.TOTAL_FIELDS), fixed_point=self._fixed_point))
+            | 'Name totals for {}'.format(self._report_type)
+            >> beam.Map(lambda kv: beam.Row(**{self._group_key: kv[0]}, **dict(zip(self.SUM_FIELDS, kv[1]))))
         ) 
 
+# Transform to drop FinRecData rows whose fingerprint is in the known fingerprint set side input
+class DropKnownFingerprints(beam.DoFn):
+    """Drops rows whose record date and fingerprint are already in the known set, counting the duplicates"""
+
+    def __init__(self):
+        beam.DoFn.__init__(self)
+        self._duplicates = Metrics.counter(self.__class__, 'duplicate_rows')
+
+    def process(self, row, known: dict):
+        if Fingerprints.partition_key(row.record_date, row.fingerprint, row.fingerprint_id) in known:
+            self._duplicates.inc()
+            return
+        yield row
+
+# Combine fingerprint keys into a Bloom filter sized for a month of keys
+class BloomFilterCombineFn(beam.CombineFn):
+    """Adds keys to a Bloom filter sized for a capacity and false positive rate, merging partial filters by bitwise OR"""
+
+    def __init__(self, capacity: int, fp_rate: float = BloomFilter.DEFAULT_FP_RATE):
+        beam.CombineFn.__init__(self)
+        self._capacity = capacity
+        self._fp_rate = fp_rate
+
+    def create_accumulator(self):
+        return BloomFilter.for_capacity(self._capacity, self._fp_rate)
+
+    def add_input(self, accumulator, key):
+        accumulator.add(key)
+        return accumulator
+
+    def merge_accumulators(self, accumulators):
+        accumulators = iter(accumulators)
+        merged = next(accumulators)
+        for accumulator in accumulators:
+            merged.merge(accumulator)
+        return merged
+
+    def extract_output(self, accumulator):
+        return accumulator
+
+# Transform to split FinRecData rows on whether their fingerprint may be in the known fingerprint Bloom filter
+class SplitOnBloomFilter(beam.DoFn):
+    """Outputs rows whose fingerprint is not in the Bloom filter side input as new, and the rest as candidates
+    for an exact check against the known fingerprint sets"""
+
+    CANDIDATES = 'candidates'
+
+    def __init__(self):
+        beam.DoFn.__init__(self)
+        self._candidates = Metrics.counter(self.__class__, 'bloom_filter_positives')
+
+    def process(self, row, bloom: BloomFilter):
+        if Fingerprints.partition_key(row.record_date, row.fingerprint, row.fingerprint_id) in bloom:
+            self._candidates.inc()
+            yield beam.pvalue.TaggedOutput(self.CANDIDATES, row)
+        else:
+            yield row
+
+# Transform to drop grouped candidate rows whose fingerprint key is confirmed in the known fingerprint sets
+class DropConfirmedFingerprints(beam.DoFn):
+    """Drops candidate rows grouped with a matching known fingerprint, counting the duplicates"""
+
+    def __init__(self):
+        beam.DoFn.__init__(self)
+        self._duplicates = Metrics.counter(self.__class__, 'duplicate_rows')
+
+    def process(self, element):
+        _, groups = element
+        rows = list(groups['rows'])
+        if any(True for _ in groups['known']):
+            self._duplicates.inc(len(rows))
+            return
+        yield from rows
+
+# Composite transform to drop FinRecData rows already loaded, exporting the fingerprints of new rows
+class DedupFingerprints(beam.PTransform):
+    """Drops FinRecData rows already loaded in the load month, matching on record date, fingerprint and fingerprint ID
+    as fin_rec_data_view does. Fingerprint sets are exported per load month and record date partition under the
+    fingerprint directory, one run per subdirectory, and read back by later runs in the same month. A run writes its
+    fingerprint sets and Bloom filter to a staging directory under its run directory, which later runs do not read.
+    They are moved into place by publish once the pipeline, and so the load of the new rows, has succeeded. Rows of
+    a failed run are then not treated as known by a rerun.
+
+    With a false positive rate set, known fingerprints are summarised by a Bloom filter stored per load month next to
+    the fingerprint sets and loaded as a side input, in place of the full known set. Only rows the filter reports as
+    possibly known are checked exactly, against the fingerprint sets of their record date partitions. Each run stores
+    the filter of the previous run extended with its new fingerprints, building the filter from the fingerprint sets
+    when there is none or a later run published fingerprints without one.
+    The false positive rate holds while the month has no more fingerprints than the filter capacity"""
+
+    BLOOM_SUFFIX = '.bloom'
+    STAGING_DIR = 'staging'
+    DEFAULT_CAPACITY = 10_000_000
+
+    def __init__(self, fingerprint_dir: str, load_month: str, run_id: str,
+                 fp_rate: float | None = None, capacity: int = DEFAULT_CAPACITY):
+        beam.PTransform.__init__(self)
+        self._month_dir = FileSystems.join(fingerprint_dir, load_month)
+        self._run_id = run_id
+        self._staging_dir = self.staging_dir(fingerprint_dir, load_month, run_id)
+        self._fp_rate = fp_rate
+        self._capacity = capacity
+
+    @classmethod
+    def staging_dir(cls, fingerprint_dir: str, load_month: str, run_id: str) -> str:
+        """Returns the directory a run writes its fingerprint sets and Bloom filter to until they are published"""
+        return FileSystems.join(fingerprint_dir, load_month, run_id, cls.STAGING_DIR)
+
+    @classmethod
+    def publish(cls, fingerprint_dir: str, load_month: str, run_id: str):
+        """Moves the fingerprint sets and Bloom filter staged by a run into place, so later runs treat its rows as known.
+        The Bloom filter is moved last, as it covers the fingerprint sets"""
+        month_dir = FileSystems.join(fingerprint_dir, load_month)
+        staging_dir = cls.staging_dir(fingerprint_dir, load_month, run_id)
+        match_result = FileSystems.match([FileSystems.join(staging_dir, '*')])[0]
+        staged = sorted(metadata.path for metadata in match_result.metadata_list)
+        fingerprint_sets = [path for path in staged if not path.endswith(cls.BLOOM_SUFFIX)]
+        blooms = [path for path in staged if path.endswith(cls.BLOOM_SUFFIX)]
+        if len(fingerprint_sets) > 0:
+            FileSystems.rename(fingerprint_sets,
+                               [FileSystems.join(month_dir, run_id, FileSystems.split(path)[1]) for path in fingerprint_sets])
+        if len(blooms) > 0:
+            FileSystems.rename(blooms, [FileSystems.join(month_dir, run_id + cls.BLOOM_SUFFIX)])
+        if FileSystems.exists(staging_dir):
+            FileSystems.delete([staging_dir])
+
+    @classmethod
+    def latest_bloom_filter(cls, month_dir: str) -> str | None:
+        """Returns the path of the Bloom filter stored by the latest run in a load month, if any. None is returned if
+        a later run, such as one reading the full fingerprint sets, published fingerprints without a filter, as the
+        filter would miss them and must be rebuilt from the fingerprint sets"""
+        bloom_match, export_match = FileSystems.match([FileSystems.join(month_dir, '*' + cls.BLOOM_SUFFIX),
+                                                       FileSystems.join(month_dir, '*', '*.txt')])
+        paths = sorted(metadata.path for metadata in bloom_match.metadata_list)
+        if not paths:
+            return None
+        bloom_run_id = FileSystems.split(paths[-1])[1].removesuffix(cls.BLOOM_SUFFIX)
+        export_run_ids = {FileSystems.split(FileSystems.split(metadata.path)[0])[1] for metadata in export_match.metadata_list}
+        if any(run_id > bloom_run_id for run_id in export_run_ids):
+            logging.info('Bloom filter %s is older than the fingerprint sets of run %s, rebuilding it',
+                         paths[-1], max(export_run_ids))
+            return None
+        return paths[-1]
+
+    @classmethod
+    def store_bloom_filter(cls, bloom: BloomFilter, path: str):
+        """Stores a load month Bloom filter, warning once it holds more fingerprints than it was sized for"""
+        if bloom.count > bloom.capacity:
+            logging.warning('Bloom filter %s holds %d fingerprints over its capacity of %d, raising its false positive '
+                            'rate. Increase the fingerprint filter capacity', path, bloom.count, bloom.capacity)
+        bloom.write(path)
+
+    def expand(self, pcoll):
+        if self._fp_rate is None:
+            rows = self.drop_known(pcoll)
+        else:
+            rows = self.drop_bloom_filtered(pcoll)
+        _ = (
+            rows
+            | 'Fingerprint keys' >> beam.Map(lambda row: Fingerprints.partition_key(row.record_date, row.fingerprint, row.fingerprint_id))
+            | 'Export fingerprints by record date'
+            >> fileio.WriteToFiles(path=self._staging_dir,
+                                   destination=lambda key: key.split(',')[0],
+                                   sink=lambda destination: fileio.TextSink(),
+                                   file_naming=fileio.destination_prefix_naming('.txt'))
+        )
+        return rows
+
+    def drop_known(self, pcoll):
+        """Drops known rows using the fingerprint sets of the whole load month as a side input"""
+        known = (
+            pcoll.pipeline
+            | 'Known fingerprint sets' >> beam.Create([FileSystems.join(self._month_dir, '*', '*.txt')])
+            | 'Read known fingerprints' >> ReadAllFromText()
+            | 'Key known fingerprints' >> beam.Map(lambda key: (key, None))
+        )
+        return (
+            pcoll
+            | 'Drop known fingerprints'
+            >> beam.ParDo(DropKnownFingerprints(), beam.pvalue.AsDict(known)).with_output_types(FinRecData)
+        )
+
+    def drop_bloom_filtered(self, pcoll):
+        """Drops known rows using the load month Bloom filter as a side input, checking its positives exactly"""
+        previous = self.latest_bloom_filter(self._month_dir)
+        if previous is not None:
+            bloom = (
+                pcoll.pipeline
+                | 'Bloom filter path' >> beam.Create([previous])
+                | 'Read Bloom filter' >> beam.Map(BloomFilter.read)
+            )
+        else:
+            bloom = (
+                pcoll.pipeline
+                | 'Known fingerprint sets' >> beam.Create([FileSystems.join(self._month_dir, '*', '*.txt')])
+                | 'Read known fingerprints' >> ReadAllFromText()
+                | 'Build Bloom filter' >> beam.CombineGlobally(BloomFilterCombineFn(self._capacity, self._fp_rate))
+            )
+        split = (
+            pcoll
+            | 'Test fingerprints against Bloom filter'
+            >> beam.ParDo(SplitOnBloomFilter(), beam.pvalue.AsSingleton(bloom))
+            .with_outputs(SplitOnBloomFilter.CANDIDATES, main='new')
+        )
+        candidates = (
+            split[SplitOnBloomFilter.CANDIDATES]
+            | 'Key candidate fingerprints'
+            >> beam.Map(lambda row: (Fingerprints.partition_key(row.record_date, row.fingerprint, row.fingerprint_id), row))
+        )
+        known = (
+            split[SplitOnBloomFilter.CANDIDATES]
+            | 'Candidate record dates' >> beam.Map(lambda row: str(row.record_date))
+            | 'Distinct candidate record dates' >> beam.Distinct()
+            | 'Candidate fingerprint sets' >> beam.Map(lambda record_date: FileSystems.join(self._month_dir, '*', f'{record_date}-*.txt'))
+            | 'Read candidate known fingerprints' >> ReadAllFromText()
+            | 'Key candidate known fingerprints' >> beam.Map(lambda key: (key, None))
+        )
+        unconfirmed = (
+            {'rows': candidates, 'known': known}
+            | 'Group candidates with known fingerprints' >> beam.CoGroupByKey()
+            | 'Drop confirmed fingerprints' >> beam.ParDo(DropConfirmedFingerprints()).with_output_types(FinRecData)
+        )
+        rows = (
+            (split.new, unconfirmed)
+            | 'Merge new rows' >> beam.Flatten().with_output_types(FinRecData)
+        )
+        bloom_path = FileSystems.join(self._staging_dir, self._run_id + self.BLOOM_SUFFIX)
+        _ = (
+            pcoll.pipeline
+            | 'Bloom filter update' >> beam.Create([None])
+            | 'Add new fingerprints to Bloom filter'
+            >> beam.Map(lambda _, bloom, keys: bloom.copy().add_all(keys),
+                        beam.pvalue.AsSingleton(bloom),
+                        beam.pvalue.AsIter(rows | 'New fingerprint keys' >> beam.Map(
+                            lambda row: Fingerprints.partition_key(row.record_date, row.fingerprint, row.fingerprint_id))))
+            | 'Store Bloom filter' >> beam.Map(self.store_bloom_filter, bloom_path)
+        )
+        return rows
+
+# Transform to convert fixed point money units in models back to float values for output
+class ToMoneyValues(beam.PTransform):
+    """Converts fixed point FinRecDataUnits, VarianceUnits or SummaryTotalUnits models to the float valued model"""
+
+    def __init__(self, model: type):
+        beam.PTransform.__init__(self)
+        self._model = model
+
+    def expand(self, pcoll):
+        return (
+            pcoll
+            | '{} money values'.format(self._model.__name__)
+            >> beam.Map(lambda row: row.money_values()).with_output_types(self._model)
+        )
+
 # Transform PCollection to output as CSV file
 def write_data_as_csv(pcoll, output: str, prefix: str):
     """Writes PCollection to CSV in target destination"""
@@ -5,9 +5,12 @@
 Fin Rec quantity and value variance data model class
 """
 
-__all__ = ["Variance"]
+__all__ = ["Variance", "VarianceUnits"]
 
+from apache_beam import coders
 from typing import NamedTuple, Optional
+from datetime import date
+from modules.Money import Money
 from modules.Names import Names
 from modules.Parsers import Parsers
 
@@ -15,7 +18,7 @@ class Variance(NamedTuple):
     """Model for describing variance aggregations""" 
     variance_type: str
     source_data_type: Optional[str]
-    record_date: Optional[str]
+    record_date: Optional[date]
     depot_id: Optional[str]
     depot_name: Optional[str]
     depot_category: str
@@ -31,6 +34,14 @@ class Variance(NamedTuple):
     git_quantity: Optional[int]
     git_value: Optional[float]
 
+    # Monetary fields held as integer money units in fixed point mode
+    MONEY_FIELDS = ['total_pkrd_value_tp', 'total_nfsi_value', 'total_value_variance_tp', 'git_value']
+
+    @classmethod
+    def model(cls, fixed_point: bool = False) -> type:
+        """Returns the model type for a money mode, VarianceUnits with money fields as int64 units in fixed point mode"""
+        return VarianceUnits if fixed_point else cls
+
     def bigquery_dict(self, metadata_fields: dict) -> dict:
         """Returns instance as dict keyed on BigQuery table column names"""
         d = self._asdict()
@@ -38,8 +49,12 @@ class Variance(NamedTuple):
         return metadata_fields
 
     @classmethod
-    def from_result(cls, result, var_type: str):
-        return cls(
+    def from_result(cls, result, var_type: str, fixed_point: bool = False):
+        # Combined results carry the GIT flag, otherwise it is derived once from the totals
+        is_git = Parsers.get_attribute(result, 'is_git')
+        if is_git is None:
+            is_git = cls.is_goods_in_transit(result)
+        return cls.model(fixed_point)(
             variance_type=var_type,
             source_data_type=Parsers.get_attribute(result, Names.SOURCE_DATA_TYPE),
             record_date=Parsers.get_attribute(result, Names.RECORD_DATE),
@@ -54,16 +69,23 @@ class Variance(NamedTuple):
             total_value_variance_tp=result.total_value_variance_tp,
             moveorder_short=Parsers.get_attribute(result, Names.MO_SHORT),
             sku=Parsers.get_attribute(result, Names.SKU),
-            is_git=cls.is_goods_in_transit(result),
-            git_quantity=cls.get_git_quantity(result),
-            git_value=cls.get_git_value(result)
+            is_git=is_git,
+            git_quantity=result.total_quantity_variance if is_git else 0,
+            git_value=result.total_value_variance_tp if is_git else 0
         )
     
     @classmethod
     def is_goods_in_transit(cls, result) -> bool:
         """Determines if instance qualifies as goods in transit"""
-        pkrd_zero = (result.total_pkrd_quantity == 0 and result.total_pkrd_value_tp == 0)    
-        nfsi_zero = (result.total_nfsi_quantity == 0 and result.total_nfsi_value == 0)
+        return cls.goods_in_transit(
+            result.total_pkrd_quantity, result.total_pkrd_value_tp, result.total_nfsi_quantity, result.total_nfsi_value
+        )
+
+    @classmethod
+    def goods_in_transit(cls, pkrd_quantity: int, pkrd_value_tp: float, nfsi_quantity: int, nfsi_value: float) -> bool:
+        """Goods in transit when only one of the PKRD and NFSI totals is zero"""
+        pkrd_zero = (pkrd_quantity == 0 and pkrd_value_tp == 0)
+        nfsi_zero = (nfsi_quantity == 0 and nfsi_value == 0)
         if (pkrd_zero and nfsi_zero == False) or (pkrd_zero == False and nfsi_zero):
             return True
         else:
@@ -75,6 +97,13 @@ class Variance(NamedTuple):
     
     @classmethod
     def get_git_value(cls, result) -> float:
-        return result.total_value_variance_tp if cls.is_goods_in_transit(result) else 0    
+        return result.total_value_variance_tp if cls.is_goods_in_transit(result) else 0
+
+# Fixed point variant of Variance with money fields schema coded as INT64 units
+VarianceUnits = Money.units_model(Variance)
+
+# Encode Variance with the schema aware RowCoder rather than pickling
+coders.registry.register_coder(Variance, coders.RowCoder)
+coders.registry.register_coder(VarianceUnits, coders.RowCoder)
 
-# fmt: on
\ No newline at end of file
+# fmt: on
@@ -2,6 +2,7 @@ WITH fingerprint_ts AS (
     SELECT
         record_date,
         fingerprint,
+        fingerprint_id,
         MAX(created_ts) AS ts
     FROM `mm_fin_internal.fin_rec_data`
     WHERE record_date > DATE_SUB(CURRENT_DATE(), INTERVAL 1 YEAR)
@@ -9,10 +10,12 @@ WITH fingerprint_ts AS (
     AND valid_from >= TIMESTAMP_TRUNC(CURRENT_TIMESTAMP(), MONTH)
     GROUP BY      
         record_date,      
-        fingerprint
+        fingerprint,
+        fingerprint_id
     ORDER BY
       record_date,
       fingerprint,
+      fingerprint_id,
       ts DESC
 )
 SELECT
@@ -40,11 +43,13 @@ SELECT
   frd.quantity_variance,
   frd.value_variance,
   frd.value_variance_tp,
-  frd.fingerprint
+  frd.fingerprint,
+  frd.fingerprint_id
 FROM  
   fingerprint_ts fpts,
   `mm_fin_internal.fin_rec_data` frd
 WHERE fpts.record_date = frd.record_date
-AND fpts.fingerprint = frd.fingerprint
+AND fpts.fingerprint IS NOT DISTINCT FROM frd.fingerprint
+AND fpts.fingerprint_id IS NOT DISTINCT FROM frd.fingerprint_id
 AND fpts.ts = frd.created_ts
 ;
\ No newline at end of file
@@ -0,0 +1,51 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import pytest
+from modules.BloomFilter import BloomFilter
+from modules.Fingerprints import Fingerprints
+
+
+def keys(start: int, stop: int) -> list[str]:
+    return [Fingerprints.partition_key('2024-01-01', Fingerprints.sha256(str(i))[0], None) for i in range(start, stop)]
+
+
+class TestBloomFilter:
+    """Unit tests for the BloomFilter class"""
+
+    def test_for_capacity(self):
+        bloom = BloomFilter.for_capacity(1000, 0.01)
+        assert bloom.num_bits == 9586
+        assert bloom.num_hashes == 7
+        assert bloom.size_in_bytes == 1199
+        with pytest.raises(ValueError):
+            BloomFilter.for_capacity(1000, 0)
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter.for_capacity(2000, 0.01).add_all(keys(0, 2000))
+        assert all(key in bloom for key in keys(0, 2000))
+        assert len(bloom) == 2000
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter.for_capacity(5000, 0.01).add_all(keys(0, 5000))
+        false_positives = sum(key in bloom for key in keys(5000, 25000))
+        assert false_positives / 20000 < 0.02
+
+    def test_merge(self):
+        merged = BloomFilter.for_capacity(100).add_all(keys(0, 50)).merge(BloomFilter.for_capacity(100).add_all(keys(50, 100)))
+        assert merged == BloomFilter.for_capacity(100).add_all(keys(0, 100))
+        assert len(merged) == 100
+        with pytest.raises(ValueError):
+            merged.merge(BloomFilter.for_capacity(200))
+
+    def test_serialise(self, tmp_path):
+        bloom = BloomFilter.for_capacity(100).add_all(keys(0, 100))
+        restored = BloomFilter.from_bytes(bloom.to_bytes())
+        assert restored == bloom
+        assert (restored.capacity, restored.count) == (100, 100)
+        bloom.write(str(tmp_path / 'filter.bloom'))
+        assert BloomFilter.read(str(tmp_path / 'filter.bloom')) == bloom
+        with pytest.raises(ValueError):
+            BloomFilter.from_bytes(bloom.to_bytes()[:-1])
+
+# fmt: on
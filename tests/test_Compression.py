@@ -0,0 +1,127 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import bz2
+import gzip
+import pytest
+import random
+import zstandard
+from pathlib import Path
+import apache_beam as beam
+from apache_beam.io.filesystem import CompressionTypes
+from apache_beam.io.textio import ReadFromText
+from apache_beam.testing.util import assert_that, equal_to
+from modules.CsvFileUtils import CsvFileUtils
+from modules.Compression import Compression, DecompressedRangeReader
+from modules.FileUtils import FileUtils
+from modules.InputPrefetch import InputPrefetch
+from modules.StorageBackend import InMemoryStorageBackend
+from modules.Transforms import CsvToDict, ReadCsvColumns, TranscodeCsv
+
+HEADER = b'"Move Date","Item No., SKU",Qty\n'
+ROW = b'01/01/2023,60330045,12\n'
+COMPRESSORS = {
+    '.gz': gzip.compress,
+    # Bzip2 decompresses whole blocks, so small blocks let header reads stop early
+    '.bz2': lambda data: bz2.compress(data, compresslevel=1),
+    '.zst': lambda data: zstandard.ZstdCompressor().compress(data),
+}
+
+
+class TestCompression:
+    """Unit tests for the Compression class"""
+
+    @pytest.mark.parametrize(
+        "path, expected",
+        [
+            ('gs://bucket/pkrd.csv', CompressionTypes.UNCOMPRESSED),
+            ('gs://bucket/pkrd.csv.gz', CompressionTypes.GZIP),
+            ('pkrd.csv.bz2', CompressionTypes.BZIP2),
+            ('pkrd.csv.zst', CompressionTypes.ZSTD),
+        ]
+    )
+    def test_detect(self, path: str, expected: str):
+        assert Compression.detect(path) == expected
+        assert Compression.is_compressed(path) == (expected != CompressionTypes.UNCOMPRESSED)
+
+    def test_detect_rejects_unsupported(self):
+        with pytest.raises(ValueError):
+            Compression.detect('pkrd.csv.xz')
+
+    @pytest.mark.parametrize("suffix", COMPRESSORS.keys())
+    def test_header_from_compressed_file(self, tmp_path: Path, suffix: str):
+        path = tmp_path / f'pkrd.csv{suffix}'
+        path.write_bytes(COMPRESSORS[suffix](HEADER + ROW * 1000))
+        assert FileUtils.get_csv_column_names(str(path)) == ['Move Date', 'Item No., SKU', 'Qty']
+
+    @pytest.mark.parametrize("suffix", COMPRESSORS.keys())
+    def test_range_reader_reads_only_leading_bytes(self, suffix: str):
+        content = HEADER + random.Random(0).randbytes(200000)
+        backend = InMemoryStorageBackend({'mem://pkrd': COMPRESSORS[suffix](content)})
+        read_range = DecompressedRangeReader(lambda start, end: backend.read_range('mem://pkrd', start, end),
+                                             Compression.detect(f'pkrd.csv{suffix}'), range_bytes=1 << 10)
+        assert read_range(0, 10) == content[:10]
+        assert read_range(10, 4096) == content[10:4096]
+        assert read_range.compressed_bytes_read < len(backend.files['mem://pkrd'])
+        assert read_range(4096, len(content) + 10) == content[4096:]
+        assert read_range.eof and read_range.decompressed_bytes == len(content)
+
+    def test_prefetch_estimates_decompressed_content(self, tmp_path: Path):
+        path = tmp_path / 'pkrd.csv.gz'
+        path.write_bytes(gzip.compress(HEADER + ROW * 100000))
+        metadata = InputPrefetch.resolve(str(path))
+        assert metadata.header == ['Move Date', 'Item No., SKU', 'Qty']
+        assert metadata.size == path.stat().st_size
+        assert metadata.content_size == pytest.approx(len(HEADER + ROW * 100000), rel=0.1)
+        assert metadata.row_estimate == pytest.approx(100000, rel=0.1)
+
+    def test_transcoded_shards(self, tmp_path: Path):
+        prefix = Compression.transcoded_prefix(str(tmp_path), 'gs://bucket/pkrd.csv.gz', '1')
+        assert prefix != Compression.transcoded_prefix(str(tmp_path), 'gs://bucket/pkrd.csv.gz', '2')
+        assert Compression.transcoded_shards(prefix) is None
+        Path(prefix).parent.mkdir()
+        Path(f'{prefix}-00000-of-00002.csv.gz').write_bytes(b'')
+        assert Compression.transcoded_shards(prefix) is None
+        Path(f'{prefix}-00001-of-00002.csv.gz').write_bytes(b'')
+        assert Compression.transcoded_shards(prefix) == [f'{prefix}-0000{i}-of-00002.csv.gz' for i in range(2)]
+
+    def test_with_transcoded(self):
+        transcoded = {'pkrd-1.csv.gz': ['part-0.csv.gz', 'part-1.csv.gz']}
+        assert Compression.with_transcoded('pkrd-*', ['pkrd-0.csv', 'pkrd-1.csv.gz'], transcoded) == [
+            'pkrd-0.csv', 'part-0.csv.gz', 'part-1.csv.gz']
+        assert Compression.with_transcoded(['pkrd-0.csv'], ['pkrd-0.csv', 'pkrd-1.csv.gz'], transcoded) == ['pkrd-0.csv']
+        assert Compression.with_transcoded('pkrd-0.csv', ['pkrd-0.csv'], transcoded) == 'pkrd-0.csv'
+
+    def test_transcode_csv(self, tmp_path: Path):
+        source = tmp_path / 'pkrd.csv.zst'
+        rows = [f'01/01/2023,{i},12'.encode('utf-8') for i in range(1000)]
+        source.write_bytes(COMPRESSORS['.zst'](HEADER + b'\n'.join(rows) + b'\n'))
+        prefix = Compression.transcoded_prefix(str(tmp_path / 'transcoded'), str(source), '1')
+        header = FileUtils.get_csv_column_names(str(source))
+        with beam.Pipeline() as p:
+            p | 'Transcode' >> TranscodeCsv(str(source), header, prefix, 4)
+        shards = Compression.transcoded_shards(prefix)
+        assert len(shards) == 4
+        assert all(FileUtils.get_csv_column_names(shard) == header for shard in shards)
+        transcoded_rows = [row for shard in shards for row in gzip.decompress(Path(shard).read_bytes()).splitlines()[1:]]
+        assert sorted(transcoded_rows) == sorted(rows)
+
+    @pytest.mark.parametrize("suffix", COMPRESSORS.keys())
+    def test_columnar_read_matches_text_read(self, tmp_path: Path, suffix: str):
+        path = tmp_path / f'pkrd.csv{suffix}'
+        rows = [f'01/01/2023,{i},12' for i in range(1000)]
+        path.write_bytes(COMPRESSORS[suffix](HEADER + '\n'.join(rows).encode('utf-8') + b'\n'))
+        header = FileUtils.get_csv_column_names(str(path))
+        expected = CsvFileUtils.csv_rows_as_dicts(rows, header)
+        with beam.Pipeline() as p:
+            text_rows = (
+                p
+                | 'Read CSV' >> ReadFromText(str(path), skip_header_lines=1)
+                | 'CSV to dictionary' >> beam.ParDo(CsvToDict(), header)
+            )
+            # Small blocks read the decompressed content in several batches
+            columnar_rows = p | 'Read CSV columns' >> ReadCsvColumns(str(path), header, header, block_size=1 << 12)
+            assert_that(text_rows, equal_to(expected), label='Text rows')
+            assert_that(columnar_rows, equal_to(expected), label='Columnar rows')
+
+# fmt: on
@@ -0,0 +1,80 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import io
+import pytest
+from modules.CsvFileUtils import CsvFileUtils
+
+class TestCsvFileUtils:
+    """Unit tests for the CsvFileUtils class"""
+
+    COLS = ["Store", "Item No.", "Move Order"]
+
+    @pytest.mark.parametrize(
+        "row, expected",
+        [
+            (
+                '709,60112345,MM04326789/005',
+                {"Store": "709", "Item No.": "60112345", "Move Order": "MM04326789/005"},
+            ),
+            (
+                '"709","6011,2345",MM04326789/005',
+                {"Store": "709", "Item No.": "6011,2345", "Move Order": "MM04326789/005"},
+            ),
+            (
+                '709,60112345',
+                {"Store": "709", "Item No.": "60112345", "Move Order": CsvFileUtils.MISSING_COLS_VALUE},
+            ),
+            (
+                '709,60112345,MM04326789/005,X,Y',
+                {
+                    "Store": "709",
+                    "Item No.": "60112345",
+                    "Move Order": "MM04326789/005",
+                    CsvFileUtils.EXTRA_COLS_KEY: ["X", "Y"]
+                },
+            ),
+        ],
+    )
+    def test_csv_row_as_dict(self, row: str, expected: dict):
+        assert CsvFileUtils.csv_row_as_dict(row, self.COLS) == expected
+
+    def test_csv_rows_as_dicts(self):
+        rows = [
+            '709,60112345,MM04326789/005',
+            '"709","6011,2345",MM04326789/005',
+            '709,60112345',
+            '709,60112345,MM04326789/005,X,Y',
+        ]
+        expected = [CsvFileUtils.csv_row_as_dict(row, self.COLS) for row in rows]
+        assert CsvFileUtils.csv_rows_as_dicts(rows, self.COLS) == expected
+
+    def test_csv_rows_as_dicts_skips_blank_rows(self):
+        rows = ['709,60112345,MM04326789/005', '', '718,60654321,MM012345']
+        assert CsvFileUtils.csv_rows_as_dicts(rows, self.COLS) == [
+            {"Store": "709", "Item No.": "60112345", "Move Order": "MM04326789/005"},
+            {"Store": "718", "Item No.": "60654321", "Move Order": "MM012345"},
+        ]
+
+    def test_csv_rows_as_dicts_unbalanced_quotes(self):
+        rows = ['709,"60112345,MM04326789/005', '718,60654321,MM012345']
+        expected = [CsvFileUtils.csv_row_as_dict(row, self.COLS) for row in rows]
+        assert CsvFileUtils.csv_rows_as_dicts(rows, self.COLS) == expected
+
+    def test_csv_record_batches(self):
+        csv_bytes = (
+            '﻿Store,Item No.,Move Order,Qty\n'
+            '709,60112345,MM04326789/005,-12\n'
+            '"718","0654,321",,5\n'
+            '989,60669876\n'
+        ).encode('utf-8')
+        invalid_rows = []
+        batches = CsvFileUtils.csv_record_batches(io.BytesIO(csv_bytes), ["Store", "Move Order", "Item No."], invalid_rows=invalid_rows)
+        rows = [row for batch in batches for row in batch.to_pylist()]
+        assert rows == [
+            {"Store": "709", "Item No.": "60112345", "Move Order": "MM04326789/005"},
+            {"Store": "718", "Item No.": "0654,321", "Move Order": ""},
+        ]
+        assert invalid_rows == ['989,60669876']
+
+# fmt: on
@@ -0,0 +1,63 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import pytest
+from pathlib import Path
+from modules.CsvFileUtils import CsvFileUtils
+from modules.FileUtils import FileUtils
+from modules.StorageBackend import GcsStorageBackend, InMemoryStorageBackend, LocalStorageBackend
+
+
+class RangeReader:
+    """Stand-in for a ranged object download, recording the ranges requested"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.ranges = []
+
+    def __call__(self, start: int, end: int) -> bytes:
+        self.ranges.append((start, end))
+        return self.data[start:end]
+
+
+class TestFileUtils:
+    """Unit tests for the FileUtils class"""
+
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            (b'Store,Item No.,Move Order\r\n709,601,MM01\r\n', ['Store', 'Item No.', 'Move Order']),
+            (b'\xef\xbb\xbfStore,Item No.\n709,601\n', ['Store', 'Item No.']),
+            (b'"Store, Depot","Item\nNo.",Qty\n709,601,1\n', ['Store, Depot', 'Item\nNo.', 'Qty']),
+            (b'Store,Item No.', ['Store', 'Item No.']),
+            (b'', []),
+        ],
+    )
+    def test_csv_header_from_ranges(self, data: bytes, expected: list[str]):
+        assert FileUtils.csv_header_from_ranges(RangeReader(data)) == expected
+
+    def test_csv_header_reads_only_leading_ranges(self):
+        header = ','.join(f'column {i}' for i in range(40)).encode('utf-8')
+        read_range = RangeReader(header + b'\n' + b'709,601\n' * 100000)
+        assert len(FileUtils.csv_header_from_ranges(read_range, range_bytes=64)) == 40
+        assert read_range.ranges == [(0, 64), (64, 192), (192, 448)]
+
+    def test_get_local_csv_column_names(self, tmp_path: Path):
+        path = tmp_path / 'pkrd.csv'
+        path.write_bytes(b'\xef\xbb\xbf"Move Date","Item No."\n01/01/2023,60330045\n')
+        assert FileUtils.get_local_csv_column_names(str(path)) == ['Move Date', 'Item No.']
+
+    def test_registered_storage_backend(self):
+        backend = InMemoryStorageBackend({'mem://bucket/pkrd.csv': b'Move Date,Item No.\n01/01/2023,60330045\n'})
+        FileUtils.register_storage_backend('mem://', backend)
+        try:
+            assert FileUtils.storage_backend('mem://bucket/pkrd.csv') is backend
+            assert CsvFileUtils.csv_column_names('mem://bucket/pkrd.csv') == ['Move Date', 'Item No.']
+            assert backend.reads == [('mem://bucket/pkrd.csv', 0, FileUtils.HEADER_RANGE_BYTES)]
+            assert FileUtils.get_gcs_file_as_text('mem://bucket/pkrd.csv').startswith('Move Date')
+        finally:
+            FileUtils.register_storage_backend('mem://', None)
+        assert isinstance(FileUtils.storage_backend('mem://bucket/pkrd.csv'), LocalStorageBackend)
+        assert isinstance(FileUtils.storage_backend('gs://bucket/pkrd.csv'), GcsStorageBackend)
+
+# fmt: on
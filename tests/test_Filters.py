@@ -173,4 +173,47 @@ class TestFilters:
         row = request.getfixturevalue(row)
         assert Filters.filter_exclude_depot_id(row, depot_id) == expected
 
+    @pytest.mark.parametrize(
+        "data, type, dates, expected",
+        [
+            (
+                {"Move Order": "MM012345/005", "Store": "709", "Move Date": "01/01/2023"},
+                Names.TYPE_PKRD,
+                None,
+                True
+            ),
+            (
+                {"Move Order": "SS012345/005", "Store": "709", "Move Date": "01/01/2023"},
+                Names.TYPE_PKRD,
+                None,
+                False
+            ),
+            (
+                {"Move Order": "MM012345/005", "Store": "CSL1", "Move Date": "01/01/2023"},
+                Names.TYPE_PKRD,
+                None,
+                False
+            ),
+            (
+                {"Move Order": "MM012345/005", "Store": "709", "Move Date": "01/01/2023"},
+                Names.TYPE_PKRD,
+                {Names.START_DATE: date(2023, 1, 2), Names.END_DATE: None},
+                False
+            ),
+            (
+                {"SORDNO_ITM1": "SS012345", "DEPOT": "CSL", "ACTUAL_TRAN_DATE": "01/01/2023"},
+                Names.TYPE_FRESH,
+                {Names.START_DATE: date(2023, 1, 1), Names.END_DATE: date(2023, 1, 1)},
+                True
+            ),
+        ],
+    )
+    def test_filter_source_row(self, data: dict, type: str, dates: dict, expected: bool):
+        assert Filters.filter_source_row(data, type, dates) == expected
+
+    def test_has_source_filters(self):
+        assert Filters.has_source_filters(Names.TYPE_PKRD)
+        assert not Filters.has_source_filters(Names.TYPE_FRESH)
+        assert Filters.has_source_filters(Names.TYPE_FRESH, {Names.START_DATE: date(2023, 1, 1)})
+
 # fmt: on
\ No newline at end of file
@@ -0,0 +1,104 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import pytest
+from pytest import FixtureRequest
+from typing import Dict
+from modules.Fingerprints import Fingerprints
+from modules.FinRecBatch import FinRecBatch
+from modules.FinRecData import FinRecData
+from modules.Names import Names
+
+
+class TestFinRecBatch:
+    """Unit tests for the FinRecBatch class"""
+
+    @staticmethod
+    def assert_identical(actual: list[FinRecData], expected: list[FinRecData]):
+        assert actual == expected
+        for a, e in zip(actual, expected):
+            assert [type(v) for v in a] == [type(v) for v in e]
+
+    @pytest.mark.parametrize(
+        "type, data",
+        [
+            (Names.TYPE_PKRD, 'pkrd_data'),
+            (Names.TYPE_FRESH, 'fresh_data'),
+            (Names.TYPE_NON_NFSI, 'non_nfsi_data'),
+            (Names.TYPE_FROZEN, 'frozen_data'),
+        ],
+    )
+    def test_from_dicts(self, type: str, data: Dict, request: FixtureRequest):
+        data = request.getfixturevalue(data)
+        expected = [FinRecData.from_dataset(type, data)]
+        self.assert_identical(FinRecBatch.from_dicts(type, [data]), expected)
+
+    @pytest.mark.parametrize(
+        "type, data, overrides",
+        [
+            (
+                Names.TYPE_PKRD,
+                'pkrd_data',
+                [
+                    {"Move Order": "SS001", "Qty": "1,200", "Value": "£(12.50)"},
+                    {"Move Order": "", "SMS_ORDER_NUMBER": "", "Move Date": "bad date"},
+                    {Names.UNIT_PRICE: None, Names.CASE_PRICE: None},
+                    {},
+                ],
+            ),
+            (
+                Names.TYPE_FRESH,
+                'fresh_data',
+                [
+                    {"LPC": "+12", "DEPOT": "7"},
+                    {"LPC": "", "TOTAL_COST": "invalid"},
+                    {"ORDER_NO": None},
+                    {},
+                ],
+            ),
+            (
+                Names.TYPE_NON_NFSI,
+                'non_nfsi_data',
+                [
+                    {"Item No": "1234567"},
+                    {"Item No": "1"},
+                    {"Item No": "0012345"},
+                    {"QTY In Cases": "12.9"},
+                ],
+            ),
+        ],
+    )
+    def test_from_dicts_mixed_batch(self, type: str, data: Dict, overrides: list[Dict], request: FixtureRequest):
+        data = request.getfixturevalue(data)
+        rows = []
+        for override in overrides:
+            row = dict(data)
+            for k, v in override.items():
+                if v is None:
+                    row.pop(k, None)
+                else:
+                    row[k] = v
+            rows.append(row)
+        expected = [FinRecData.from_dataset(type, dict(row)) for row in rows]
+        self.assert_identical(FinRecBatch.from_dicts(type, rows), expected)
+
+    @pytest.mark.parametrize("scheme", Fingerprints.SCHEMES)
+    def test_from_dicts_fingerprint_scheme(self, scheme: str, fresh_data: Dict):
+        rows = [dict(fresh_data), dict(fresh_data, LPC="441156")]
+        expected = [FinRecData.from_dataset(Names.TYPE_FRESH, dict(row), scheme) for row in rows]
+        self.assert_identical(FinRecBatch.from_dicts(Names.TYPE_FRESH, rows, scheme), expected)
+
+    @pytest.mark.parametrize("type, data", [(Names.TYPE_PKRD, 'pkrd_data'), (Names.TYPE_FROZEN, 'frozen_data')])
+    def test_from_dicts_fixed_point(self, type: str, data: str, request: FixtureRequest):
+        data = request.getfixturevalue(data)
+        rows = [dict(data), dict(data)]
+        expected = [FinRecData.from_dataset(type, dict(row), fixed_point=True) for row in rows]
+        self.assert_identical(FinRecBatch.from_dicts(type, rows, fixed_point=True), expected)
+
+    def test_from_dicts_missing_depot_fields(self, fresh_data: Dict):
+        rows = [dict(fresh_data), dict(fresh_data)]
+        del rows[1][Names.DEPOT_NAME]
+        with pytest.raises(KeyError):
+            FinRecBatch.from_dicts(Names.TYPE_FRESH, rows)
+
+# fmt: on
@@ -4,7 +4,12 @@
 import pytest
 from pytest import FixtureRequest
 from typing import Dict
-from modules.FinRecData import FinRecData
+from apache_beam import coders
+from apache_beam.portability.api import schema_pb2
+from apache_beam.typehints.schemas import schema_from_element_type
+from modules.Fingerprints import Fingerprints
+from modules.FinRecData import FinRecData, FinRecDataUnits
+from modules.Money import Money
 from modules.Names import Names
 
 
@@ -61,5 +66,52 @@ class TestFinRecData:
         assert frd.quantity_variance == expected.quantity_variance
         assert frd.value_variance == expected.value_variance
         assert frd.value_variance_tp == expected.value_variance_tp
+        assert len(frd.fingerprint) == 64
+        assert frd.fingerprint_id is None
 
-# fmt: on
\ No newline at end of file
+    def test_from_dataset_compact_fingerprint(self, pkrd_data: Dict):
+        sha = FinRecData.from_dataset(Names.TYPE_PKRD, pkrd_data)
+        frd = FinRecData.from_dataset(Names.TYPE_PKRD, pkrd_data, Fingerprints.XXHASH)
+        assert frd.fingerprint is None
+        assert isinstance(frd.fingerprint_id, int)
+        assert frd._replace(fingerprint=sha.fingerprint, fingerprint_id=None) == sha
+
+    @pytest.mark.parametrize("type, data", [(Names.TYPE_PKRD, 'pkrd_data'), (Names.TYPE_FRESH, 'fresh_data')])
+    def test_from_dataset_fixed_point(self, type: str, data: str, request: FixtureRequest):
+        data = request.getfixturevalue(data)
+        expected = FinRecData.from_dataset(type, data)
+        frd = FinRecData.from_dataset(type, data, fixed_point=True)
+        assert isinstance(frd, FinRecDataUnits)
+        for field in FinRecData.MONEY_FIELDS:
+            assert isinstance(getattr(frd, field), int)
+            assert getattr(frd, field) == Money.to_units(getattr(expected, field))
+        assert frd.money_values() == expected
+
+    def test_units_schema(self):
+        fields = {field.name: field.type for field in schema_from_element_type(FinRecData).fields}
+        units_fields = {field.name: field.type for field in schema_from_element_type(FinRecDataUnits).fields}
+        assert list(units_fields) == list(fields)
+        for name, field_type in units_fields.items():
+            if name in FinRecData.MONEY_FIELDS + ['quantity_variance']:
+                assert field_type.atomic_type == schema_pb2.INT64
+                assert field_type.nullable == fields[name].nullable
+            else:
+                assert field_type == fields[name]
+
+    def test_units_coder_keeps_integer_units(self, fresh_data: Dict):
+        frd = FinRecData.from_dataset(Names.TYPE_FRESH, fresh_data, fixed_point=True)
+        coder = coders.registry.get_coder(FinRecDataUnits)
+        assert isinstance(coder, coders.RowCoder)
+        decoded = coder.decode(coder.encode(frd))
+        assert decoded == frd
+        assert [type(v) for v in decoded] == [type(v) for v in frd]
+        assert FinRecDataUnits._field_defaults == FinRecData._field_defaults
+
+    def test_fixed_point_value_variance_keeps_5dp(self, pkrd_data: Dict):
+        data = dict(pkrd_data, **{Names.CASE_PRICE: 3.47073})
+        assert FinRecData.from_dataset(Names.TYPE_PKRD, data).value_variance_tp == -426.8998
+        frd = FinRecData.from_dataset(Names.TYPE_PKRD, data, fixed_point=True)
+        assert frd.pkrd_value_tp == frd.value_variance_tp == -42689979
+        assert frd.money_values().value_variance_tp == -426.89979
+
+# fmt: on
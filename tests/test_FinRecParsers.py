@@ -646,4 +646,54 @@ class TestFinRecParsers:
     def test_nfsi_val(self, type: str, data: Dict, expected: float):
         assert FinRecParsers.nfsi_val(type, data) == expected
 
+    @pytest.mark.parametrize(
+        "type",
+        [
+            Names.TYPE_PKRD,
+            Names.TYPE_FRESH,
+            Names.TYPE_FROZEN,
+            Names.TYPE_NON_NFSI,
+            Names.TYPE_SALES,
+        ],
+    )
+    def test_plan(self, type: str):
+        plan = FinRecParsers.plan(type)
+        assert plan.type == type
+        assert FinRecParsers.plan(type) is plan
+
+    @pytest.mark.parametrize(
+        "type, data, expected",
+        [
+            (
+                Names.TYPE_PKRD,
+                {},
+                {
+                    Names.DEPOT_ID: "",
+                    Names.MO_SHORT: "MISSING_MO",
+                    Names.ORDER_ID: None,
+                    Names.SKU: "",
+                    Names.SKU_MO: "MISSING_MISSING_MO",
+                    Names.SKU_ORDER: "MISSING_MISSING",
+                },
+            ),
+            (
+                Names.TYPE_NON_NFSI,
+                {
+                    "Item No": "1",
+                    "Customer No": "100456",
+                },
+                {
+                    Names.DEPOT_ID: "100456",
+                    Names.MO_SHORT: "MISSING_MO",
+                    Names.ORDER_ID: None,
+                    Names.SKU: "1",
+                    Names.SKU_MO: "1_MISSING_MO",
+                    Names.SKU_ORDER: "1_MISSING",
+                },
+            ),
+        ],
+    )
+    def test_plan_computed_fields_defaults(self, type: str, data: Dict, expected: Dict):
+        assert FinRecParsers.plan(type).computed_fields(data) == expected
+
 # fmt: on
@@ -0,0 +1,76 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import pickle
+import pytest
+from pytest import FixtureRequest
+from typing import Dict
+from modules.FinRecData import FinRecData
+from modules.FinRecRecord import FinRecRecord
+from modules.Mappers import Mappers
+from modules.Names import Names
+
+
+class TestFinRecRecord:
+    """Unit tests for the FinRecRecord class"""
+
+    def test_from_dict_drops_unmapped_columns(self, pkrd_dict: Dict):
+        record = FinRecRecord.from_dict(Names.TYPE_PKRD, dict(pkrd_dict, Unmapped="x"))
+        assert record == pkrd_dict
+        assert "Unmapped" not in record
+        assert record.type == Names.TYPE_PKRD
+
+    def test_dict_access(self, fresh_dict: Dict):
+        record = FinRecRecord.from_dict(Names.TYPE_FRESH, fresh_dict)
+        assert record["LPC"] == "654321"
+        assert record.get(Names.SKU, "") == ""
+        with pytest.raises(KeyError):
+            record[Names.SKU]
+        record[Names.SKU] = "60654321"
+        record.update({"extra": 1})
+        assert record[Names.SKU] == "60654321"
+        assert record["extra"] == 1
+        assert len(record) == len(fresh_dict) + 2
+
+    @pytest.mark.parametrize(
+        "element, type",
+        [
+            ("pkrd_dict", Names.TYPE_PKRD),
+            ("fresh_dict", Names.TYPE_FRESH),
+            ("frozen_dict", Names.TYPE_FROZEN),
+            ("non_nfsi_dict", Names.TYPE_NON_NFSI),
+            ("sales_dict", Names.TYPE_SALES),
+        ],
+    )
+    def test_add_computed_fields(self, element: str, type: str, request: FixtureRequest):
+        element = request.getfixturevalue(element)
+        record = FinRecRecord.from_dict(type, element)
+        assert Mappers.add_computed_fields(record, type) == Mappers.add_computed_fields(dict(element), type)
+
+    def test_subset_for_join(self, sales_dict: Dict):
+        record = Mappers.add_computed_fields(FinRecRecord.from_dict(Names.TYPE_SALES, sales_dict), Names.TYPE_SALES)
+        key, extract = Mappers.subset_for_join(record, Names.SKU_MO, Names.SALES_SLICE)
+        assert key == record[Names.SKU_MO]
+        assert extract == {k: record[k] for k in Names.SALES_SLICE}
+        assert Mappers.subset_for_join(record, Names.SKU_MO)[1] is record
+
+    def test_project_skips_unset_keys(self, pkrd_dict: Dict):
+        record = FinRecRecord.from_dict(Names.TYPE_PKRD, pkrd_dict)
+        projected = record.project(["Store", Names.DEPOT_NAME, "Unmapped"])
+        assert projected == {"Store": pkrd_dict["Store"]}
+        assert projected.type == Names.TYPE_PKRD
+
+    def test_pickle(self, pkrd_data: Dict):
+        record = FinRecRecord.from_dict(Names.TYPE_PKRD, pkrd_data)
+        record["extra"] = 1
+        restored = pickle.loads(pickle.dumps(record))
+        assert restored == record
+        assert Names.SKU not in restored
+        assert len(pickle.dumps(record)) < len(pickle.dumps(dict(record.items())))
+
+    @pytest.mark.parametrize("type, data", [(Names.TYPE_PKRD, 'pkrd_data'), (Names.TYPE_FRESH, 'fresh_data')])
+    def test_from_dataset(self, type: str, data: str, request: FixtureRequest):
+        data = request.getfixturevalue(data)
+        assert FinRecData.from_dataset(type, FinRecRecord.from_dict(type, data)) == FinRecData.from_dataset(type, data)
+
+# fmt: on
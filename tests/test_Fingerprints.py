@@ -0,0 +1,38 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import hashlib
+from datetime import date
+import pytest
+from modules.Fingerprints import Fingerprints
+
+
+class TestFingerprints:
+    """Unit tests for the Fingerprints class"""
+
+    def test_sha256(self):
+        hash_input = "2023-01-01PKRD60330045_MM01234560330045_8811223709T123456789-1230"
+        expected = hashlib.sha256(hash_input.encode('utf-8')).hexdigest()
+        assert Fingerprints.hasher(Fingerprints.SHA256)(hash_input) == (expected, None)
+        assert Fingerprints.hasher()(hash_input) == (expected, None)
+
+    @pytest.mark.parametrize("scheme", [Fingerprints.BLAKE2B, Fingerprints.XXHASH])
+    def test_compact_schemes(self, scheme: str):
+        hasher = Fingerprints.hasher(scheme)
+        fingerprint, fingerprint_id = hasher("2023-01-01PKRD")
+        assert fingerprint is None
+        assert isinstance(fingerprint_id, int)
+        assert -(1 << 63) <= fingerprint_id < (1 << 63)
+        assert hasher("2023-01-01PKRD") == (None, fingerprint_id)
+        assert hasher("2023-01-02PKRD") != (None, fingerprint_id)
+
+    def test_unknown_scheme(self):
+        with pytest.raises(ValueError):
+            Fingerprints.hasher("md5")
+
+    def test_partition_key(self):
+        assert Fingerprints.partition_key(date(2023, 1, 1), "abc", None) == "2023-01-01,abc,"
+        assert Fingerprints.partition_key(date(2023, 1, 1), None, -42) == "2023-01-01,,-42"
+        assert Fingerprints.partition_key(date(2023, 1, 1), None, 0) == "2023-01-01,,0"
+
+# fmt: on
@@ -0,0 +1,78 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import pytest
+from pathlib import Path
+from modules.FileUtils import FileUtils
+from modules.InputPrefetch import InputMetadata, InputPrefetch
+from modules.StorageBackend import InMemoryStorageBackend
+
+HEADER = b'Move Date,Item No.,Qty\n'
+ROW = b'01/01/2023,60330045,12\n'
+
+
+class TestInputPrefetch:
+    """Unit tests for the InputPrefetch class"""
+
+    @pytest.fixture
+    def backend(self):
+        backend = InMemoryStorageBackend({
+            'mem://bucket/small.csv': HEADER + ROW * 3 + b'01/01/2023,60330045,12',
+            'mem://bucket/large.csv': HEADER + ROW * 100000,
+            'mem://bucket/empty.csv': b'',
+        })
+        FileUtils.register_storage_backend('mem://', backend)
+        yield backend
+        FileUtils.register_storage_backend('mem://', None)
+
+    def test_resolve(self, backend: InMemoryStorageBackend):
+        small = InputPrefetch.resolve('mem://bucket/small.csv')
+        assert small.header == ['Move Date', 'Item No.', 'Qty']
+        assert (small.size, small.row_estimate) == (len(backend.files['mem://bucket/small.csv']), 4)
+        large = InputPrefetch.resolve('mem://bucket/large.csv')
+        assert large.row_estimate == pytest.approx(100000, rel=0.01)
+        assert backend.reads[-1] == ('mem://bucket/large.csv', 0, InputPrefetch.SAMPLE_BYTES)
+        assert InputPrefetch.resolve('mem://bucket/empty.csv') == InputMetadata('mem://bucket/empty.csv', [], 0, '0', 0, 0)
+
+    def test_resolve_long_header(self, backend: InMemoryStorageBackend, monkeypatch):
+        monkeypatch.setattr(InputPrefetch, 'SAMPLE_BYTES', 8)
+        assert InputPrefetch.resolve('mem://bucket/small.csv').header == ['Move Date', 'Item No.', 'Qty']
+
+    def test_prefetch_uses_cache(self, backend: InMemoryStorageBackend, tmp_path: Path):
+        cache_path = str(tmp_path / 'inputs.json')
+        paths = ['mem://bucket/small.csv', 'mem://bucket/large.csv', 'mem://bucket/small.csv']
+        inputs = InputPrefetch.prefetch(paths, cache_path)
+        assert list(inputs.keys()) == ['mem://bucket/small.csv', 'mem://bucket/large.csv']
+        assert inputs['mem://bucket/small.csv'].source == 'mem://bucket/small.csv'
+        metadata = {path: input_files.files[0] for path, input_files in inputs.items()}
+        assert InputPrefetch.read_cache(cache_path) == metadata
+        backend.reads.clear()
+        assert InputPrefetch.prefetch(paths, cache_path) == inputs
+        assert backend.reads == []
+        backend.files['mem://bucket/small.csv'] += b'\n' + ROW
+        assert InputPrefetch.prefetch(paths, cache_path)['mem://bucket/small.csv'].row_estimate == 5
+        assert [path for path, _, _ in backend.reads] == ['mem://bucket/small.csv']
+
+    def test_prefetch_directory_and_glob(self, tmp_path: Path):
+        input_dir = tmp_path / 'pkrd'
+        (input_dir / 'archive').mkdir(parents=True)
+        (input_dir / 'pkrd-2.csv').write_bytes(HEADER + ROW * 2)
+        (input_dir / 'pkrd-1.csv').write_bytes(HEADER + ROW)
+        (input_dir / 'empty.csv').write_bytes(b'')
+        inputs = InputPrefetch.prefetch([str(input_dir), str(input_dir / 'pkrd-*.csv')])
+        directory = inputs[str(input_dir)]
+        assert directory.source == str(input_dir / '*')
+        assert directory.paths == [str(input_dir / name) for name in ('empty.csv', 'pkrd-1.csv', 'pkrd-2.csv')]
+        assert (directory.header, directory.row_estimate) == (['Move Date', 'Item No.', 'Qty'], 3)
+        assert inputs[str(input_dir / 'pkrd-*.csv')].paths == directory.paths[1:]
+        assert directory.size == inputs[str(input_dir / 'pkrd-*.csv')].size
+
+    def test_prefetch_rejects_mismatched_headers(self, tmp_path: Path):
+        (tmp_path / 'pkrd-1.csv').write_bytes(HEADER + ROW)
+        (tmp_path / 'pkrd-2.csv').write_bytes(b'Item No.,Move Date,Qty\n' + ROW)
+        with pytest.raises(ValueError, match='pkrd-2.csv'):
+            InputPrefetch.prefetch([str(tmp_path / 'pkrd-*.csv')])
+        with pytest.raises(ValueError, match='No input files'):
+            InputPrefetch.prefetch([str(tmp_path / 'sales-*.csv')])
+
+# fmt: on
@@ -0,0 +1,73 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import pytest
+import weakref
+from pathlib import Path
+from apache_beam.io.filesystems import FileSystems
+from modules.LookupCache import LookupCache
+from modules.Names import Names
+
+DEPOT_COLS = [Names.DEPOT_ID, Names.DEPOT_NAME, Names.DEPOT_CATEGORY]
+
+
+class TestLookupCache:
+    """Unit tests for the LookupCache class"""
+
+    def depot_file(self, tmp_path: Path, rows: str) -> str:
+        path = tmp_path / 'depot.csv'
+        path.write_text('depot_id,depot_name,depot_category\n' + rows)
+        return str(path)
+
+    def test_build(self, tmp_path: Path):
+        source = self.depot_file(tmp_path, '709,"Depot A, North",NFSI Fresh\n987,Depot B,NFSI Frozen\n')
+        assert LookupCache.build(source, DEPOT_COLS, Names.DEPOT_ID) == {
+            '709': {Names.DEPOT_ID: '709', Names.DEPOT_NAME: 'Depot A, North', Names.DEPOT_CATEGORY: 'NFSI Fresh'},
+            '987': {Names.DEPOT_ID: '987', Names.DEPOT_NAME: 'Depot B', Names.DEPOT_CATEGORY: 'NFSI Frozen'},
+        }
+
+    def test_ensure_builds_once_per_content(self, tmp_path: Path):
+        cache_dir = str(tmp_path / 'cache')
+        source = self.depot_file(tmp_path, '709,Depot A,NFSI Fresh\n')
+        path = LookupCache.ensure(cache_dir, Names.TYPE_DEPOTS, source, DEPOT_COLS, Names.DEPOT_ID)
+        assert Path(path).name.startswith('depots-')
+        mtime = Path(path).stat().st_mtime_ns
+        assert LookupCache.ensure(cache_dir, Names.TYPE_DEPOTS, source, DEPOT_COLS, Names.DEPOT_ID) == path
+        assert Path(path).stat().st_mtime_ns == mtime
+        self.depot_file(tmp_path, '709,Depot A,NFSI Frozen\n')
+        changed = LookupCache.ensure(cache_dir, Names.TYPE_DEPOTS, source, DEPOT_COLS, Names.DEPOT_ID)
+        assert changed != path
+        assert LookupCache.load(changed)['709'][Names.DEPOT_CATEGORY] == 'NFSI Frozen'
+        assert LookupCache.path(cache_dir, Names.TYPE_DEPOTS, source, DEPOT_COLS[:2], Names.DEPOT_ID) != changed
+
+    def test_load_is_weakly_referenceable(self, tmp_path: Path):
+        source = self.depot_file(tmp_path, '709,Depot A,NFSI Fresh\n')
+        path = LookupCache.ensure(str(tmp_path), Names.TYPE_DEPOTS, source, DEPOT_COLS, Names.DEPOT_ID)
+        lookup = LookupCache.load(path)
+        assert weakref.ref(lookup)() == LookupCache.build(source, DEPOT_COLS, Names.DEPOT_ID)
+
+    def test_key_without_files(self, tmp_path: Path):
+        source = self.depot_file(tmp_path, '709,Depot A,NFSI Fresh\n')
+        assert LookupCache.key([], DEPOT_COLS, Names.DEPOT_ID) != LookupCache.key([source], DEPOT_COLS, Names.DEPOT_ID)
+        assert LookupCache.key(source, DEPOT_COLS, Names.DEPOT_ID) == LookupCache.key([source], DEPOT_COLS, Names.DEPOT_ID)
+        path = LookupCache.ensure(str(tmp_path), Names.TYPE_DEPOTS, [], DEPOT_COLS, Names.DEPOT_ID)
+        assert LookupCache.load(path) == {}
+
+    def test_ensure_writes_complete_files_only(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        cache_dir = tmp_path / 'cache'
+        source = self.depot_file(tmp_path, '709,Depot A,NFSI Fresh\n')
+        path = LookupCache.path(str(cache_dir), Names.TYPE_DEPOTS, source, DEPOT_COLS, Names.DEPOT_ID)
+
+        def fail_rename(sources, destinations):
+            raise OSError('worker lost')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(FileSystems, 'rename', fail_rename)
+            with pytest.raises(OSError):
+                LookupCache.ensure(str(cache_dir), Names.TYPE_DEPOTS, source, DEPOT_COLS, Names.DEPOT_ID)
+        assert not Path(path).exists()
+        assert LookupCache.ensure(str(cache_dir), Names.TYPE_DEPOTS, source, DEPOT_COLS, Names.DEPOT_ID) == path
+        assert [p.name for p in cache_dir.iterdir()] == [Path(path).name]
+        assert LookupCache.load(path) == LookupCache.build(source, DEPOT_COLS, Names.DEPOT_ID)
+
+# fmt: on
@@ -0,0 +1,55 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import os
+import pytest
+from pathlib import Path
+from modules.Manifest import Manifest
+
+class TestManifest:
+    """Unit tests for the Manifest class"""
+
+    @pytest.fixture
+    def input_file(self, tmp_path: Path) -> Path:
+        path = tmp_path / 'pkrd-1.csv'
+        path.write_text('Move Date,Qty\n01/01/2023,1\n')
+        return path
+
+    def test_new_files_are_unprocessed(self, input_file: Path):
+        manifest = Manifest()
+        pending = manifest.unprocessed(Manifest.scan(str(input_file)))
+        assert [entry.path for entry in pending] == [str(input_file)]
+        assert pending[0].size == input_file.stat().st_size
+        assert len(pending[0].checksum) == 64
+
+    def test_processed_files_are_skipped(self, input_file: Path):
+        manifest = Manifest()
+        manifest.add(manifest.unprocessed(Manifest.scan(str(input_file))))
+        assert manifest.unprocessed(Manifest.scan(str(input_file))) == []
+
+    def test_touched_files_are_refreshed(self, input_file: Path):
+        manifest = Manifest()
+        manifest.add(manifest.unprocessed(Manifest.scan(str(input_file))))
+        os.utime(input_file, (0, 0))
+        assert manifest.unprocessed(Manifest.scan(str(input_file))) == []
+        assert manifest.entries[str(input_file)].last_updated == 0
+
+    def test_changed_files_are_rejected(self, input_file: Path):
+        manifest = Manifest()
+        manifest.add(manifest.unprocessed(Manifest.scan(str(input_file))))
+        input_file.write_text('Move Date,Qty\n01/01/2023,2\n02/01/2023,3\n')
+        with pytest.raises(ValueError):
+            manifest.unprocessed(Manifest.scan(str(input_file)))
+
+    def test_read_write(self, input_file: Path, tmp_path: Path):
+        assert Manifest.read(str(tmp_path)).entries == {}
+        manifest = Manifest(partials='partials*', fixed_point=True, ingest_dates=['2023-01-01', '2023-02-01'])
+        manifest.add(manifest.unprocessed(Manifest.scan(str(tmp_path / '*.csv'))))
+        manifest.write(str(tmp_path))
+        restored = Manifest.read(str(tmp_path))
+        assert restored.entries == manifest.entries
+        assert restored.partials == 'partials*'
+        assert restored.fixed_point == True
+        assert restored.ingest_dates == ['2023-01-01', '2023-02-01']
+
+# fmt: on
@@ -4,6 +4,7 @@
 import pytest
 from pytest import fixture, FixtureRequest
 from typing import Dict
+from modules.FinRecParsers import FinRecParsers
 from modules.Mappers import Mappers
 from modules.Names import Names
 
@@ -243,4 +244,13 @@ class TestMappers:
         else:
             assert Mappers.subset_for_join(element, join_key, keys) == expected
 
+    @pytest.mark.parametrize("element, type", [("pkrd_dict", Names.TYPE_PKRD), ("fresh_dict", Names.TYPE_FRESH)])
+    def test_project_for_join(self, element: str, type: str, request: FixtureRequest):
+        element = Mappers.add_computed_fields(dict(request.getfixturevalue(element)), type)
+        keys = FinRecParsers.model_columns(type)
+        key, extract = Mappers.project_for_join(element, Names.DEPOT_ID, keys)
+        assert key == element[Names.DEPOT_ID]
+        assert extract == {k: v for k, v in element.items() if k in keys}
+        assert Mappers.project_for_join(element, Names.DEPOT_ID) == Mappers.subset_for_join(element, Names.DEPOT_ID)
+
 # fmt: on
\ No newline at end of file
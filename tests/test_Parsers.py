@@ -1,6 +1,7 @@
 # fmt: off
 # pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
 
+import numpy as np
 import pytest
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
@@ -32,6 +33,23 @@ class TestParsers:
         assert Parsers.str_to_date("30-06-2024") is None
         assert Parsers.str_to_date("29/02/2023") is None
 
+    def test_str_to_date_cached(self, monkeypatch):
+        Parsers._date_cache.clear()
+        assert Parsers.str_to_date("01/01/2023") == date(2023, 1, 1)
+        assert Parsers.str_to_date("30-06-2024", date(2099, 12, 31)) == date(2099, 12, 31)
+        assert Parsers._date_cache == {("01/01/2023", Parsers.DATE_FORMAT): date(2023, 1, 1), ("30-06-2024", Parsers.DATE_FORMAT): None}
+        monkeypatch.setattr(Parsers, "parse_date", classmethod(lambda cls, date_str, date_format: pytest.fail("cache miss")))
+        assert Parsers.str_to_date("01/01/2023") == date(2023, 1, 1)
+        assert Parsers.str_to_date("30-06-2024") is None
+
+    def test_str_to_date_cache_bounded(self, monkeypatch):
+        Parsers._date_cache.clear()
+        monkeypatch.setattr(Parsers, "DATE_CACHE_SIZE", 2)
+        for day in range(1, 6):
+            assert Parsers.str_to_date(f"{day:02d}/01/2023") == date(2023, 1, day)
+            assert len(Parsers._date_cache) <= 2
+        assert Parsers.str_to_date("2023-01-05", date_format="%Y-%m-%d") == date(2023, 1, 5)
+
     def test_define_date_range(self):
         default_start_date = datetime.now().date() - relativedelta(months=1)
         default_end_date = datetime.now().date()
@@ -96,6 +114,13 @@ class TestParsers:
         assert Parsers.clean_float_value("123,456.78912") == 123456.78912
         assert Parsers.clean_float_value("invalid") == 0.0
 
+    def test_clean_money_value(self):
+        assert Parsers.clean_money_value("£123.45") == 12345000
+        assert Parsers.clean_money_value("(123.45)") == -12345000
+        assert Parsers.clean_money_value("123,456.78912") == 12345678912
+        assert Parsers.clean_money_value("0.123456") == 12346
+        assert Parsers.clean_money_value("invalid") == 0
+
     def test_clean_int_value(self):
         assert Parsers.clean_int_value("123,456") == 123456
         assert Parsers.clean_int_value("123.45") == 123
@@ -103,6 +128,27 @@ class TestParsers:
         assert Parsers.clean_int_value("1,234,567.89") == 1234567
         assert Parsers.clean_int_value("invalid") == 0
 
+    def test_clean_value_plain_numeric(self):
+        assert Parsers.clean_float_value("1e5") == 15.0
+        assert Parsers.clean_float_value("nan") == 0
+        assert Parsers.clean_int_value("-12.9") == -12
+        assert Parsers.clean_int_value("+12") == 12
+
+    def test_clean_value_invalid_is_not_printed(self, capsys):
+        Parsers.clean_float_value("#N/A")
+        Parsers.clean_int_value("#N/A")
+        assert capsys.readouterr().out == ''
+
+    def test_clean_float_values(self):
+        values = ["£123.45", "(123.45)", "£123.45", "invalid"]
+        assert Parsers.clean_float_values(values) == [123.45, -123.45, 123.45, 0]
+        assert Parsers.clean_float_values(np.array(values)) == [123.45, -123.45, 123.45, 0]
+
+    def test_clean_int_values(self):
+        values = ["123,456", "123.45", "invalid", "123.45"]
+        assert Parsers.clean_int_values(values) == [123456, 123, 0, 123]
+        assert Parsers.clean_int_values(np.array(values)) == [123456, 123, 0, 123]
+
     def test_clean_desc(self):
         assert Parsers.clean_desc('"This is a description."') == "This is a description."
         assert Parsers.clean_desc("This is a description.\n") == "This is a description."
@@ -0,0 +1,75 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+from modules import StorageBackend as storage_backend
+from modules.StorageBackend import GcsStorageBackend, InMemoryStorageBackend, LocalStorageBackend, StorageBackend
+
+
+class FakeClient:
+    created = 0
+
+    def __init__(self, credentials=None, _http=None):
+        FakeClient.created += 1
+        self.credentials = credentials
+        self._http = _http
+
+
+class TestStorageBackend:
+    """Unit tests for the storage backend classes"""
+
+    @pytest.fixture
+    def fake_client(self, monkeypatch):
+        FakeClient.created = 0
+        monkeypatch.setattr(storage_backend.storage, 'Client', FakeClient)
+        monkeypatch.setattr(storage_backend.google.auth, 'default', lambda scopes: (AnonymousCredentials(), None))
+        monkeypatch.setattr(GcsStorageBackend, '_client', None)
+        monkeypatch.setattr(GcsStorageBackend, '_client_pid', None)
+        return FakeClient
+
+    def test_gcs_client_created_once(self, fake_client):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: GcsStorageBackend.client(), range(32)))
+        assert fake_client.created == 1
+        assert all(client is clients[0] for client in clients)
+        assert isinstance(clients[0]._http, AuthorizedSession)
+        assert clients[0]._http.credentials is clients[0].credentials
+        assert clients[0]._http.adapters['https://']._pool_maxsize == GcsStorageBackend.POOL_SIZE
+
+    def test_backend_is_abstract(self):
+        class StatOnlyBackend(StorageBackend):
+            def stat(self, path: str) -> tuple[int, str]:
+                return 0, '0'
+
+        with pytest.raises(TypeError):
+            StorageBackend()
+        with pytest.raises(TypeError):
+            StatOnlyBackend()
+
+    def test_gcs_client_recreated_after_fork(self, fake_client, monkeypatch):
+        client = GcsStorageBackend.client()
+        monkeypatch.setattr(GcsStorageBackend, '_client_pid', -1)
+        assert GcsStorageBackend.client() is not client
+        assert fake_client.created == 2
+
+    def test_local_backend(self, tmp_path: Path):
+        path = tmp_path / 'data.csv'
+        path.write_bytes(b'\xef\xbb\xbfa,b\n1,2\n')
+        backend = LocalStorageBackend()
+        assert backend.read_range(str(path), 3, 6) == b'a,b'
+        assert backend.read_range(str(path), 11, 20) == b''
+        assert backend.read_text(str(path)) == 'a,b\n1,2\n'
+
+    def test_in_memory_backend(self):
+        backend = InMemoryStorageBackend({'mem://bucket/data.csv': b'a,b\n1,2\n'})
+        assert backend.read_range('mem://bucket/data.csv', 0, 3) == b'a,b'
+        assert backend.read_bytes('mem://bucket/data.csv') == b'a,b\n1,2\n'
+        assert backend.reads == [('mem://bucket/data.csv', 0, 3), ('mem://bucket/data.csv', None, None)]
+        with pytest.raises(FileNotFoundError):
+            backend.read_bytes('mem://bucket/missing.csv')
+
+# fmt: on
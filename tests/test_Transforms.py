@@ -0,0 +1,437 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import numpy as np
+import pytest
+from datetime import date
+from pathlib import Path
+import apache_beam as beam
+from apache_beam.io.textio import ReadFromText
+from apache_beam.metrics.metric import MetricsFilter
+from apache_beam.testing.util import assert_that, equal_to
+from modules.CsvFileUtils import CsvFileUtils
+from modules.Filters import Filters
+from modules.FinRecData import FinRecData
+from modules.FinRecRecord import FinRecRecord
+from modules.Money import Money
+from modules.Names import Names
+from modules.Transforms import CsvToDict, DedupFingerprints, FanOutHotKeys, HashLeftJoin, LeftJoin, MultiGrainVariance, ReadCsvColumns, SaltHotKeys, VarianceSumCombineFn
+from modules.Variance import Variance, VarianceUnits
+
+LEFT = Names.TYPE_PKRD
+RIGHT = Names.TYPE_SALES
+# Left rows keyed k1 match one right row, k2 none and k3 two right rows. The right-only k4 is dropped
+LEFT_ROWS = [
+    ('k1', {'id': 1, 'qty': 10}),
+    ('k1', {'id': 2, 'qty': 20}),
+    ('k2', {'id': 3, 'qty': 30}),
+    ('k3', {'id': 4, 'qty': 40}),
+]
+RIGHT_ROWS = [
+    ('k1', {'order_id': 'o1'}),
+    ('k3', {'order_id': 'o3a'}),
+    ('k3', {'order_id': 'o3b'}),
+    ('k4', {'order_id': 'o4'}),
+]
+MISSING_KEY = '{}_{}'.format(Names.MISSING, Names.MISSING)
+FRESH_COLS = ['ACTUAL_TRAN_DATE', 'LPC', 'SORDNO_ITM1', 'DEPOT', 'ORDER_NO', 'PACKS_RECEIVED', 'TOTAL_COST', 'Unmapped, col']
+
+
+def join_inputs(p, label: str, left_rows: list = LEFT_ROWS, right_rows: list = RIGHT_ROWS) -> dict:
+    """Creates the keyed left and right extracts of a join. Each join reads its own copies, as joins update left rows"""
+    return {
+        LEFT: p | '{} left rows'.format(label) >> beam.Create(left_rows),
+        RIGHT: p | '{} right rows'.format(label) >> beam.Create(right_rows),
+    }
+
+
+def expected_joined_rows(left_rows: list, right_rows: list):
+    """Returns a matcher of the rows of a left join, where a left row with several matches is merged with any one of them"""
+    def matcher(actual: list):
+        assert len(actual) == len(left_rows)
+        actual_by_id = {row['id']: row for row in actual}
+        for key, left_row in left_rows:
+            matches = [dict(left_row, **right_row, JOIN_MATCH=1) for right_key, right_row in right_rows if right_key == key]
+            assert actual_by_id[left_row['id']] in (matches if len(matches) > 0 else [dict(left_row, JOIN_MATCH=0)])
+    return matcher
+
+
+class TestReadCsvColumns:
+    """Unit tests for the ReadCsvColumns transform"""
+
+    ROWS = [
+        '06/01/2023,330029,MM010052,100709,88100025,40,187.22,"junk, ""x"""',
+        '15/01/2023,330001,MM010001,100718,88100001,10',
+        '15/01/2023,330002,MM010002,100718,88100002,20,99.5,"junk",extra1,extra2',
+        '20/03/2023,330006,MM010015,100718,88100018,169,672.42,',
+    ]
+
+    @pytest.fixture
+    def csv_path(self, tmp_path: Path) -> str:
+        path = tmp_path / 'fresh.csv'
+        path.write_text('\n'.join([CsvFileUtils.csv_line(FRESH_COLS)] + self.ROWS) + '\n')
+        return str(path)
+
+    @pytest.mark.parametrize("type", [None, Names.TYPE_FRESH])
+    def test_malformed_rows_match_text_path(self, csv_path: str, type: str):
+        # Unprojected reads request every column, projected reads the mapped columns only
+        columns = FRESH_COLS if type is None else FRESH_COLS[:-1]
+        dicts = CsvFileUtils.csv_rows_as_dicts(self.ROWS, FRESH_COLS)
+        expected = dicts if type is None else [FinRecRecord.from_dict(type, d) for d in dicts]
+        assert any(d.get(CsvFileUtils.EXTRA_COLS_KEY, None) == ['extra1', 'extra2'] for d in dicts)
+        with beam.Pipeline() as p:
+            text_rows = (
+                p
+                | 'Read CSV' >> ReadFromText(csv_path, skip_header_lines=1)
+                | 'CSV to dictionary' >> beam.ParDo(CsvToDict(type), FRESH_COLS)
+            )
+            columnar_rows = p | 'Read CSV columns' >> ReadCsvColumns(csv_path, FRESH_COLS, columns, type=type)
+            assert_that(text_rows, equal_to(expected), label='Text rows')
+            assert_that(columnar_rows, equal_to(expected), label='Columnar rows')
+
+
+class TestHashLeftJoin:
+    """Unit tests for the HashLeftJoin transform"""
+
+    def test_matches_shuffle_join(self):
+        matcher = expected_joined_rows(LEFT_ROWS, RIGHT_ROWS)
+        with beam.Pipeline() as p:
+            hash_joined = join_inputs(p, 'Hash') | 'Hash join' >> HashLeftJoin(LEFT, RIGHT)
+            shuffle_joined = join_inputs(p, 'Shuffle') | 'Shuffle join' >> LeftJoin(LEFT, RIGHT)
+            assert_that(hash_joined, matcher, label='Hash joined rows')
+            assert_that(shuffle_joined, matcher, label='Shuffle joined rows')
+
+    @pytest.mark.parametrize(
+        "strategy, right_bytes, expected",
+        [
+            (HashLeftJoin.JOIN_HASH, 1 << 30, True),
+            (HashLeftJoin.JOIN_SHUFFLE, 0, False),
+            (HashLeftJoin.JOIN_AUTO, 1 << 20, True),
+            (HashLeftJoin.JOIN_AUTO, (1 << 20) + 1, False),
+        ]
+    )
+    def test_is_preferred(self, strategy: str, right_bytes: int, expected: bool):
+        assert HashLeftJoin.is_preferred(strategy, 'sales.csv', 1 << 20, right_bytes=right_bytes) == expected
+
+    def test_is_preferred_sizes_right_files(self, tmp_path: Path):
+        for i in range(2):
+            (tmp_path / f'sales-{i}.csv').write_bytes(b'x' * 600)
+        pattern = str(tmp_path / 'sales-*.csv')
+        assert HashLeftJoin.is_preferred(HashLeftJoin.JOIN_AUTO, pattern, 1200) == True
+        assert HashLeftJoin.is_preferred(HashLeftJoin.JOIN_AUTO, pattern, 1199) == False
+
+
+class TestLeftJoin:
+    """Unit tests for the LeftJoin transform"""
+
+    # The blank composite key is always hot and k1 reaches the threshold of 3 rows
+    HOT_LEFT_ROWS = (
+        [(MISSING_KEY, {'id': i, 'qty': i}) for i in range(4)]
+        + [('k1', {'id': i, 'qty': i}) for i in range(4, 7)]
+        + [('k2', {'id': 7, 'qty': 7})]
+    )
+    HOT_RIGHT_ROWS = [
+        (MISSING_KEY, {'order_id': 'o0'}),
+        ('k1', {'order_id': 'o1a'}),
+        ('k1', {'order_id': 'o1b'}),
+        ('k3', {'order_id': 'o3'}),
+    ]
+
+    def test_salted_join_matches_plain_join(self):
+        matcher = expected_joined_rows(self.HOT_LEFT_ROWS, self.HOT_RIGHT_ROWS)
+        with beam.Pipeline() as p:
+            plain = join_inputs(p, 'Plain', self.HOT_LEFT_ROWS, self.HOT_RIGHT_ROWS) | 'Plain join' >> LeftJoin(LEFT, RIGHT)
+            salted = (
+                join_inputs(p, 'Salted', self.HOT_LEFT_ROWS, self.HOT_RIGHT_ROWS)
+                | 'Salted join' >> LeftJoin(LEFT, RIGHT, hot_key_threshold=3, hot_key_fanout=3, report_top_n=2)
+            )
+            assert_that(plain, matcher, label='Plain joined rows')
+            assert_that(salted, matcher, label='Salted joined rows')
+
+    def test_salts_hot_keys(self):
+        def check_salts(actual: list):
+            salts = {}
+            for (key, salt), _ in actual:
+                salts.setdefault(key, set()).add(salt)
+            assert len(salts.pop(MISSING_KEY)) > 1
+            assert len(salts.pop('k1')) > 1
+            assert salts == {'k2': {0}}
+
+        with beam.Pipeline() as p:
+            hot_keys = beam.pvalue.AsDict(p | 'Hot keys' >> beam.Create([('k1', 3)]))
+            salted = (
+                p
+                | 'Left rows' >> beam.Create(self.HOT_LEFT_ROWS)
+                | 'Salt left keys' >> beam.ParDo(SaltHotKeys(3, LeftJoin.KNOWN_HOT_KEYS), hot_keys)
+            )
+            fanned_out = (
+                p
+                | 'Right rows' >> beam.Create(self.HOT_RIGHT_ROWS)
+                | 'Fan out right keys' >> beam.ParDo(FanOutHotKeys(3, LeftJoin.KNOWN_HOT_KEYS), hot_keys)
+                | 'Right keys' >> beam.Map(lambda element: (element[0], element[1]['order_id']))
+            )
+            assert_that(salted, check_salts, label='Salted keys')
+            assert_that(fanned_out, equal_to(
+                [((MISSING_KEY, salt), 'o0') for salt in range(3)]
+                + [(('k1', salt), order_id) for salt in range(3) for order_id in ('o1a', 'o1b')]
+                + [(('k3', 0), 'o3')]
+            ), label='Fanned out keys')
+
+    def test_reports_key_group_sizes(self):
+        p = beam.Pipeline()
+        _ = (
+            join_inputs(p, 'Salted', self.HOT_LEFT_ROWS, self.HOT_RIGHT_ROWS)
+            | 'Salted join' >> LeftJoin(LEFT, RIGHT, hot_key_threshold=3, hot_key_fanout=3, report_top_n=2)
+        )
+        result = p.run()
+        result.wait_until_finish()
+        metrics = result.metrics().query(MetricsFilter().with_namespace('LeftJoin {} to {}'.format(LEFT, RIGHT)))
+        gauges = {gauge.key.metric.name: gauge.committed.value for gauge in metrics['gauges']}
+        assert gauges == {'top_1_key_group_size': 4, 'top_2_key_group_size': 3}
+        assert [counter.committed for counter in metrics['counters'] if counter.key.metric.name == 'hot_keys'] == [2]
+        group_sizes = metrics['distributions'][0].committed
+        assert (group_sizes.count, group_sizes.sum, group_sizes.max) == (3, 8, 4)
+
+
+def expected_variance(rows: list[FinRecData], grain: tuple, dates: dict) -> list[Variance]:
+    """Sums the measures of the rows of a variance grain per group, as a plain group by aggregation would"""
+    var_type, category, group_keys, date_filtered = grain
+    groups = {}
+    for row in rows:
+        if not Filters.filter_by_types(row, types=[Names.TYPE_PKRD, category], depot_type=category):
+            continue
+        if date_filtered and not Filters.filter_for_dates(row, dates):
+            continue
+        totals = groups.setdefault(tuple(getattr(row, key) for key in group_keys), [0] * len(MultiGrainVariance.MEASURE_FIELDS))
+        for i, field in enumerate(MultiGrainVariance.MEASURE_FIELDS):
+            totals[i] += getattr(row, field)
+    return [
+        Variance.from_result(beam.Row(**dict(zip(group_keys, key)), **dict(zip(MultiGrainVariance.TOTAL_FIELDS, totals))), var_type)
+        for key, totals in groups.items()
+    ]
+
+
+def variance_matcher(expected: list[Variance]):
+    """Returns a matcher of Variance models, comparing money totals approximately and every other field exactly"""
+    def sort_key(row: Variance) -> str:
+        return repr(row._replace(**{field: None for field in Variance.MONEY_FIELDS}))
+
+    def matcher(actual: list[Variance]):
+        assert len(actual) == len(expected)
+        for a, e in zip(sorted(actual, key=sort_key), sorted(expected, key=sort_key)):
+            assert sort_key(a) == sort_key(e)
+            assert [getattr(a, field) for field in Variance.MONEY_FIELDS] == pytest.approx(
+                [getattr(e, field) for field in Variance.MONEY_FIELDS])
+    return matcher
+
+
+class TestVarianceSumCombineFn:
+    """Unit tests for the VarianceSumCombineFn combiner"""
+
+    # PKRD, NFSI and variance measures of two in transit rows and one row with PKRD and NFSI values
+    MEASURES = [(3, 1.5, 0, 0.0, -3, -1.5), (2, 0.25, 0, 0.0, -2, -0.25), (0, 0.0, 4, 2.0, 4, 2.0)]
+    TOTALS = (5, 1.75, 4, 2.0, -1, 0.25)
+
+    @staticmethod
+    def combine(combine_fn: VarianceSumCombineFn, measures: list[tuple]):
+        accumulator = combine_fn.create_accumulator()
+        for element in measures:
+            accumulator = combine_fn.add_input(accumulator, element)
+        return accumulator
+
+    @staticmethod
+    def assert_dtypes(totals: tuple, int_indexes: tuple[int]):
+        for i, total in enumerate(totals):
+            assert type(total) is (int if i in int_indexes else float), f'index {i}'
+
+    def test_extract_output_dtypes(self):
+        combine_fn = VarianceSumCombineFn(6)
+        totals = combine_fn.extract_output(self.combine(combine_fn, self.MEASURES))
+        assert totals == pytest.approx(self.TOTALS)
+        self.assert_dtypes(totals, (0, 2, 4))
+
+    def test_total_measure_dtypes(self):
+        # Variance totals with GIT quantity and value, as summed by CalculateVarianceTotals
+        combine_fn = VarianceSumCombineFn(8)
+        totals = combine_fn.extract_output(self.combine(combine_fn, [m + (m[4], m[5]) for m in self.MEASURES]))
+        assert totals == pytest.approx(self.TOTALS + (-1, 0.25))
+        self.assert_dtypes(totals, (0, 2, 4, 6))
+
+    def test_merge_accumulators(self):
+        combine_fn = VarianceSumCombineFn(6)
+        # Accumulators may arrive compacted for shuffle or as vectors
+        accumulators = [combine_fn.compact(self.combine(combine_fn, self.MEASURES[:1])),
+                        self.combine(combine_fn, self.MEASURES[1:]),
+                        combine_fn.create_accumulator()]
+        totals = combine_fn.extract_output(combine_fn.merge_accumulators(accumulators))
+        assert totals == pytest.approx(self.TOTALS)
+        self.assert_dtypes(totals, (0, 2, 4))
+
+    @pytest.mark.parametrize(
+        "measures, expected",
+        [
+            (MEASURES[:2], (True, -5, -1.75)),
+            (MEASURES, (False, 0, 0)),
+        ]
+    )
+    def test_goods_in_transit(self, measures: list[tuple], expected: tuple):
+        combine_fn = VarianceSumCombineFn(6, goods_in_transit=True)
+        totals = combine_fn.extract_output(self.combine(combine_fn, measures))
+        assert len(totals) == len(MultiGrainVariance.TOTAL_FIELDS + MultiGrainVariance.GIT_FIELDS)
+        assert totals[6:] == pytest.approx(expected)
+        assert totals[6] is expected[0]
+        self.assert_dtypes(totals[:6], (0, 2, 4))
+        assert type(totals[7]) is int
+
+    def test_fixed_point_sums_units(self):
+        combine_fn = VarianceSumCombineFn(6, goods_in_transit=True, fixed_point=True)
+        measures = [tuple(Money.to_units(v) if i % 2 else v for i, v in enumerate(m)) for m in self.MEASURES]
+        accumulator = combine_fn.merge_accumulators([combine_fn.compact(self.combine(combine_fn, measures[:1])),
+                                                     self.combine(combine_fn, measures[1:])])
+        assert accumulator.dtype == np.int64
+        totals = combine_fn.extract_output(accumulator)
+        assert totals[:6] == (5, 175000, 4, 200000, -1, 25000)
+        assert totals[6:] == (False, 0, 0)
+        self.assert_dtypes(totals[:6], range(6))
+
+    def test_fixed_point_rejects_float_measures(self):
+        combine_fn = VarianceSumCombineFn(6, fixed_point=True)
+        with pytest.raises(TypeError):
+            combine_fn.add_input(combine_fn.create_accumulator(), self.MEASURES[0])
+
+class TestMultiGrainVariance:
+    """Unit tests for the MultiGrainVariance transform"""
+
+    DATES = {Names.START_DATE: date(2023, 1, 1), Names.END_DATE: date(2023, 3, 31)}
+
+    @pytest.fixture
+    def rows(self, pkrd_fresh_row, fresh_fresh_row, pkrd_frozen_row, frozen_frozen_row, non_nfsi_row) -> list[FinRecData]:
+        return [
+            # Fresh SKU and move order with PKRD and NFSI rows, and a PKRD only SKU and move order in transit
+            pkrd_fresh_row,
+            fresh_fresh_row,
+            pkrd_fresh_row._replace(sku='60999999', moveorder_short='MM099999', pkrd_quantity=-7, pkrd_value_tp=-8.5,
+                                    quantity_variance=-7, value_variance_tp=-8.5),
+            # Frozen rows at two depots, one outside the report date range
+            pkrd_frozen_row,
+            frozen_frozen_row,
+            frozen_frozen_row._replace(record_date=date(2023, 6, 1), nfsi_quantity=5, nfsi_value=1.25,
+                                       quantity_variance=5, value_variance_tp=1.25),
+            # Non-NFSI move order with PKRD and NFSI rows
+            non_nfsi_row,
+            pkrd_fresh_row._replace(depot_category=Names.TYPE_NON_NFSI, moveorder_short=non_nfsi_row.moveorder_short),
+        ]
+
+    @pytest.mark.parametrize("partials", [False, True])
+    def test_grain_totals(self, rows: list[FinRecData], tmp_path: Path, partials: bool):
+        partials_output = str(tmp_path / 'partials') if partials else None
+        with beam.Pipeline() as p:
+            variance = (
+                p
+                | 'Rows' >> beam.Create(rows).with_output_types(FinRecData)
+                | 'Variance by grain' >> MultiGrainVariance(Names.VARIANCE_GRAINS, self.DATES, partials_output=partials_output)
+            )
+            assert list(variance.keys()) == [grain[0] for grain in Names.VARIANCE_GRAINS]
+            for grain in Names.VARIANCE_GRAINS:
+                expected = expected_variance(rows, grain, self.DATES)
+                assert len(expected) > 0
+                assert_that(variance[grain[0]], variance_matcher(expected), label='{} totals'.format(grain[0]))
+
+    def test_fixed_point_totals(self, rows: list[FinRecData]):
+        units_rows = [
+            FinRecData.model(fixed_point=True)._make(
+                Money.to_units(v) if f in FinRecData.MONEY_FIELDS else int(v) if f == 'quantity_variance' else v
+                for f, v in row._asdict().items()
+            )
+            for row in rows
+        ]
+
+        def assert_units_match(expected):
+            match_values = variance_matcher(expected)
+            def matcher(actual):
+                for row in actual:
+                    assert isinstance(row, VarianceUnits)
+                    assert all(type(getattr(row, f)) is int for f in Variance.MONEY_FIELDS)
+                match_values([row.money_values() for row in actual])
+            return matcher
+
+        with beam.Pipeline() as p:
+            variance = (
+                p
+                | 'Rows' >> beam.Create(units_rows).with_output_types(FinRecData.model(fixed_point=True))
+                | 'Variance by grain' >> MultiGrainVariance(Names.VARIANCE_GRAINS, self.DATES, fixed_point=True)
+            )
+            for grain in Names.VARIANCE_GRAINS:
+                assert variance[grain[0]].element_type is VarianceUnits
+                assert_that(variance[grain[0]], assert_units_match(expected_variance(rows, grain, self.DATES)),
+                            label='{} totals'.format(grain[0]))
+
+    def test_date_filtered_grain(self, rows: list[FinRecData]):
+        with beam.Pipeline() as p:
+            variance = (
+                p
+                | 'Rows' >> beam.Create(rows).with_output_types(FinRecData)
+                | 'Variance by grain' >> MultiGrainVariance(Names.VARIANCE_GRAINS, self.DATES)
+            )
+            # The frozen NFSI row dated after the report range only counts towards grains without the date filter
+            assert_that(
+                variance[Names.FROZEN_DEPOT_SKU_VAR] | 'Depot NFSI quantities' >> beam.Map(lambda row: (row.depot_id, row.total_nfsi_quantity)),
+                equal_to([('123', 0), ('987', 567)]), label='Date filtered')
+            assert_that(
+                variance[Names.FROZEN_SKU_VAR] | 'SKU NFSI quantities' >> beam.Map(lambda row: (row.sku, row.total_nfsi_quantity, row.is_git)),
+                equal_to([('60441156', 572, False)]), label='Not date filtered')
+
+
+class TestDedupFingerprints:
+    """Unit tests for the DedupFingerprints transform"""
+
+    LOAD_MONTH = '202301'
+
+    @pytest.fixture
+    def rows(self, pkrd_fresh_row) -> list[FinRecData]:
+        return [
+            pkrd_fresh_row._replace(record_date=date(2023, 1, 1 + i % 3), fingerprint=f'fingerprint-{i}')
+            for i in range(8)
+        ]
+
+    def dedup(self, fingerprint_dir: str, run_id: str, rows: list[FinRecData], expected: list[FinRecData], fp_rate: float | None):
+        with beam.Pipeline() as p:
+            new_rows = (
+                p
+                | 'Rows' >> beam.Create(rows).with_output_types(FinRecData)
+                | 'Dedup' >> DedupFingerprints(fingerprint_dir, self.LOAD_MONTH, run_id, fp_rate=fp_rate, capacity=100)
+            )
+            assert_that(new_rows | 'Fingerprints' >> beam.Map(lambda row: row.fingerprint),
+                        equal_to([row.fingerprint for row in expected]))
+
+    @pytest.mark.parametrize("fp_rate", [None, 0.01])
+    def test_reruns_and_overlapping_inputs(self, tmp_path: Path, rows: list[FinRecData], fp_rate: float | None):
+        fingerprint_dir = str(tmp_path)
+        month_dir = tmp_path / self.LOAD_MONTH
+        self.dedup(fingerprint_dir, '001', rows[:5], rows[:5], fp_rate)
+        # Fingerprints stay staged until published, so a rerun after a failed load keeps every row
+        assert sorted(path.name for path in month_dir.iterdir()) == ['001']
+        self.dedup(fingerprint_dir, '002', rows[:5], rows[:5], fp_rate)
+        DedupFingerprints.publish(fingerprint_dir, self.LOAD_MONTH, '002')
+        assert not Path(DedupFingerprints.staging_dir(fingerprint_dir, self.LOAD_MONTH, '002')).exists()
+        assert len(list((month_dir / '002').glob('*.txt'))) == 3
+        assert (month_dir / f'002{DedupFingerprints.BLOOM_SUFFIX}').exists() == (fp_rate is not None)
+        # Overlapping inputs keep only rows not yet published, across record date partitions and runs
+        self.dedup(fingerprint_dir, '003', rows[3:7], rows[5:7], fp_rate)
+        DedupFingerprints.publish(fingerprint_dir, self.LOAD_MONTH, '003')
+        self.dedup(fingerprint_dir, '004', rows, rows[7:], fp_rate)
+
+    def test_rebuilds_stale_bloom_filter(self, tmp_path: Path, rows: list[FinRecData]):
+        fingerprint_dir = str(tmp_path)
+        month_dir = str(tmp_path / self.LOAD_MONTH)
+        for run_id, fp_rate, run_rows in [('001', 0.01, rows[:3]), ('002', None, rows[3:6])]:
+            self.dedup(fingerprint_dir, run_id, run_rows, run_rows, fp_rate)
+            DedupFingerprints.publish(fingerprint_dir, self.LOAD_MONTH, run_id)
+        # The filter of run 001 misses the fingerprints published by run 002 without a filter
+        assert DedupFingerprints.latest_bloom_filter(month_dir) is None
+        self.dedup(fingerprint_dir, '003', rows, rows[6:], 0.01)
+        DedupFingerprints.publish(fingerprint_dir, self.LOAD_MONTH, '003')
+        assert DedupFingerprints.latest_bloom_filter(month_dir).endswith(f'003{DedupFingerprints.BLOOM_SUFFIX}')
+        self.dedup(fingerprint_dir, '004', rows, [], 0.01)
+
+# fmt: on
@@ -0,0 +1,191 @@
+# fmt: off
+# pylint: disable=abstract-method,unnecessary-dunder-call,expression-not-assigned
+
+import gzip
+import importlib.util
+import pytest
+from pathlib import Path
+import apache_beam as beam
+from apache_beam import coders
+from apache_beam.coders.typecoders import registry
+from apache_beam.pipeline import PipelineVisitor
+from apache_beam.typehints.native_type_compatibility import match_is_named_tuple
+from modules.Compression import Compression
+from modules.FinRecData import FinRecData
+from modules.InputPrefetch import InputPrefetch
+from modules.Manifest import Manifest
+from modules.Names import Names
+from modules.Pricing import Pricing
+from modules.SummaryTotal import SummaryTotal
+from modules.Variance import Variance
+
+PIPELINE_PATH = Path(__file__).parent.parent / 'mm-fin-rec-pipeline.py'
+MODELS = (FinRecData, Pricing, SummaryTotal, Variance)
+
+
+class CoderVisitor(PipelineVisitor):
+    """Collects the element coder of every PCollection in a pipeline graph"""
+
+    def __init__(self):
+        self.coders = {}
+
+    def visit_value(self, value, producer_node):
+        if isinstance(value, beam.pvalue.PCollection):
+            self.coders[f'{producer_node.full_label}.{value.tag}'] = (value.element_type, registry.get_coder(value.element_type))
+
+
+class TestMmFinRecPipeline:
+    """Unit tests for the mm-fin-rec-pipeline graph"""
+
+    @pytest.fixture
+    def pipeline_module(self):
+        spec = importlib.util.spec_from_file_location('mm_fin_rec_pipeline', PIPELINE_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    @pytest.fixture
+    def input_args(self, tmp_path: Path) -> list[str]:
+        inputs = {
+            'pkrd': Names.TYPE_PKRD,
+            'sales': Names.TYPE_SALES,
+            'fresh': Names.TYPE_FRESH,
+            'frozen': Names.TYPE_FROZEN,
+            'non-nfsi': Names.TYPE_NON_NFSI,
+        }
+        args = []
+        for arg, type in inputs.items():
+            path = tmp_path / f'{arg}.csv'
+            path.write_text(','.join(col for col in Names.COLS[type].values() if bool(col)) + '\n')
+            args.append(f'--{arg}={path}')
+        for arg, header in (('pricing', 'Sku,Total,Total_case'), ('depot', 'depot_id,depot_name,depot_category')):
+            path = tmp_path / f'{arg}.csv'
+            path.write_text(header + '\n')
+            args.append(f'--{arg}={path}')
+        return args + [f'--output-dir={tmp_path}', '--file-output=True', '--project=test-project']
+
+    @pytest.fixture
+    def build_pipeline(self, pipeline_module, input_args: list[str], monkeypatch):
+        """Returns a function building the pipeline graph without running it, returning the coders used per PCollection"""
+        def build(*extra_args: str) -> dict:
+            visitor = CoderVisitor()
+            def visit(pipeline, test_runner_api='AUTO'):
+                pipeline.visit(visitor)
+                return type('Result', (), {'wait_until_finish': lambda self: None})()
+            monkeypatch.setattr(beam.Pipeline, 'run', visit)
+            pipeline_module.run(input_args + list(extra_args))
+            return visitor.coders
+        return build
+
+    @pytest.fixture
+    def pipeline_coders(self, build_pipeline) -> dict:
+        return build_pipeline()
+
+    @pytest.mark.parametrize("model", MODELS)
+    def test_models_registered_with_row_coder(self, model: type):
+        assert isinstance(registry.get_coder(model), coders.RowCoder)
+
+    @pytest.mark.parametrize("args", [(), ('--columnar-ingest=True',), ('--batch-models=True', '--fixed-point-money=True')])
+    def test_named_tuple_collections_use_row_coder(self, build_pipeline, args: tuple[str]):
+        # Collections typed Any are coded by FastPrimitivesCoder, pickling any NamedTuples they hold, so are not checked
+        named_tuple_coders = [
+            (label, coder) for label, (element_type, coder) in build_pipeline(*args).items() if match_is_named_tuple(element_type)
+        ]
+        assert len(named_tuple_coders) > 0
+        for label, coder in named_tuple_coders:
+            assert isinstance(coder, coders.RowCoder), label
+
+    def test_model_collections_use_row_coder(self, pipeline_coders: dict):
+        model_types = {element_type for element_type, _ in pipeline_coders.values() if element_type in MODELS}
+        assert model_types == set(MODELS)
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_builds_without_column_projection(self, build_pipeline, columnar: bool):
+        assert len(build_pipeline('--project-columns=False', f'--columnar-ingest={columnar}')) > 0
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_limits_outputs_to_report_dates(self, build_pipeline, columnar: bool):
+        labels = build_pipeline('--limit-outputs-to-report-dates=True', f'--columnar-ingest={columnar}').keys()
+        filters = [label for label in labels if label.endswith('/Filter rows.None')]
+        # PKRD, Fresh, Frozen and Non-NFSI are filtered at ingest, Sales is not
+        assert len(filters) == 4
+        assert not any('Sales' in label for label in filters)
+        assert not any(label.startswith('Filter PKRD') for label in labels)
+
+    def test_lookup_cache_replaces_side_inputs(self, build_pipeline, tmp_path: Path):
+        labels = build_pipeline(f'--lookup-cache-dir={tmp_path / "lookups"}').keys()
+        assert len(list((tmp_path / 'lookups').iterdir())) == 2
+        assert not any(label.startswith(('Depots side input', 'Pricing as look-up')) for label in labels)
+        assert any(label.endswith('Add pricing to PKRD/Cached look-up.None') for label in labels)
+
+    def test_input_metadata_cache(self, build_pipeline, tmp_path: Path):
+        cache_path = tmp_path / 'inputs.json'
+        build_pipeline(f'--input-metadata-cache={cache_path}')
+        metadata = InputPrefetch.read_cache(str(cache_path))
+        assert len(metadata) == 7
+        assert metadata[str(tmp_path / 'pricing.csv')].header == ['Sku', 'Total', 'Total_case']
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_builds_with_input_directory(self, build_pipeline, tmp_path: Path, columnar: bool):
+        pkrd_dir = tmp_path / 'pkrd'
+        pkrd_dir.mkdir()
+        for name in ('pkrd-1.csv', 'pkrd-2.csv'):
+            (pkrd_dir / name).write_bytes((tmp_path / 'pkrd.csv').read_bytes())
+        assert len(build_pipeline(f'--pkrd={pkrd_dir}', f'--columnar-ingest={columnar}')) > 0
+        (pkrd_dir / 'pkrd-3.csv').write_text('Store\n')
+        with pytest.raises(ValueError):
+            build_pipeline(f'--pkrd={pkrd_dir}')
+
+    def test_transcodes_compressed_inputs(self, build_pipeline, tmp_path: Path):
+        compressed = {}
+        for arg in ('pkrd', 'sales'):
+            compressed[arg] = tmp_path / f'{arg}.csv.gz'
+            compressed[arg].write_bytes(gzip.compress((tmp_path / f'{arg}.csv').read_bytes()))
+        args = [f'--{arg}={path}' for arg, path in compressed.items()]
+        assert len(build_pipeline(*args)) > 0
+        transcode_dir = tmp_path / 'transcoded'
+        # Transcoding runs as its own pipeline, which is only built here, so no shards are written
+        with pytest.raises(ValueError, match='did not write all shards'):
+            build_pipeline(*args, f'--transcode-dir={transcode_dir}')
+        for path in compressed.values():
+            prefix = Compression.transcoded_prefix(str(transcode_dir), str(path), str(path.stat().st_mtime_ns))
+            Path(prefix).parent.mkdir(parents=True, exist_ok=True)
+            for i in range(2):
+                Path(f'{prefix}-0000{i}-of-00002{Compression.TRANSCODE_SUFFIX}').write_bytes(b'')
+        labels = build_pipeline(*args, f'--transcode-dir={transcode_dir}').keys()
+        assert any(label.startswith('List Sales Order CSV files') for label in labels)
+        assert any('List {} CSV files'.format(Names.TYPE_PKRD) in label for label in labels)
+
+    def test_incremental_runs_skip_processed_files(self, build_pipeline, tmp_path: Path):
+        state_dir = tmp_path / 'state'
+        labels = build_pipeline(f'--state-dir={state_dir}').keys()
+        manifest = Manifest.read(str(state_dir))
+        assert len(manifest.entries) == 4
+        assert manifest.partials.startswith(str(state_dir))
+        assert not any('Read previous variance partials' in label for label in labels)
+        labels = build_pipeline(f'--state-dir={state_dir}').keys()
+        assert any('Read previous variance partials' in label for label in labels)
+        assert len(Manifest.read(str(state_dir)).entries) == 4
+
+    def test_incremental_runs_keep_money_mode(self, build_pipeline, tmp_path: Path):
+        state_dir = tmp_path / 'state'
+        build_pipeline(f'--state-dir={state_dir}')
+        with pytest.raises(ValueError):
+            build_pipeline(f'--state-dir={state_dir}', '--fixed-point-money=True')
+        build_pipeline(f'--state-dir={state_dir}', '--fixed-point-money=True', '--full-refresh=True')
+        assert Manifest.read(str(state_dir)).fixed_point == True
+
+    def test_incremental_runs_keep_ingest_dates(self, build_pipeline, tmp_path: Path):
+        state_dir = tmp_path / 'state'
+        dates = ('--start-date=01/01/2023', '--end-date=01/02/2023', '--limit-outputs-to-report-dates=True')
+        build_pipeline(f'--state-dir={state_dir}', *dates)
+        assert Manifest.read(str(state_dir)).ingest_dates == ['2023-01-01', '2023-02-01']
+        build_pipeline(f'--state-dir={state_dir}', *dates)
+        with pytest.raises(ValueError):
+            build_pipeline(f'--state-dir={state_dir}', *dates[:2])
+        with pytest.raises(ValueError):
+            build_pipeline(f'--state-dir={state_dir}', '--start-date=01/01/2023', '--end-date=01/03/2023', dates[2])
+        build_pipeline(f'--state-dir={state_dir}', *dates[:2], '--full-refresh=True')
+        assert Manifest.read(str(state_dir)).ingest_dates is None
+
+# fmt: on